@@ -0,0 +1,2 @@
+# Benchmarks package
+__all__ = []
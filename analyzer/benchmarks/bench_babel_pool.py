@@ -0,0 +1,63 @@
+"""
+Compares TypeScript parsing throughput through the persistent Babel worker
+pool against spawning `node js_ast/parse.js` once per file, the way a
+plain subprocess call would. Needs Node and `npm ci` in js_ast/. Run from
+analyzer/:
+
+    python -m benchmarks.bench_babel_pool
+"""
+import subprocess
+import time
+
+from src.parsers.babel_worker_pool import JS_AST_DIR, BabelWorkerPool, babel_available
+
+_TS_SOURCE = """
+interface Options { limit?: number; verbose: boolean }
+
+export class Collector<T> {
+  private items: T[] = [];
+
+  add(item: T, options: Options = { verbose: false }): number {
+    if (options.limit !== undefined && this.items.length >= options.limit) {
+      return -1;
+    }
+    for (const existing of this.items) {
+      if (existing === item) return this.items.length;
+    }
+    this.items.push(item);
+    return this.items.length;
+  }
+}
+
+export const total = (values: number[]): number => values.reduce((a, b) => a + b, 0);
+"""
+
+
+def main(files: int = 200, spawned_files: int = 20, workers: int = 2) -> None:
+    if not babel_available():
+        print("node or js_ast/node_modules missing; run `npm ci` in js_ast/ first")
+        return
+
+    pool = BabelWorkerPool(size=workers)
+    try:
+        pool.parse(_TS_SOURCE)  # warm up so worker startup is not timed
+        start = time.perf_counter()
+        for _ in range(files):
+            pool.parse(_TS_SOURCE)
+        pooled = files / (time.perf_counter() - start)
+    finally:
+        pool.close()
+
+    start = time.perf_counter()
+    for _ in range(spawned_files):
+        subprocess.run(["node", "parse.js"], input=_TS_SOURCE.encode(), capture_output=True,
+                       cwd=JS_AST_DIR, check=True)
+    spawned = spawned_files / (time.perf_counter() - start)
+
+    print(f"worker pool  {pooled:8.1f} files/s")
+    print(f"spawn/file   {spawned:8.1f} files/s")
+    print(f"speedup      {pooled / spawned:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures security_analyzer.scan throughput on synthetic sources. Run from analyzer/:
+
+    python -m benchmarks.bench_security_scan
+"""
+import time
+
+from src.analyzers import security_analyzer
+
+_PYTHON_LINES = [
+    "def load(path, key=None):",
+    "    with open(path) as f:",
+    "        data = f.read()",
+    "    return {k: v for k, v in data.items() if k != key}",
+    "    result = compute(total, limit) + offset",
+    "    cur.execute('SELECT * FROM t WHERE id = %s', (row_id,))",
+]
+_JS_LINES = [
+    "function render(items, options) {",
+    "  const keys = Object.keys(options).filter((k) => k !== 'secretField');",
+    "  for (const item of items) { total += item.value; }",
+    "  return db.query('SELECT * FROM t WHERE id = ?', [id]);",
+    "}",
+]
+# One real finding per ~500 lines, so the benchmark covers the match path too
+_FINDINGS = ["password = 'hunter2hunter2'", "os.system(cmd)", "eval(payload)"]
+
+
+def _make_source(lines, target_bytes: int) -> str:
+    out, size, i = [], 0, 0
+    while size < target_bytes:
+        line = _FINDINGS[i // 500 % len(_FINDINGS)] if i % 500 == 499 else lines[i % len(lines)]
+        out.append(line)
+        size += len(line) + 1
+        i += 1
+    return "\n".join(out)
+
+
+def main(rounds: int = 5) -> None:
+    cases = {
+        "python_2mb.py": _make_source(_PYTHON_LINES, 2_000_000),
+        "javascript_2mb.js": _make_source(_JS_LINES, 2_000_000),
+    }
+    for path, content in cases.items():
+        best = float("inf")
+        for _ in range(rounds):
+            start = time.perf_counter()
+            security_analyzer.scan(path, content)
+            best = min(best, time.perf_counter() - start)
+        mb = len(content.encode("utf-8")) / 1_000_000
+        print(f"{path:<20} {mb:6.2f} MB  {best * 1000:8.1f} ms  {mb / best:7.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
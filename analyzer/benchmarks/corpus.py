@@ -0,0 +1,164 @@
+"""
+Deterministic synthetic source corpora for the benchmark suite. Every
+generator is seeded, so a given (language, shape, scale) always yields
+byte-identical files and timings stay comparable across runs and machines.
+"""
+import random
+from typing import Dict, List, Tuple
+
+# (path, content) pairs
+Corpus = List[Tuple[str, str]]
+
+SHAPES = ("small", "large", "nested", "minified", "many_functions")
+
+_WORDS = [
+    "item", "value", "total", "limit", "node", "child", "result", "config", "user",
+    "record", "index", "buffer", "cache", "entry", "payload", "offset", "count",
+]
+
+
+def _name(rng: random.Random) -> str:
+    return f"{rng.choice(_WORDS)}_{rng.choice(_WORDS)}{rng.randrange(100)}"
+
+
+def _py_function(rng: random.Random, name: str) -> str:
+    a, b = _name(rng), _name(rng)
+    body = [
+        f"def {name}({a}, {b}=None):",
+        f"    total = 0",
+        f"    for entry in {a}:",
+        f"        if entry and entry.get('{rng.choice(_WORDS)}') > {rng.randrange(50)}:",
+        f"            total += len(entry)",
+        f"        elif {b} is not None or entry == {b}:",
+        f"            total -= 1",
+    ]
+    if rng.random() < 0.2:
+        body += ["    try:", f"        total += int({b})", "    except:", "        pass"]
+    if rng.random() < 0.1:
+        body += [f"    password = '{rng.choice(_WORDS)}{rng.randrange(10**6)}'"]
+    body.append("    return total")
+    return "\n".join(body)
+
+
+def _js_function(rng: random.Random, name: str) -> str:
+    a, b = _name(rng), _name(rng)
+    body = [
+        f"function {name}({a}, {b}) {{",
+        "  let total = 0;",
+        f"  for (const entry of {a}) {{",
+        f"    if (entry && entry.{rng.choice(_WORDS)} > {rng.randrange(50)}) {{",
+        "      total += entry.length;",
+        f"    }} else if ({b} == null || entry === {b}) {{",
+        "      total -= 1;",
+        "    }",
+        "  }",
+    ]
+    if rng.random() < 0.2:
+        body += ["  try {", f"    total += parseInt({b}, 10);", "  } catch (e) {}"]
+    if rng.random() < 0.1:
+        body += [f"  var apiKey = '{rng.choice(_WORDS)}{rng.randrange(10**6)}abcdef';"]
+    body += ["  return total;", "}"]
+    return "\n".join(body)
+
+
+def _functions(language: str, rng: random.Random, count: int) -> List[str]:
+    make = _py_function if language == "python" else _js_function
+    return [make(rng, f"fn_{i}_{rng.randrange(1000)}") for i in range(count)]
+
+
+def _module(language: str, rng: random.Random, functions: int) -> str:
+    header = "import os\nimport sys\n\n" if language == "python" else "'use strict';\nconst fs = require('fs');\n\n"
+    return header + "\n\n".join(_functions(language, rng, functions)) + "\n"
+
+
+def _nested(language: str, depth: int, repeats: int) -> str:
+    blocks = []
+    for r in range(repeats):
+        if language == "python":
+            lines = [f"def nested_{r}(data):"]
+            for d in range(depth):
+                keyword = "for x{0} in data:" if d % 2 == 0 else "if x{0}:"
+                lines.append("    " * (d + 1) + keyword.format(d - d % 2))
+            lines.append("    " * (depth + 1) + "pass")
+        else:
+            lines = [f"function nested_{r}(data) {{"]
+            for d in range(depth):
+                opener = "for (const x{0} of data) {{" if d % 2 == 0 else "if (x{0}) {{"
+                lines.append("  " * (d + 1) + opener.format(d - d % 2))
+            lines.append("  " * (depth + 1) + "data.pop();")
+            lines += ["  " * (d + 1) + "}" for d in reversed(range(depth))]
+            lines.append("}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks) + "\n"
+
+
+def _minified(language: str, rng: random.Random, functions: int) -> str:
+    if language == "python":
+        # Python can't drop its newlines, so "minified" means dense one-line statements
+        return "\n".join(
+            f"def f{i}(a,b=None): return [x for x in a if x and x.get('{rng.choice(_WORDS)}')>{rng.randrange(50)} or x==b]"
+            for i in range(functions)
+        ) + "\n"
+    parts = []
+    for i in range(functions):
+        parts.append(
+            f"function f{i}(a,b){{var t=0;for(var i=0;i<a.length;i++){{if(a[i]&&a[i].{rng.choice(_WORDS)}>"
+            f"{rng.randrange(50)}){{t+=a[i].length}}else if(b==null){{t--}}}}return t}}"
+        )
+    return ";".join(parts) + "\n"
+
+
+def build(language: str, shape: str, scale: float = 1.0) -> Corpus:
+    """Files for one language/shape; scale < 1 shrinks everything for quick runs"""
+    ext = "py" if language == "python" else "js"
+    rng = random.Random(f"{language}:{shape}")
+    n = lambda count: max(1, int(count * scale))
+
+    if shape == "small":
+        return [(f"pkg/mod_{i}.{ext}", _module(language, rng, 4)) for i in range(n(200))]
+    if shape == "large":
+        return [(f"pkg/large.{ext}", _module(language, rng, n(3000 if language == "python" else 1500)))]
+    if shape == "nested":
+        return [(f"pkg/nested.{ext}", _nested(language, depth=40, repeats=n(60)))]
+    if shape == "minified":
+        return [(f"dist_min/bundle.min.{ext}", _minified(language, rng, n(4000)))]
+    if shape == "many_functions":
+        return [(f"pkg/handlers_{i}.{ext}", _module(language, rng, 250)) for i in range(n(8))]
+    raise ValueError(f"Unknown corpus shape: {shape}")
+
+
+def build_all(scale: float = 1.0) -> Dict[Tuple[str, str], Corpus]:
+    return {
+        (language, shape): build(language, shape, scale)
+        for language in ("python", "javascript")
+        for shape in SHAPES
+    }
+
+
+def issues_for_scoring(count: int) -> List[Dict[str, str]]:
+    """Issue dicts with a realistic severity/category mix, for compute_score"""
+    rng = random.Random("issues")
+    severities = ["low"] * 6 + ["medium"] * 3 + ["high"]
+    categories = ["style", "complexity", "maintainability", "performance", "security"]
+    return [
+        {"severity": rng.choice(severities), "category": rng.choice(categories), "line": i}
+        for i in range(count)
+    ]
+
+
+def function_metrics(count: int, per_file: int = 25) -> List[Tuple[str, Dict[str, list]]]:
+    """(path, functions) pairs in analysis_worker's per-function column
+    shape, for RepoMetrics; complexity and size skewed low like real code"""
+    rng = random.Random("functions")
+    files = []
+    for f in range(max(1, count // per_file)):
+        loc = [max(1, int(rng.expovariate(1 / 25))) for _ in range(per_file)]
+        files.append((f"pkg{f % 40}/sub{f % 7}/mod_{f}.py", {
+            "name": [f"{_name(rng)}" for _ in range(per_file)],
+            "line": [i * 30 + 1 for i in range(per_file)],
+            "complexity": [1 + int(rng.expovariate(1 / 4)) for _ in range(per_file)],
+            "cognitive_complexity": [int(rng.expovariate(1 / 6)) for _ in range(per_file)],
+            "lines_of_code": loc,
+            "parameters": [rng.randrange(0, 8) for _ in range(per_file)],
+        }))
+    return files
@@ -0,0 +1,182 @@
+"""
+Benchmark suite for the per-file hot path: PythonParser.parse,
+JavaScriptParser.parse, security_analyzer.scan and quality_score.compute_score
+over the deterministic corpora in benchmarks/corpus.py, plus the repo-level
+RepoMetrics aggregation. Run from analyzer/:
+
+    python -m benchmarks.run_suite                    # compare with baseline.json
+    python -m benchmarks.run_suite --save-baseline    # record a new baseline
+    python -m benchmarks.run_suite --quick            # 1/10 scale smoke run
+    python -m benchmarks.run_suite --only parse/python   # one parser only
+
+Each case reports the best of --rounds timings as files/s and MB/s, plus
+peak traced memory from one extra, separately traced run (tracing slows
+Python down, so it never overlaps the timed runs).
+
+Baselines store each case's time relative to a fixed pure-Python
+calibration workload timed just before it, and comparisons use that
+ratio, so a faster or slower machine or interpreter shifts both sides
+alike. With a baseline present, cases whose ratio grew by more than
+--tolerance are flagged and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from src.analyzers import security_analyzer
+from src.metrics import quality_score
+from src.metrics.code_metrics import RepoMetrics
+from src.parsers.javascript_parser import JavaScriptParser
+from src.parsers.python_parser import PythonParser
+
+from benchmarks import corpus
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+SCORING_ISSUES = 100_000
+METRICS_FUNCTIONS = 50_000
+
+
+def _calibration() -> Dict[str, int]:
+    """Fixed pure-Python work (loops, calls, str and dict operations) that
+    stands in for the speed of the machine and interpreter"""
+    counts: Dict[str, int] = {}
+    for i in range(300_000):
+        word = "w" + str(i % 1000)
+        counts[word] = counts.get(word, 0) + len(word)
+    return counts
+
+
+def _timed(run: Callable[[], Any], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_kb(run: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    try:
+        run()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _cases(scale: float) -> List[Dict[str, Any]]:
+    python_parser = PythonParser()
+    js_parser = JavaScriptParser()
+    cases = []
+    for (language, shape), files in corpus.build_all(scale).items():
+        parser = python_parser if language == "python" else js_parser
+        size = sum(len(content.encode("utf-8")) for _, content in files)
+        cases.append({
+            "name": f"parse/{language}/{shape}", "files": len(files), "bytes": size,
+            "run": lambda parser=parser, files=files: [parser.parse(c, p) for p, c in files],
+        })
+        cases.append({
+            "name": f"scan/{language}/{shape}", "files": len(files), "bytes": size,
+            "run": lambda files=files: [security_analyzer.scan(p, c) for p, c in files],
+        })
+    issues = corpus.issues_for_scoring(max(1, int(SCORING_ISSUES * scale)))
+    cases.append({
+        # "files" is the issue count here, so files/s reads as issues/s
+        "name": "score/issues", "files": len(issues), "bytes": 0,
+        "run": lambda: quality_score.compute_score(issues),
+    })
+    functions = corpus.function_metrics(max(25, int(METRICS_FUNCTIONS * scale)))
+    cases.append({
+        # Collecting every file's columns, then every aggregate; files/s reads as functions/s
+        "name": "metrics/functions", "files": sum(len(f["line"]) for _, f in functions), "bytes": 0,
+        "run": lambda: _repo_metrics(functions),
+    })
+    return cases
+
+
+def _repo_metrics(functions) -> list:
+    metrics = RepoMetrics()
+    for path, columns in functions:
+        metrics.add_file(path, columns)
+    return metrics.to_metrics()
+
+
+def run(scale: float, rounds: int, only: str = "") -> Dict[str, Dict[str, float]]:
+    results = {}
+    for case in _cases(scale):
+        if only and only not in case["name"]:
+            continue
+        # Right before the case, so drift in machine load hits both alike
+        calibration = _timed(_calibration, max(rounds, 5))
+        seconds = _timed(case["run"], rounds)
+        mb = case["bytes"] / 1_000_000
+        results[case["name"]] = {
+            "seconds": round(seconds, 6),
+            "relative": round(seconds / calibration, 4),
+            "files_per_s": round(case["files"] / seconds, 1),
+            "mb_per_s": round(mb / seconds, 3) if mb else None,
+            "peak_kb": _peak_kb(case["run"]),
+        }
+    return results
+
+
+def _report(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float) -> int:
+    regressions = 0
+    print(f"{'case':<34} {'ms':>9} {'files/s':>10} {'MB/s':>8} {'peak KB':>9}  vs baseline")
+    for name, r in results.items():
+        mb_per_s = f"{r['mb_per_s']:8.2f}" if r["mb_per_s"] is not None else f"{'-':>8}"
+        line = f"{name:<34} {r['seconds'] * 1000:9.1f} {r['files_per_s']:10.1f} {mb_per_s} {r['peak_kb']:9d}"
+        base = baseline.get(name)
+        if base:
+            change = r["relative"] / base["relative"] - 1
+            flag = ""
+            if change > tolerance:
+                flag = "  REGRESSION"
+                regressions += 1
+            line += f"  {change:+7.1%}{flag}"
+        print(line)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="run at 1/10 scale")
+    parser.add_argument("--only", default="", help="substring filter on case names, e.g. 'scan/'")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, e.g. 0.25 = 25%%")
+    args = parser.parse_args(argv)
+
+    scale = 0.1 if args.quick else 1.0
+    results = run(scale, args.rounds, args.only)
+
+    baseline: Dict[str, Any] = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored.get("scale") == scale:
+            baseline = stored["results"]
+        else:
+            print(f"Baseline was recorded at scale {stored.get('scale')}, not comparing")
+
+    regressions = _report(results, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"scale": scale, "python": sys.version.split()[0], "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        print(f"{regressions} case(s) slower than baseline by more than {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
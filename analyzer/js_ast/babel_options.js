@@ -0,0 +1,22 @@
+/**
+ * @babel/parser options shared by parse.js (one file per process) and
+ * worker.js (long-lived, many files per process).
+ */
+module.exports = {
+  sourceType: "unambiguous",
+  allowReturnOutsideFunction: true,
+  errorRecovery: true,
+  plugins: [
+    "jsx",
+    "typescript",
+    "classProperties",
+    "classPrivateProperties",
+    "classPrivateMethods",
+    "decorators-legacy",
+    "objectRestSpread",
+    "optionalChaining",
+    "nullishCoalescingOperator",
+    "dynamicImport",
+    "topLevelAwait",
+  ],
+};
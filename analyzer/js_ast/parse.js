@@ -6,30 +6,14 @@
  * resulting AST as JSON to stdout. Python calls this via subprocess.
  */
 const parser = require("@babel/parser");
+const OPTIONS = require("./babel_options");
 
 let input = "";
 process.stdin.setEncoding("utf8");
 process.stdin.on("data", (chunk) => { input += chunk; });
 process.stdin.on("end", () => {
   try {
-    const ast = parser.parse(input, {
-      sourceType: "unambiguous",
-      allowReturnOutsideFunction: true,
-      errorRecovery: true,
-      plugins: [
-        "jsx",
-        "typescript",
-        "classProperties",
-        "classPrivateProperties",
-        "classPrivateMethods",
-        "decorators-legacy",
-        "objectRestSpread",
-        "optionalChaining",
-        "nullishCoalescingOperator",
-        "dynamicImport",
-        "topLevelAwait",
-      ],
-    });
+    const ast = parser.parse(input, OPTIONS);
 
     // errorRecovery:true means parse errors land in ast.errors instead of throwing
     if (ast.errors && ast.errors.length > 0) {
@@ -0,0 +1,90 @@
+#!/usr/bin/env node
+/**
+ * Long-lived variant of parse.js: parses any number of files per process so
+ * Python pays Node's startup and @babel/parser's load cost once per worker
+ * instead of once per file.
+ *
+ * Both directions use length-prefixed frames: a 4-byte big-endian byte
+ * count followed by that many bytes of UTF-8 JSON. Requests are {code};
+ * each gets exactly one reply, {ast} or {error}, in request order. The
+ * process exits when stdin closes.
+ *
+ * The AST is emitted in ESTree shape (so Python can walk it with the same
+ * rules as esprima's) and trimmed to what the analyzer reads: offsets,
+ * comments and `extra` are dropped and loc is reduced to line numbers.
+ */
+const parser = require("@babel/parser");
+const BASE_OPTIONS = require("./babel_options");
+
+const OPTIONS = { ...BASE_OPTIONS, plugins: [...BASE_OPTIONS.plugins, "estree"] };
+
+const DROPPED_KEYS = new Set([
+  "range", "extra", "comments", "tokens",
+  "leadingComments", "trailingComments", "innerComments",
+]);
+
+function trim(key, value) {
+  if (DROPPED_KEYS.has(key)) return undefined;
+  // Character offsets; loc.start/loc.end are objects and must survive
+  if ((key === "start" || key === "end") && typeof value === "number") return undefined;
+  if (key === "loc" && value) {
+    return { start: { line: value.start.line }, end: { line: value.end.line } };
+  }
+  return value;
+}
+
+function reply(message) {
+  const body = Buffer.from(JSON.stringify(message, trim), "utf8");
+  const header = Buffer.alloc(4);
+  header.writeUInt32BE(body.length, 0);
+  process.stdout.write(header);
+  process.stdout.write(body);
+}
+
+function handle(request) {
+  try {
+    const ast = parser.parse(request.code, OPTIONS);
+
+    // errorRecovery:true means parse errors land in ast.errors instead of throwing
+    if (ast.errors && ast.errors.length > 0) {
+      reply({ error: ast.errors.map(e => e.reasonCode + ": " + (e.message || "")).join("; ") });
+      return;
+    }
+
+    reply({ ast: ast.program });
+  } catch (e) {
+    reply({ error: e.message });
+  }
+}
+
+// Incoming bytes are kept as a list of chunks and only joined once a whole
+// frame has arrived, so a large file costs one copy rather than one per chunk
+let chunks = [];
+let buffered = 0;
+
+function takeBytes(count) {
+  const joined = chunks.length === 1 ? chunks[0] : Buffer.concat(chunks, buffered);
+  const taken = joined.subarray(0, count);
+  const rest = joined.subarray(count);
+  chunks = rest.length ? [rest] : [];
+  buffered = rest.length;
+  return taken;
+}
+
+let frameLength = -1;
+
+process.stdin.on("data", (chunk) => {
+  chunks.push(chunk);
+  buffered += chunk.length;
+  for (;;) {
+    if (frameLength < 0) {
+      if (buffered < 4) return;
+      frameLength = takeBytes(4).readUInt32BE(0);
+    }
+    if (buffered < frameLength) return;
+    const body = takeBytes(frameLength);
+    frameLength = -1;
+    handle(JSON.parse(body.toString("utf8")));
+  }
+});
+process.stdin.on("end", () => process.exit(0));
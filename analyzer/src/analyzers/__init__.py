@@ -0,0 +1,7 @@
+# Analyzers package
+# Importing the rule modules registers their AST rules with the rule engine.
+# Rule groups report in registration order, so this order is the order
+# findings come out in.
+from . import complexity_analyzer, antipattern_detector, pattern_detector, performance_analyzer
+
+__all__ = ['complexity_analyzer', 'antipattern_detector', 'pattern_detector', 'performance_analyzer']
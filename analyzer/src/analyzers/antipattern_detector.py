@@ -0,0 +1,60 @@
+"""
+Error-handling and scoping anti-patterns: swallowed or over-broad exception
+handling, mutable module state, function-scoped 'var'.
+"""
+import ast
+
+from .rule_engine import ast_rule, js_line
+
+# The JavaScript style rules here and in pattern_detector share a group, so
+# their findings come out together in source order
+_JS_STYLE = "javascript_style"
+
+
+@ast_rule(
+    "BARE_EXCEPT", "medium", "style",
+    "Bare except clause",
+    "Using bare 'except:' catches all exceptions, specify exception types",
+    python=(ast.ExceptHandler,),
+)
+def bare_except(node, ctx) -> None:
+    if node.type is None:
+        ctx.report("BARE_EXCEPT", node.lineno)
+
+
+@ast_rule(
+    "GLOBAL_VARIABLE", "low", "style",
+    "Global variable '{name}'",
+    "Global variables can make code harder to maintain",
+    python=(ast.Assign,),
+)
+def global_variable(node, ctx) -> None:
+    # Only true module-level assignments, not ones nested inside
+    # functions/methods/classes; UPPER_CASE names are constants
+    if ctx.depth != 1:
+        return
+    for target in node.targets:
+        if isinstance(target, ast.Name) and not target.id.isupper():
+            ctx.report("GLOBAL_VARIABLE", node.lineno, args={"name": target.id})
+
+
+@ast_rule(
+    "EMPTY_CATCH", "medium", "style",
+    "Empty catch block",
+    "Catching an error and doing nothing hides real failures",
+    javascript=("CatchClause",), group=_JS_STYLE,
+)
+def empty_catch(node, ctx) -> None:
+    if node.body is None or not node.body.body:
+        ctx.report("EMPTY_CATCH", js_line(node))
+
+
+@ast_rule(
+    "VAR_USAGE", "low", "style",
+    "Use of 'var'",
+    "Prefer 'let' or 'const' over 'var' for block scoping",
+    javascript=("VariableDeclaration",), group=_JS_STYLE,
+)
+def var_usage(node, ctx) -> None:
+    if node.kind == "var":
+        ctx.report("VAR_USAGE", js_line(node))
@@ -0,0 +1,73 @@
+"""
+Size and complexity thresholds over the per-function and per-class metrics
+the parsers compute during their traversal. Function rules run as the walk
+leaves each function, once its complexity totals are final, and report
+function by function.
+"""
+import ast
+
+from .rule_engine import ast_rule
+
+_PY_FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+_JS_FUNCTIONS = ("FunctionDeclaration", "FunctionExpression", "ArrowFunctionExpression")
+
+COMPLEXITY_THRESHOLD = 10
+HIGH_COMPLEXITY_THRESHOLD = 15  # raises HIGH_COMPLEXITY to high severity
+COGNITIVE_COMPLEXITY_THRESHOLD = 15
+LONG_FUNCTION_LINES = 50
+MAX_CLASS_METHODS = 20
+
+
+@ast_rule(
+    "HIGH_COMPLEXITY", "medium", "complexity",
+    "High cyclomatic complexity in function '{name}'",
+    "Function has complexity of {complexity}, consider refactoring",
+    python=_PY_FUNCTIONS, javascript=_JS_FUNCTIONS, on="exit", group="functions",
+)
+def high_complexity(node, ctx) -> None:
+    func = ctx.record
+    if func.complexity > COMPLEXITY_THRESHOLD:
+        ctx.report(
+            "HIGH_COMPLEXITY", func.line_start,
+            severity="high" if func.complexity > HIGH_COMPLEXITY_THRESHOLD else None,
+            args={"name": func.name, "complexity": func.complexity},
+        )
+
+
+@ast_rule(
+    "HIGH_COGNITIVE_COMPLEXITY", "medium", "complexity",
+    "High cognitive complexity in function '{name}'",
+    "Function has cognitive complexity of {cognitive_complexity}",
+    python=_PY_FUNCTIONS, on="exit", group="functions",
+)
+def high_cognitive_complexity(node, ctx) -> None:
+    func = ctx.record
+    if func.cognitive_complexity > COGNITIVE_COMPLEXITY_THRESHOLD:
+        ctx.report(
+            "HIGH_COGNITIVE_COMPLEXITY", func.line_start,
+            args={"name": func.name, "cognitive_complexity": func.cognitive_complexity},
+        )
+
+
+@ast_rule(
+    "LONG_FUNCTION", "medium", "maintainability",
+    "Long function '{name}'",
+    "Function has {lines} lines, consider splitting",
+    python=_PY_FUNCTIONS, javascript=_JS_FUNCTIONS, on="exit", group="functions",
+)
+def long_function(node, ctx) -> None:
+    func = ctx.record
+    if func.lines_of_code > LONG_FUNCTION_LINES:
+        ctx.report("LONG_FUNCTION", func.line_start, args={"name": func.name, "lines": func.lines_of_code})
+
+
+@ast_rule(
+    "TOO_MANY_METHODS", "medium", "maintainability",
+    "Class '{name}' has too many methods",
+    "Class has {methods} methods, consider splitting responsibilities",
+    python=(ast.ClassDef,),
+)
+def too_many_methods(node, ctx) -> None:
+    cls = ctx.record
+    if cls.methods > MAX_CLASS_METHODS:
+        ctx.report("TOO_MANY_METHODS", cls.line_start, args={"name": cls.name, "methods": cls.methods})
@@ -0,0 +1,18 @@
+"""
+Expression-level patterns that are legal but commonly wrong.
+"""
+from .rule_engine import ast_rule, js_line
+
+# Shared with the JavaScript style rules in antipattern_detector
+_JS_STYLE = "javascript_style"
+
+
+@ast_rule(
+    "LOOSE_EQUALITY", "low", "style",
+    "Loose equality operator '{operator}'",
+    "Use strict equality (=== or !==) to avoid type coercion bugs",
+    javascript=("BinaryExpression",), group=_JS_STYLE,
+)
+def loose_equality(node, ctx) -> None:
+    if node.operator in ("==", "!="):
+        ctx.report("LOOSE_EQUALITY", js_line(node), args={"operator": node.operator})
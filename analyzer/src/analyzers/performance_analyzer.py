@@ -0,0 +1,21 @@
+"""
+Structural performance risks visible in the AST alone.
+"""
+import ast
+
+from .rule_engine import ast_rule
+
+_JS_LOOPS = ("ForStatement", "ForInStatement", "ForOfStatement", "WhileStatement", "DoWhileStatement")
+
+
+@ast_rule(
+    "NESTED_LOOP", "medium", "performance",
+    "Nested loop detected",
+    "Nested loops can lead to O(n^2) or worse time complexity - verify this scales for expected input size",
+    python=(ast.For, ast.While), javascript=_JS_LOOPS, on="exit",
+)
+def nested_loop(node, ctx) -> None:
+    # Reported once per outer loop, on the loop itself
+    loop = ctx.record
+    if loop.nested:
+        ctx.report("NESTED_LOOP", loop.line)
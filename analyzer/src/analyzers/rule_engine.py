@@ -0,0 +1,107 @@
+"""
+Pluggable AST rules. Analyzer modules declare each rule with @ast_rule,
+naming the node types it handles per language; the engine indexes handlers
+by node type, so a parser's one traversal of a tree runs every interested
+rule at each node with a single dict lookup. A new rule costs a handler
+call on the nodes it asked for, never another walk of the tree.
+
+Handlers run as handler(node, ctx) either on entering a node or, with
+on="exit", on leaving it, once its subtree has been walked. Visitors hand
+them what they computed for the node in ctx.record:
+
+    function nodes (exit)   the function's metrics (name, line_start,
+                            complexity, cognitive_complexity, lines_of_code)
+    class nodes             the class's metrics (name, line_start, methods)
+    loop nodes (exit)       a LoopFrame
+
+Findings come out ordered by rule group (groups in order of first
+registration), then by the node's position in the visitor's walk. A rule is
+its own group unless it names one; rules sharing a group interleave.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .rule_table import Finding, register_rule
+
+LANGUAGES = ("python", "javascript")
+
+Handler = Callable[[Any, "RuleContext"], None]
+
+
+class RuleIndex:
+    """One language's rules: node type -> handlers, on entering and on leaving"""
+
+    def __init__(self):
+        self.enter: Dict[Any, Tuple[Handler, ...]] = {}
+        self.exit: Dict[Any, Tuple[Handler, ...]] = {}
+        # rule_id -> position of its group
+        self.groups: Dict[str, int] = {}
+        self._group_positions: Dict[str, int] = {}
+
+    def add(self, rule_id: str, group: str, node_types: Iterable[Any], on: str, handler: Handler) -> None:
+        if on not in ("enter", "exit"):
+            raise ValueError(f"on must be 'enter' or 'exit', not {on!r}")
+        table = self.enter if on == "enter" else self.exit
+        for node_type in node_types:
+            table[node_type] = table.get(node_type, ()) + (handler,)
+        self.groups[rule_id] = self._group_positions.setdefault(group, len(self._group_positions))
+
+
+_INDEXES: Dict[str, RuleIndex] = {language: RuleIndex() for language in LANGUAGES}
+
+
+def ast_rule(rule_id: str, severity: str, category: str, title: str, description: str, *,
+             python: Iterable[Any] = (), javascript: Iterable[str] = (),
+             on: str = "enter", group: Optional[str] = None) -> Callable[[Handler], Handler]:
+    """Register the decorated handler for rule_id on the given node types:
+    ast classes for python, ESTree type names for javascript (which covers
+    TypeScript too). The metadata goes to the shared rule table."""
+    register_rule(rule_id, severity, category, title, description)
+
+    def decorator(handler: Handler) -> Handler:
+        for language, node_types in (("python", python), ("javascript", javascript)):
+            if node_types:
+                _INDEXES[language].add(rule_id, group or rule_id, node_types, on, handler)
+        return handler
+
+    return decorator
+
+
+def rules_for(language: str) -> RuleIndex:
+    return _INDEXES[language]
+
+
+def js_line(node) -> int:
+    """Start line of an ESTree node, 0 when it has no location"""
+    return node.loc.start.line if node.loc is not None else 0
+
+
+class LoopFrame:
+    """A loop being walked; nested is set once any loop opens inside it"""
+    __slots__ = ("line", "nested")
+
+    def __init__(self, line: int):
+        self.line = line
+        self.nested = False
+
+
+class RuleContext:
+    """Per-traversal state for handlers. Before each dispatch the visitor sets
+    key (the node's walk-order sort key), record and, for python, depth (0
+    for the module)."""
+    __slots__ = ("rules", "key", "depth", "record", "_hits")
+
+    def __init__(self, rules: RuleIndex):
+        self.rules = rules
+        self.key: Any = None
+        self.depth = 0
+        self.record: Any = None
+        self._hits: List[tuple] = []
+
+    def report(self, rule_id: str, line: Optional[int], severity: Optional[str] = None,
+               args: Optional[Dict[str, Any]] = None) -> None:
+        hits = self._hits
+        hits.append((self.rules.groups[rule_id], self.key, len(hits), Finding(rule_id, line, severity, args)))
+
+    def findings(self) -> List[Finding]:
+        self._hits.sort(key=lambda hit: hit[:3])
+        return [hit[3] for hit in self._hits]
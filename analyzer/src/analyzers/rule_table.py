@@ -0,0 +1,114 @@
+"""
+Shared metadata for every static rule, keyed by rule_id. Findings carry only
+what varies per hit (rule, line, a severity override, template arguments)
+and look the rest up here, so thousands of VAR_USAGE hits don't each carry
+their own copy of the same title and recommendation.
+
+Titles and descriptions are str.format templates over a finding's args,
+e.g. "Long function '{name}'" with args {"name": "load"}.
+"""
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class Rule:
+    __slots__ = ("rule_id", "severity", "category", "title", "description")
+
+    def __init__(self, rule_id: str, severity: str, category: str, title: str, description: str):
+        self.rule_id = rule_id
+        self.severity = severity
+        self.category = category
+        self.title = title
+        self.description = description
+
+    def _key(self):
+        return (self.rule_id, self.severity, self.category, self.title, self.description)
+
+    def as_dict(self) -> Dict[str, str]:
+        return {
+            "severity": self.severity,
+            "category": self.category,
+            "title": self.title,
+            "description": self.description,
+        }
+
+
+RULES: Dict[str, Rule] = {}
+
+
+def register_rule(rule_id: str, severity: str, category: str, title: str, description: str) -> Rule:
+    """Add a rule to the table. Registering the same rule again is a no-op;
+    reusing a rule_id for different metadata is an error."""
+    rule = Rule(sys.intern(rule_id), severity, category, title, description)
+    existing = RULES.get(rule_id)
+    if existing is not None:
+        if existing._key() != rule._key():
+            raise ValueError(f"Conflicting definitions for rule {rule_id}")
+        return existing
+    RULES[rule.rule_id] = rule
+    return rule
+
+
+def get_rule(rule_id: str) -> Rule:
+    rule = RULES.get(rule_id)
+    if rule is None:
+        # e.g. a stored result from before a rule was removed
+        rule = Rule(rule_id, "low", "quality", rule_id, "")
+    return rule
+
+
+def rule_table(rule_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """Metadata for the given rules, once each, for API responses"""
+    return {rule_id: get_rule(rule_id).as_dict() for rule_id in dict.fromkeys(rule_ids)}
+
+
+class Finding:
+    """One rule hit. severity is None unless it differs from the rule's
+    default; args fill the rule's title/description templates."""
+    __slots__ = ("rule_id", "line", "severity", "args")
+
+    def __init__(self, rule_id: str, line: Optional[int], severity: Optional[str] = None,
+                 args: Optional[Dict[str, Any]] = None):
+        self.rule_id = rule_id
+        self.line = line
+        self.severity = severity
+        self.args = args or None
+
+    @property
+    def rule(self) -> Rule:
+        return get_rule(self.rule_id)
+
+    @property
+    def category(self) -> str:
+        return self.rule.category
+
+    @property
+    def effective_severity(self) -> str:
+        return self.severity or self.rule.severity
+
+    @property
+    def title(self) -> str:
+        title = self.rule.title
+        return title.format(**self.args) if self.args else title
+
+    @property
+    def description(self) -> str:
+        description = self.rule.description
+        return description.format(**self.args) if self.args else description
+
+    def pack(self) -> List[Any]:
+        """[rule_id, line, severity, args], trailing Nones dropped"""
+        row = [self.rule_id, self.line, self.severity, self.args]
+        while row[-1] is None:
+            row.pop()
+        return row
+
+    @classmethod
+    def unpack(cls, row: List[Any]) -> "Finding":
+        severity = row[2] if len(row) > 2 else None
+        return cls(
+            sys.intern(row[0]),
+            row[1] if len(row) > 1 else None,
+            sys.intern(severity) if severity else None,
+            row[3] if len(row) > 3 else None,
+        )
@@ -5,15 +5,21 @@ is actually present in the file at that line. False positives are possible
 (e.g. a variable named 'password' holding a non-secret test fixture), but
 false claims about content that isn't there are not.
 """
+import hashlib
 import re
-from typing import Dict, List, Any
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from .rule_table import Finding, register_rule
 
 _PLACEHOLDER_RE = re.compile(
     r"^(changeme|change_me|your[-_].*|xxx+|<.*>|example|placeholder|test|todo|dummy|fake|sample|\*+)$",
     re.IGNORECASE,
 )
 
-# Each rule tuple: (rule_id, severity, category, title, description, regex, languages)
+# Each rule tuple: (rule_id, severity, category, title, description, regex, triggers, languages)
+# triggers are literals at least one of which must occur in a file for the regex
+# to have any chance of matching (case-insensitively if the regex is).
 # languages=None means the rule applies regardless of file extension.
 _RULES = [
     (
@@ -26,6 +32,7 @@ _RULES = [
                 ["']([A-Za-z0-9+/=_\-\.]{8,})["']""",
             re.VERBOSE,
         ),
+        ("key", "token", "passw", "secret"),
         None,
     ),
     (
@@ -33,6 +40,7 @@ _RULES = [
         "AWS access key literal detected",
         "Rotate this key immediately if it is real, and load credentials via environment variables or an IAM role instead",
         re.compile(r"AKIA[0-9A-Z]{16}"),
+        ("AKIA",),
         None,
     ),
     (
@@ -40,6 +48,7 @@ _RULES = [
         "Use of eval()/exec() on potentially untrusted input",
         "eval/exec can execute arbitrary code - validate this isn't reachable with user-controlled input, or remove it",
         re.compile(r"\b(eval|exec)\s*\("),
+        ("eval", "exec"),
         {"python"},
     ),
     (
@@ -47,6 +56,7 @@ _RULES = [
         "Use of eval() or new Function() with dynamic code",
         "Dynamic code execution is a common injection vector - avoid eval/new Function on untrusted input",
         re.compile(r"\b(eval|new\s+Function)\s*\("),
+        ("eval", "Function"),
         {"javascript", "typescript"},
     ),
     (
@@ -54,6 +64,7 @@ _RULES = [
         "Insecure deserialization (pickle)",
         "pickle.loads on untrusted data can execute arbitrary code - use JSON or a safe serialization format instead",
         re.compile(r"\bpickle\.loads?\s*\("),
+        ("pickle.load",),
         {"python"},
     ),
     (
@@ -61,6 +72,7 @@ _RULES = [
         "yaml.load without a safe Loader",
         "yaml.load() without Loader=yaml.SafeLoader can execute arbitrary Python objects - use yaml.safe_load() instead",
         re.compile(r"yaml\.load\s*\((?!.*SafeLoader)"),
+        ("yaml.load",),
         {"python"},
     ),
     (
@@ -68,6 +80,7 @@ _RULES = [
         "Possible SQL injection via string interpolation",
         "Query built with an f-string or string concatenation instead of parameterized query - use placeholders (%s, ?) with bound parameters",
         re.compile(r"\.(execute|executemany)\s*\(\s*f[\"']"),
+        (".execute",),
         {"python"},
     ),
     (
@@ -75,6 +88,7 @@ _RULES = [
         "Possible SQL injection via string concatenation",
         "Query string built with '+' concatenation - use parameterized queries instead",
         re.compile(r"\.(execute|executemany)\s*\([^)]*\+\s*\w"),
+        (".execute",),
         {"python"},
     ),
     (
@@ -82,6 +96,7 @@ _RULES = [
         "Possible SQL injection via template literal",
         "Query built with a template literal containing ${...} - use a parameterized query builder instead",
         re.compile(r"\.(query|execute)\s*\(\s*`[^`]*\$\{"),
+        (".query", ".execute"),
         {"javascript", "typescript"},
     ),
     (
@@ -89,6 +104,7 @@ _RULES = [
         "subprocess call with shell=True",
         "shell=True combined with any user-influenced input allows command injection - avoid it or strictly validate input",
         re.compile(r"subprocess\.(run|call|Popen|check_output)\([^)]*shell\s*=\s*True"),
+        ("subprocess.",),
         {"python"},
     ),
     (
@@ -96,6 +112,7 @@ _RULES = [
         "os.system() call",
         "os.system() passes strings to the shell - prefer subprocess with a list of arguments and shell=False",
         re.compile(r"\bos\.system\s*\("),
+        ("os.system",),
         {"python"},
     ),
     (
@@ -103,6 +120,7 @@ _RULES = [
         "exec() with dynamic/unsanitized input",
         "Passing interpolated input to a shell exec call allows command injection - use execFile with an argument array instead",
         re.compile(r"\bexec\s*\(\s*`[^`]*\$\{"),
+        ("exec",),
         {"javascript", "typescript"},
     ),
     (
@@ -110,43 +128,205 @@ _RULES = [
         "Weak hash algorithm (MD5/SHA1)",
         "MD5 and SHA1 are broken for security purposes - use SHA-256+ for integrity checks, or bcrypt/argon2 for passwords",
         re.compile(r"hashlib\.(md5|sha1)\s*\(|createHash\s*\(\s*[\"'](md5|sha1)[\"']"),
+        ("md5", "sha1"),
         None,
     ),
 ]
 
 
-def scan(file_path: str, content: str) -> List[Dict[str, Any]]:
-    """Scan raw source text for concrete security anti-patterns. Returns a list
-    of issue dicts, each tied to a real line in the file."""
-    issues: List[Dict[str, Any]] = []
-    lines = content.split("\n")
+# Changes whenever a rule is added, removed or edited, so cached scan results
+# from an older rule set are never reused
+RULESET_VERSION = hashlib.sha256(repr([
+    (rule_id, severity, category, title, description, pattern.pattern, pattern.flags, sorted(languages or ()))
+    for rule_id, severity, category, title, description, pattern, _, languages in _RULES
+]).encode("utf-8")).hexdigest()[:16]
+
+# Titles and recommendations are served from the shared rule table
+for _rule in _RULES:
+    register_rule(*_rule[:5])
+del _rule
+
+_EXTENSION_LANGUAGES = {"py": "python", "js": "javascript", "jsx": "javascript",
+                        "ts": "typescript", "tsx": "typescript"}
+
+
+class _CompiledRule:
+    """A rule with its prefilter resolved, ready to run against a whole file"""
+    __slots__ = ("rule_id", "pattern", "triggers", "folded")
+
+    def __init__(self, rule_id, pattern, triggers):
+        self.rule_id = rule_id
+        self.pattern = pattern
+        # Case-insensitive rules look for their (lowercase) triggers in the
+        # casefolded file. Every character IGNORECASE equates with a trigger
+        # letter casefolds to that letter, so no real match is ever skipped.
+        self.folded = bool(pattern.flags & re.IGNORECASE)
+        self.triggers = tuple(t.casefold() for t in triggers) if self.folded else triggers
+
+
+def _compile_bundle(lang: Optional[str]) -> Tuple[_CompiledRule, ...]:
+    return tuple(
+        _CompiledRule(rule_id, pattern, triggers)
+        for rule_id, _, _, _, _, pattern, triggers, languages in _RULES
+        if languages is None or lang in languages
+    )
+
+
+# Per-language rule bundles, in _RULES order so findings keep their ordering.
+# Unknown extensions (lang=None) only get the language-agnostic rules.
+_BUNDLES: Dict[Optional[str], Tuple[_CompiledRule, ...]] = {
+    lang: _compile_bundle(lang)
+    for lang in (None, *sorted(set(_EXTENSION_LANGUAGES.values())))
+}
+
+
+class _LineIndex:
+    """Newline offsets of a buffer, for mapping match offsets to line numbers"""
+
+    def __init__(self, buffer: str):
+        self.buffer = buffer
+        newlines = []
+        pos = buffer.find("\n")
+        while pos != -1:
+            newlines.append(pos)
+            pos = buffer.find("\n", pos + 1)
+        self.newlines = newlines
+
+    def line_end(self, line_idx: int) -> int:
+        return self.newlines[line_idx] if line_idx < len(self.newlines) else len(self.buffer)
+
+    def line(self, line_idx: int) -> str:
+        start = self.newlines[line_idx - 1] + 1 if line_idx else 0
+        return self.buffer[start:self.line_end(line_idx)]
+
+    def lines_containing(self, literals: Tuple[str, ...]) -> List[int]:
+        """0-based indexes of the lines holding any of the literals, ascending"""
+        found = set()
+        for literal in literals:
+            pos = self.buffer.find(literal)
+            while pos != -1:
+                line_idx = bisect_left(self.newlines, pos)
+                found.add(line_idx)
+                pos = self.buffer.find(literal, self.line_end(line_idx) + 1)
+        return sorted(found)
+
+
+# Larger inputs are scanned in line-aligned chunks of about this many
+# characters, so the casefolded copy and newline offsets never cover more
+# than one chunk
+SCAN_CHUNK_CHARS = 1 << 20
+
+
+def _bundle_for(file_path: str) -> Tuple[_CompiledRule, ...]:
     ext = file_path.rsplit(".", 1)[-1].lower() if "." in file_path else ""
-    lang = {"py": "python", "js": "javascript", "jsx": "javascript",
-            "ts": "typescript", "tsx": "typescript"}.get(ext)
+    return _BUNDLES[_EXTENSION_LANGUAGES.get(ext)]
+
+
+def _scan_block(bundle: Tuple[_CompiledRule, ...], content: str, line_offset: int,
+                found: List[List[Finding]]) -> None:
+    """Append each rule's findings in content to found[rule position],
+    numbering lines from line_offset + 1.
 
-    for rule_id, severity, category, title, description, pattern, languages in _RULES:
-        if languages is not None and lang not in languages:
+    Rather than running every regex over every line, each rule's trigger
+    literals are located in the whole buffer and only the lines holding one
+    are searched. A rule can only match a line containing one of its
+    triggers, so findings are identical to a full line-by-line scan."""
+    index = folded_index = None
+
+    for position, rule in enumerate(bundle):
+        if rule.folded:
+            if folded_index is None:
+                # casefold() never creates or drops a newline, so line
+                # numbers in the folded copy match the original
+                folded_index = _LineIndex(content.casefold())
+            candidates = folded_index.lines_containing(rule.triggers)
+        else:
+            if not any(t in content for t in rule.triggers):
+                continue
+            if index is None:
+                index = _LineIndex(content)
+            candidates = index.lines_containing(rule.triggers)
+        if not candidates:
             continue
+        if index is None:
+            index = _LineIndex(content)
 
-        for line_no, line in enumerate(lines, start=1):
-            match = pattern.search(line)
+        for line_idx in candidates:
+            line = index.line(line_idx)
+            match = rule.pattern.search(line)
             if not match:
                 continue
 
-            if rule_id == "HARDCODED_SECRET":
+            if rule.rule_id == "HARDCODED_SECRET":
                 value = match.group(2)
                 if _PLACEHOLDER_RE.match(value) or "getenv" in line or "process.env" in line:
                     continue
 
-            issues.append({
-                "severity": severity,
-                "category": category,
-                "title": title,
-                "description": description,
-                "file": file_path,
-                "line": line_no,
-                "rule_id": rule_id,
-                "source": "static",
-            })
-
-    return issues
\ No newline at end of file
+            found[position].append(Finding(rule.rule_id, line_offset + line_idx + 1))
+
+
+class ChunkedScanner:
+    """Incremental scan of text fed in arbitrary pieces (e.g. as it is
+    decoded off the network). Pieces are buffered up to chunk_chars, then
+    everything before the last newline is scanned and the unterminated
+    line carries over into the next chunk with a running line offset.
+
+    Every rule matches within a single line, so findings - and their
+    order, rule by rule - are identical to scan() over the whole text.
+    Memory stays proportional to chunk_chars, or to the longest line when
+    a line (minified code) is longer than that."""
+
+    def __init__(self, file_path: str, chunk_chars: int = SCAN_CHUNK_CHARS):
+        self.chunk_chars = chunk_chars
+        self._bundle = _bundle_for(file_path)
+        self._found: List[List[Finding]] = [[] for _ in self._bundle]
+        self._pending: List[str] = []
+        self._pending_chars = 0
+        # Whether _pending holds a newline, i.e. a complete line to scan.
+        # Checked per piece, so a long unterminated line is buffered without
+        # rejoining it on every feed.
+        self._has_line = False
+        self._lines_done = 0
+
+    def feed(self, text: str) -> None:
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if not self._has_line:
+            self._has_line = "\n" in text
+        if self._has_line and self._pending_chars >= self.chunk_chars:
+            self._flush()
+
+    def _flush(self) -> None:
+        buffer = "".join(self._pending)
+        cut = buffer.rfind("\n")
+        block, rest = buffer[:cut], buffer[cut + 1:]
+        self._pending = [rest]
+        self._pending_chars = len(rest)
+        self._has_line = False
+        _scan_block(self._bundle, block, self._lines_done, self._found)
+        self._lines_done += block.count("\n") + 1
+
+    def finish(self) -> List[Finding]:
+        _scan_block(self._bundle, "".join(self._pending), self._lines_done, self._found)
+        self._pending = []
+        self._pending_chars = 0
+        self._has_line = False
+        return [finding for rule_findings in self._found for finding in rule_findings]
+
+
+def scan(file_path: str, content: str) -> List[Finding]:
+    """Scan raw source text for concrete security anti-patterns. Returns a list
+    of findings, each tied to a real line in the file; titles and
+    recommendations live in the shared rule table. file_path only selects
+    the language-specific rules. Content over SCAN_CHUNK_CHARS goes through
+    ChunkedScanner with the same result."""
+    if len(content) > SCAN_CHUNK_CHARS:
+        scanner = ChunkedScanner(file_path)
+        for start in range(0, len(content), SCAN_CHUNK_CHARS):
+            scanner.feed(content[start:start + SCAN_CHUNK_CHARS])
+        return scanner.finish()
+
+    bundle = _bundle_for(file_path)
+    found: List[List[Finding]] = [[] for _ in bundle]
+    _scan_block(bundle, content, 0, found)
+    return [finding for rule_findings in found for finding in rule_findings]
@@ -1,11 +1,20 @@
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
+import httpx
 import structlog
 from contextlib import asynccontextmanager
 
 from src.config.settings import settings
-from src.api.routes import router
+from src.api.routes import (
+    HostLimits, analysis_results, batch_results, router, create_queue_consumer, scrape_metrics,
+    stop_batch_feeders,
+)
+from src.workers.analysis_worker import create_process_pool
+from src.parsers.babel_worker_pool import configure_babel_pool
+from src.llm.llm_client import close_llm_client
+from src.utils import telemetry
 
 # Configure structured logging
 structlog.configure(
@@ -23,7 +32,44 @@ logger = structlog.get_logger()
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     logger.info("Starting CodeSage Analyzer API")
-    yield
+    # One pooled client for the whole process, so GitHub TLS handshakes and
+    # connections are reused across files and analyses
+    async with httpx.AsyncClient(
+        timeout=settings.HTTP_TIMEOUT_SECONDS,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    ) as http_client:
+        app.state.http_client = http_client
+        # Per-host request limits shared by every analysis, created on this lifespan's loop
+        app.state.host_limits = HostLimits(settings.GITHUB_FETCH_CONCURRENCY)
+        # This process' Babel pool serves the in-process fallback; pool workers get their own
+        babel_pool = {
+            "size": settings.BABEL_WORKERS_PER_PROCESS,
+            "timeout_seconds": settings.BABEL_TIMEOUT_SECONDS,
+            "max_queue": settings.BABEL_MAX_QUEUE,
+        }
+        configure_babel_pool(**babel_pool)
+        # CPU-bound parsing/scanning runs here instead of on the event loop
+        app.state.process_pool = create_process_pool(settings.MAX_CONCURRENT_ANALYSES, babel_pool)
+        # At most MAX_CONCURRENT_ANALYSES run at once; the rest wait in the queue
+        app.state.queue_consumer = create_queue_consumer(
+            http_client, app.state.process_pool, app.state.host_limits,
+        )
+        app.state.queue_consumer.start()
+        try:
+            yield
+        finally:
+            # Feeders first, so nothing submits to a stopped queue
+            await stop_batch_feeders()
+            await app.state.queue_consumer.stop()
+            app.state.process_pool.shutdown(wait=False, cancel_futures=True)
+            await close_llm_client()
+            # Results evicted just before shutdown are still being written
+            for store in (analysis_results, batch_results):
+                await asyncio.to_thread(store.flush)
     logger.info("Shutting down CodeSage Analyzer API")
 
 
@@ -54,13 +100,24 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of stage/file/LLM timings and counters"""
+    consumer = getattr(app.state, "queue_consumer", None)
+    return PlainTextResponse(
+        telemetry.render(scrape_metrics(consumer)),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @app.get("/")
 async def root():
     """Root endpoint"""
     return {
         "message": "CodeSage Analyzer API",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "metrics": "/metrics"
     }
 
 
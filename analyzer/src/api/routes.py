@@ -1,46 +1,161 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Optional, List, Dict, Set, Union
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import tarfile
 import uuid
 import os
 import json
 import re
+import time
 import httpx
+import structlog
 
-from src.parsers.python_parser import PythonParser
-from src.parsers.javascript_parser import JavaScriptParser
 from src.analyzers import security_analyzer
+from src.analyzers.rule_table import Finding, rule_table
 from src.metrics import quality_score
+from src.metrics.code_metrics import RepoMetrics
+from src.api.schemas import MetricSchema
+from src.config.settings import settings
+from src.utils.cache import TieredCache, content_key
+from src.utils.deadline import Deadline, DeadlineExceeded
+from src.utils.result_store import ResultStore
+from src.utils.progress import ProgressHub
+from src.utils.telemetry import (
+    FILE_SECONDS, FILES_ANALYZED, current_trace, stage, trace_analysis,
+)
+from src.utils.file_processor import (
+    SelectionBudget, fetch_archive_files, is_analyzable_path, language_for, select_files,
+)
+from src.utils.git_helper import GitError, load_git_files
+from src.workers.analysis_worker import (
+    STREAM_CHUNK_SIZE, LargeFileAnalysis, analyze_binary_stream, analyze_file, analyze_file_profiled,
+)
+from src.workers.queue_consumer import AnalysisJob, JobQueue, QueueConsumer, QueueFull
+from src.llm.llm_client import get_llm_client
 
 router = APIRouter()
+logger = structlog.get_logger()
 
-analysis_results = {}
+analysis_results = ResultStore(
+    max_entries=settings.RESULT_STORE_MAX_ENTRIES,
+    max_bytes=settings.RESULT_STORE_MAX_BYTES,
+    ttl_seconds=settings.RESULT_STORE_TTL_SECONDS,
+    path=settings.RESULT_STORE_PATH or None,
+)
+
+# Live stage/file events behind GET /analyze/{id}/stream
+progress_hub = ProgressHub()
+
+# Submitted analyses wait here for one of the app's queue consumers
+job_queue = JobQueue(max_size=settings.ANALYSIS_QUEUE_MAX_SIZE)
+
+# batch_id -> {"batch_id", "created_at", "analyses": [{"repo_url", "analysis_id"}]}
+batch_results = ResultStore(
+    max_entries=settings.RESULT_STORE_MAX_ENTRIES,
+    max_bytes=settings.RESULT_STORE_MAX_BYTES,
+    ttl_seconds=settings.RESULT_STORE_TTL_SECONDS,
+    path=settings.RESULT_STORE_PATH or None,
+    table="batches",
+)
+
+# Batches only ever fill this share of the queue, so interactive submissions
+# still find room while a large batch drains
+BATCH_QUEUE_SHARE = 0.5
+# Running _feed_batch tasks; cancelled at shutdown by stop_batch_feeders
+_batch_feeders: Set[asyncio.Task] = set()
 
-MAX_FILES_TO_ANALYZE = 8
 MAX_FILE_BYTES = 40_000
 
-# Extension -> language label. Anything not in here still gets a raw
-# security_analyzer.scan pass, just no AST-level parsing.
-LANGUAGE_EXTENSIONS = {
-    ".py": "python",
-    ".js": "javascript",
-    ".jsx": "javascript",
-    ".ts": "typescript",
-    ".tsx": "typescript",
-}
+# Archive and git ingestion cost one request (or none) however many files
+# they yield, so their selection budget allows far more files and their size
+# cap is far higher than the per-file raw fetch above
+ARCHIVE_MAX_FILES = 1000
+ARCHIVE_MAX_FILE_BYTES = 200_000
+
+# Files over the caps above but within this size are streamed instead of
+# skipped: line counts and the security scan run chunk by chunk as the file
+# downloads (or comes out of git), without an AST parse, so memory stays proportional to the chunk
+# size. They compete for the selection budget like any file.
+STREAM_MAX_FILE_BYTES = 20_000_000
+
+# Bump whenever parser output or the per-file record shape changes, so stale
+# cached records are never served. Security rule edits are covered
+# automatically by security_analyzer.RULESET_VERSION.
+FILE_ANALYSIS_VERSION = "5"
+
+file_cache = TieredCache(
+    max_entries=settings.FILE_CACHE_MAX_ENTRIES,
+    directory=settings.FILE_CACHE_DIR,
+    ttl_seconds=settings.CACHE_TTL_SECONDS,
+    max_disk_bytes=settings.FILE_CACHE_MAX_DISK_BYTES,
+) if settings.ENABLE_FILE_CACHE else None
 
+# Per-repo record of the last analysis (blob SHA + result for every selected
+# file), which incremental runs diff the new tree against
+snapshot_cache = TieredCache(
+    max_entries=settings.SNAPSHOT_CACHE_MAX_ENTRIES,
+    directory=settings.SNAPSHOT_CACHE_DIR,
+    ttl_seconds=settings.SNAPSHOT_CACHE_TTL_SECONDS,
+    max_disk_bytes=settings.SNAPSHOT_CACHE_MAX_DISK_BYTES,
+)
+
+DEFAULT_REFS = ("main", "master")
+
+# Queued attempts are killed this long after ANALYSIS_TIMEOUT_SECONDS, a
+# backstop for a stage that doesn't honour the deadline; normally the
+# pipeline stops itself at the deadline and stores a partial result
+DEADLINE_GRACE_SECONDS = 30
+
+# Share of the time left that fetching, then analysis, may use before moving
+# on, so a hung download leaves time to analyze what did arrive and both
+# leave time for the LLM review
+FETCH_DEADLINE_SHARE = 0.5
+ANALYZE_DEADLINE_SHARE = 0.8
+
+# The LLM context never reads past this many characters of any one file, so
+# incremental snapshots only keep that much source per file
+CODE_CONTEXT_CHARS = 6000
 
 class AnalysisRequest(BaseModel):
     repo_url: str
     language: Optional[str] = "auto"
     analyze_security: Optional[bool] = True
     analyze_performance: Optional[bool] = True
+    ingestion: Optional[str] = "raw"  # "raw" (tree + per-file fetch), "archive" (one tarball) or "git" (mirror/local repo)
+    commit_sha: Optional[str] = None  # analyze this commit (any ref for "git") instead of the default branch
+    incremental: Optional[bool] = False  # raw ingestion only (422 otherwise): re-analyze just the blobs changed since the last run
+    priority: Optional[int] = 0  # higher is picked up sooner when analyses are queued
+    profile: Optional[bool] = False  # profile each stage (files in the workers) and store hot spots; needs ALLOW_PROFILING
+    time_budget_seconds: Optional[float] = None  # estimated fetch + analysis time to select files for; default SELECTION_TIME_BUDGET_SECONDS
+    byte_budget: Optional[int] = None  # total source bytes to select; default SELECTION_BYTE_BUDGET
 
 class AnalysisResponse(BaseModel):
     analysis_id: str
     status: str
     message: str
 
+class BatchAnalysisRequest(BaseModel):
+    repo_urls: List[str]
+    language: Optional[str] = "auto"
+    ingestion: Optional[str] = "raw"
+    incremental: Optional[bool] = False
+    priority: Optional[int] = -1  # behind interactive analyses by default
+
+class BatchAnalysisEntry(BaseModel):
+    repo_url: str
+    analysis_id: str
+
+class BatchAnalysisResponse(BaseModel):
+    batch_id: str
+    status: str
+    analyses: List[BatchAnalysisEntry]
+
 class Issue(BaseModel):
     type: str
     severity: str
@@ -49,20 +164,65 @@ class Issue(BaseModel):
     message: str
     recommendation: str
     source: Optional[str] = "static"
+    rule_id: Optional[str] = None
+
+class CompactIssue(BaseModel):
+    """A static issue by reference: its text is in the response's rules table"""
+    rule_id: str
+    severity: str
+    file: str
+    line: Optional[int] = None
+    args: Optional[Dict[str, Any]] = None  # fills the rule's title/description templates
+    source: Optional[str] = "static"
+
+class RuleInfo(BaseModel):
+    severity: str  # default; an issue's own severity can be higher
+    category: str
+    title: str
+    description: str
 
 class AnalysisResult(BaseModel):
     analysis_id: str
     status: str
     repo_url: str
     score: Optional[int] = None
-    issues: List[Issue] = []
+    issues: List[Union[Issue, CompactIssue]] = []
+    rules: Optional[Dict[str, RuleInfo]] = None  # only with ?compact=true
     summary: str = ""
     files_analyzed: List[str] = []
+    llm_cache_hit: Optional[bool] = None
+    maintainability_index: Optional[float] = None  # LOC-weighted, 0-100; see metrics.maintainability
+    metrics: List[MetricSchema] = []  # repo-level function metrics; see metrics.code_metrics
+    timings: Optional[Dict[str, Any]] = None  # {"total_ms", "stages": [...], "files": [...]}
+    profile: Optional[Dict[str, Any]] = None  # {"top_n", "stages": {"fetch" | "analyze" | "llm" | ...: {"files", "functions", "allocations", ...}}}
+    selection: Optional[Dict[str, Any]] = None  # {"candidates", "selected", "bytes", "estimated_seconds", "languages", "budget"}
+    skipped: Optional[Dict[str, Any]] = None  # status "partial" only: {"timeout_seconds", "stages", "files"}
+
+class BatchRepoResult(BaseModel):
+    analysis_id: str
+    repo_url: str
+    status: str
+    score: Optional[int] = None
+    issue_count: int = 0
+    summary: str = ""
+    issues: Optional[List[Union[Issue, CompactIssue]]] = None
+
+class BatchResult(BaseModel):
+    batch_id: str
+    status: str  # processing, completed (every repo), partial (some results missing or cut short), failed (none)
+    counts: Dict[str, int]
+    average_score: Optional[float] = None
+    results: List[BatchRepoResult]
+    rules: Optional[Dict[str, RuleInfo]] = None
+
+
+_GITHUB_REPO_URL = re.compile(r"https?://(?:www\.)?github\.com/([\w.-]+)/([\w.-]+?)(?:\.git)?/?", re.IGNORECASE)
 
 
 def _parse_owner_repo(repo_url: str):
-    match = re.search(r"github\.com/([^/]+)/([^/]+?)(?:\.git)?/?$", repo_url.strip())
-    if not match:
+    """(owner, repo) of a plain https://github.com/<owner>/<repo> URL, else (None, None)"""
+    match = _GITHUB_REPO_URL.fullmatch(repo_url.strip())
+    if not match or match.group(1) in (".", "..") or match.group(2) in (".", ".."):
         return None, None
     return match.group(1), match.group(2)
 
@@ -75,55 +235,201 @@ def _github_headers():
     return headers
 
 
-async def _fetch_source_files(owner: str, repo: str, client: httpx.AsyncClient):
-    """Fetch up to MAX_FILES_TO_ANALYZE real source files (any supported language)
-    from the repo's default branch."""
-    files = []
-    for branch in ("main", "master"):
-        try:
-            tree_resp = await client.get(
-                f"https://api.github.com/repos/{owner}/{repo}/git/trees/{branch}",
-                params={"recursive": "1"},
-                headers=_github_headers(),
-            )
-        except httpx.HTTPError as e:
-            print(f"GitHub tree fetch error ({branch}): {e}")
-            continue
+class HostLimits:
+    """Per-host limits on in-flight requests, shared by every analysis run
+    with it. The app creates one per lifespan (app.state.host_limits), so its
+    semaphores belong to that lifespan's event loop; calling it with a host
+    gives that host's semaphore."""
 
-        if tree_resp.status_code == 403 and "rate limit" in tree_resp.text.lower():
-            print("GitHub API rate limit hit while fetching tree")
-            raise RuntimeError("github_rate_limited")
+    def __init__(self, per_host: int):
+        self.per_host = per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
 
-        if tree_resp.status_code != 200:
-            continue
+    def __call__(self, host: str) -> asyncio.Semaphore:
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self._semaphores[host]
 
-        tree = tree_resp.json().get("tree", [])
-        entries = [
-            item for item in tree
-            if item.get("type") == "blob"
-            and os.path.splitext(item.get("path", ""))[1] in LANGUAGE_EXTENSIONS
-            and item.get("size", 0) <= MAX_FILE_BYTES
-            and "node_modules" not in item["path"]
-            and not item["path"].startswith(("dist/", "build/", ".venv/"))
-        ]
-        # Prioritize non-test files, spread across languages rather than
-        # grabbing 8 files of the same type
-        entries.sort(key=lambda i: ("test" in i["path"].lower(), i["path"]))
-        selected = entries[:MAX_FILES_TO_ANALYZE]
 
-        for entry in selected:
-            raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{entry['path']}"
-            try:
-                file_resp = await client.get(raw_url)
-                if file_resp.status_code == 200:
-                    ext = os.path.splitext(entry["path"])[1]
-                    files.append({
-                        "path": entry["path"],
-                        "content": file_resp.text,
-                        "language": LANGUAGE_EXTENSIONS[ext],
-                    })
-            except httpx.HTTPError as e:
-                print(f"GitHub raw fetch error for {entry['path']}: {e}")
+# The running analysis' HostLimits; see _perform_analysis
+_host_limits: ContextVar[HostLimits] = ContextVar("host_limits")
+
+
+def _host_semaphore(host: str) -> asyncio.Semaphore:
+    """Per-host limit on in-flight requests, shared across all analyses
+    running with this one's HostLimits"""
+    return _host_limits.get()(host)
+
+
+async def _fetch_raw_file(owner: str, repo: str, branch: str, path: str, client: httpx.AsyncClient):
+    raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{path}"
+    try:
+        async with _host_semaphore("raw.githubusercontent.com"):
+            file_resp = await client.get(raw_url)
+        if file_resp.status_code == 200:
+            return {
+                "path": path,
+                "content": file_resp.text,
+                "language": language_for(path),
+            }
+    except httpx.HTTPError as e:
+        logger.warning("GitHub raw fetch failed", owner=owner, repo=repo, ref=branch, path=path, error=str(e))
+    return None
+
+
+def _selection_budget(time_budget_seconds: Optional[float] = None, byte_budget: Optional[int] = None,
+                      max_files: int = settings.SELECTION_MAX_FILES,
+                      seconds_per_file: float = settings.SELECTION_SECONDS_PER_FILE) -> SelectionBudget:
+    return SelectionBudget(
+        max_files,
+        max_bytes=byte_budget or settings.SELECTION_BYTE_BUDGET,
+        max_seconds=time_budget_seconds or settings.SELECTION_TIME_BUDGET_SECONDS,
+        seconds_per_file=seconds_per_file,
+        bytes_per_second=settings.SELECTION_BYTES_PER_SECOND,
+    )
+
+
+def _record_selection(candidates, selected, budget: SelectionBudget) -> None:
+    trace = current_trace()
+    if trace is None:
+        return
+    languages: Dict[str, int] = {}
+    for entry in selected:
+        language = language_for(entry["path"])
+        languages[language] = languages.get(language, 0) + 1
+    trace.selection = {
+        "candidates": len(candidates),
+        "selected": len(selected),
+        "bytes": sum(entry.get("size", 0) for entry in selected),
+        "estimated_seconds": round(sum(budget.seconds(entry.get("size", 0)) for entry in selected), 2),
+        "languages": languages,
+        "budget": budget.as_dict(),
+    }
+
+
+async def _fetch_tree_entries(owner: str, repo: str, ref: str, client: httpx.AsyncClient,
+                              budget: SelectionBudget, deadline: Deadline):
+    """The tree entries (path, sha, size, ...) budget selects for analysis at
+    ref, best first, or None if the ref doesn't exist or the tree can't be
+    fetched. Raises DeadlineExceeded if the deadline passes first."""
+    try:
+        with stage("github_tree"):
+            async with _host_semaphore("api.github.com"):
+                tree_resp = await deadline.wait_for(client.get(
+                    f"https://api.github.com/repos/{owner}/{repo}/git/trees/{ref}",
+                    params={"recursive": "1"},
+                    headers=_github_headers(),
+                ), "fetch")
+    except httpx.HTTPError as e:
+        logger.warning("GitHub tree fetch failed", owner=owner, repo=repo, ref=ref, error=str(e))
+        return None
+
+    if tree_resp.status_code == 403 and "rate limit" in tree_resp.text.lower():
+        logger.warning("GitHub API rate limit hit while fetching tree", owner=owner, repo=repo, ref=ref)
+        raise RuntimeError("github_rate_limited")
+
+    if tree_resp.status_code != 200:
+        return None
+
+    tree = tree_resp.json().get("tree", [])
+    candidates = [
+        item for item in tree
+        if item.get("type") == "blob"
+        and is_analyzable_path(item.get("path", ""))
+        and item.get("size", 0) <= STREAM_MAX_FILE_BYTES
+    ]
+    # Spread across directories and languages, as many as the budget allows
+    selected = select_files(candidates, budget)
+    _record_selection(candidates, selected, budget)
+    return selected
+
+
+def _is_large(entry) -> bool:
+    """Tree entries too large to fetch whole; see _stream_raw_file"""
+    return entry.get("size", 0) > MAX_FILE_BYTES
+
+
+def _fetch_entry(owner: str, repo: str, ref: str, entry, client: httpx.AsyncClient):
+    if _is_large(entry):
+        return _stream_raw_file(owner, repo, ref, entry, client)
+    return _fetch_raw_file(owner, repo, ref, entry["path"], client)
+
+
+async def _stream_raw_file(owner: str, repo: str, branch: str, entry, client: httpx.AsyncClient):
+    """Fetch and analyze a file over MAX_FILE_BYTES as it downloads (see
+    analysis_worker.LargeFileAnalysis). Returns a file dict holding only the
+    first CODE_CONTEXT_CHARS of content plus the finished record, or None.
+
+    Records are cached by blob SHA, since the content is never held to hash."""
+    path, sha = entry["path"], entry.get("sha")
+    lang = language_for(path)
+    started = time.perf_counter()
+    profiler = _profiler()
+    key = None
+    if file_cache is not None and sha:
+        key = content_key(FILE_ANALYSIS_VERSION, security_analyzer.RULESET_VERSION, "streamed", lang, sha)
+        # A profiled analysis analyzes every file, to profile it
+        cached = file_cache.get(key) if profiler is None else None
+        if cached is not None:
+            _observe_file(path, started, lang, True)
+            return {"path": path, "content": cached["head"], "language": lang, "record": cached["record"]}
+
+    analysis = LargeFileAnalysis(path, lang, CODE_CONTEXT_CHARS)
+    raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{path}"
+    try:
+        async with _host_semaphore("raw.githubusercontent.com"):
+            async with client.stream("GET", raw_url) as resp:
+                if resp.status_code != 200:
+                    return None
+                pending, pending_chars = [], 0
+                async for text in resp.aiter_text():
+                    pending.append(text)
+                    pending_chars += len(text)
+                    if pending_chars >= STREAM_CHUNK_SIZE:
+                        # Scanning a chunk is CPU work; keep it off the loop
+                        await asyncio.to_thread(_profiled, profiler, 0, analysis.feed, "".join(pending))
+                        pending, pending_chars = [], 0
+                _profiled(profiler, 0, analysis.feed, "".join(pending))
+    except httpx.HTTPError as e:
+        logger.warning("GitHub raw stream failed", owner=owner, repo=repo, ref=branch, path=path, error=str(e))
+        return None
+    record = await asyncio.to_thread(_profiled, profiler, 1, analysis.finish)
+
+    timings = record.pop("timings")
+    if key is not None:
+        file_cache.set(key, {"head": analysis.head, "record": record})
+    _observe_file(path, started, lang, False, timings)
+    return {"path": path, "content": analysis.head, "language": lang, "record": record}
+
+
+def _stream_large_file(path: str, lang: str, fileobj) -> Dict[str, Any]:
+    """stream_large hook of read_archive_files and load_git_files; runs on
+    their thread, reading fileobj (a tar member or a git blob) in pieces"""
+    started = time.perf_counter()
+    f = _profiled(_profiler(), 1, analyze_binary_stream, path, lang, fileobj, CODE_CONTEXT_CHARS)
+    _observe_file(path, started, lang, False, f["record"].pop("timings"))
+    return f
+
+
+async def _fetch_source_files(owner: str, repo: str, client: httpx.AsyncClient,
+                              budget: SelectionBudget, deadline: Deadline, refs=DEFAULT_REFS):
+    """Fetch the real source files (any supported language) budget selects
+    from the first of refs that has any. Raw downloads run concurrently,
+    bounded by the per-host semaphore, and keep their selection order;
+    those still in flight at the deadline are cancelled and left out."""
+    files = []
+    for ref in refs:
+        selected = await _fetch_tree_entries(owner, repo, ref, client, budget, deadline)
+        if selected is None:
+            continue
+
+        with stage("raw_fetch"):
+            fetched = await deadline.gather(
+                "fetch",
+                [_fetch_entry(owner, repo, ref, entry, client) for entry in selected],
+                [entry["path"] for entry in selected],
+            )
+        files = [f for f in fetched if f is not None]
 
         if files:
             break  # found the right branch
@@ -131,72 +437,307 @@ async def _fetch_source_files(owner: str, repo: str, client: httpx.AsyncClient):
     return files
 
 
-def _run_static_analysis(files):
+async def _fetch_archive_source_files(owner: str, repo: str, client: httpx.AsyncClient,
+                                      budget: SelectionBudget, deadline: Deadline, refs=DEFAULT_REFS):
+    """Fetch the source files budget selects from one streamed tarball of the
+    first of refs that has any, instead of one request per file. The tree
+    listing picks the files, as for raw ingestion; the tarball is read only
+    until it has yielded all of them. Files come back in selection order.
+    Raises DeadlineExceeded if the download hasn't finished by the deadline."""
+    for branch in refs:
+        selected = await _fetch_tree_entries(owner, repo, branch, client, budget, deadline)
+        if not selected:
+            continue
+        try:
+            with stage("archive_fetch"):
+                # The API host's limit covers only the request GitHub
+                # redirects; codeload's covers the download
+                files = await deadline.wait_for(fetch_archive_files(
+                    client,
+                    f"https://api.github.com/repos/{owner}/{repo}/tarball/{branch}",
+                    _github_headers(),
+                    len(selected),
+                    ARCHIVE_MAX_FILE_BYTES,
+                    _stream_large_file,
+                    STREAM_MAX_FILE_BYTES,
+                    {entry["path"] for entry in selected},
+                    _host_semaphore,
+                ), "fetch")
+        except (httpx.HTTPError, tarfile.TarError, EOFError) as e:
+            logger.warning("GitHub archive fetch failed", owner=owner, repo=repo, ref=branch, error=str(e))
+            continue
+        if files:
+            order = {entry["path"]: i for i, entry in enumerate(selected)}
+            return sorted(files, key=lambda f: order[f["path"]])
+    return []
+
+
+def _profiler():
+    """The current analysis' ProfileCollector, if it is being profiled"""
+    trace = current_trace()
+    return trace.profiler if trace is not None else None
+
+
+def _profiled(profiler, files: int, fn, *args):
+    """fn(*args), under profiling.profile_call if profiler is set; the
+    profile counts toward the "analyze" stage as finishing files files"""
+    if profiler is None:
+        return fn(*args)
+    from src.utils.profiling import profile_call
+    result, raw = profile_call(fn, *args)
+    profiler.add("analyze", raw, files)
+    return result
+
+
+@contextmanager
+def _loop_stage(name: str):
+    """stage(name), profiled on the event loop thread if the analysis is
+    (see profiling.profile_block)"""
+    profiler = _profiler()
+    if profiler is None:
+        with stage(name):
+            yield
+        return
+    from src.utils.profiling import profile_block
+    with stage(name):
+        try:
+            with profile_block() as raw:
+                yield
+        finally:
+            profiler.add(name, raw, files=0)
+
+
+async def _run_in_executor(executor: Optional[Executor], path: str, content: str, lang: str):
+    profiler = _profiler()
+    # Profiled files are profiled where they run, off the loop
+    worker = analyze_file if profiler is None else analyze_file_profiled
+    loop = asyncio.get_running_loop()
+    try:
+        record = await loop.run_in_executor(executor, worker, path, content, lang)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a pathological file); don't lose the
+        # file, just analyze it on a thread instead
+        logger.warning("Process pool unavailable, analyzing in-process", path=path)
+        record = await loop.run_in_executor(None, worker, path, content, lang)
+    if profiler is not None:
+        profiler.add("analyze", record.pop("profile"))
+    return record
+
+
+async def _cached_file_analysis(path: str, content: str, lang: str, executor: Optional[Executor]):
+    started = time.perf_counter()
+    record, key = None, None
+    if file_cache is not None:
+        # Cache lookups stay in this process; only misses are shipped to the pool
+        key = content_key(FILE_ANALYSIS_VERSION, security_analyzer.RULESET_VERSION, lang, content)
+        # A profiled analysis analyzes every file, to profile it
+        if _profiler() is None:
+            record = file_cache.get(key)
+    cache_hit = record is not None
+    timings = {}
+    if record is None:
+        record = await _run_in_executor(executor, path, content, lang)
+        # Timings describe this run, not the content, so they never enter the cache
+        timings = record.pop("timings", None) or {}
+        if key is not None:
+            file_cache.set(key, record)
+
+    _observe_file(path, started, lang, cache_hit, timings)
+    return record
+
+
+def _observe_file(path: str, started: float, lang: str, cache_hit: bool, timings=None) -> None:
+    seconds = time.perf_counter() - started
+    FILES_ANALYZED.inc(cache="hit" if cache_hit else "miss")
+    FILE_SECONDS.observe(seconds)
+    trace = current_trace()
+    if trace is not None:
+        trace.add_file(path, started, seconds, language=lang, cache_hit=cache_hit, **(timings or {}))
+
+
+async def _analyze_fetched(f, executor: Optional[Executor]):
+    if "record" in f:
+        # Streamed files were analyzed while they downloaded
+        return f.pop("record")
+    return await _cached_file_analysis(f["path"], f["content"], f["language"], executor)
+
+
+async def _run_static_analysis(files, deadline: Deadline, executor: Optional[Executor] = None, on_file=None):
     """Run real parser + security analysis on fetched files. Returns
-    (issues, metrics_summaries, files_actually_parsed)."""
-    py_parser = PythonParser()
-    js_parser = JavaScriptParser()
+    (analyzed_files, findings, metrics_summaries, files_actually_parsed,
+    repo_metrics).
+
+    Files are analyzed concurrently on the executor (the app's process pool,
+    or the loop's default thread pool when None), keeping the event loop
+    free; results are merged back in input order. Files not done by the
+    deadline are dropped from analyzed_files. on_file(file, record), if
+    given, is called as each file finishes, in completion order."""
+    async def analyze(f):
+        record = await _analyze_fetched(f, executor)
+        if on_file is not None:
+            on_file(f, record)
+        return record
+
+    records = await deadline.gather("analyze", [analyze(f) for f in files], [f["path"] for f in files])
+    analyzed = [(f, record) for f, record in zip(files, records) if record is not None]
+    files = [f for f, _ in analyzed]
+    return (files, *_merge_file_records(files, [record for _, record in analyzed]))
 
-    all_issues = []
+
+def _merge_file_records(files, records):
+    """Fold per-file analysis records into (findings, metrics_summaries,
+    files_actually_parsed, repo_metrics), in file order. findings maps each
+    path with static issues to its packed findings, as stored on the result;
+    repo_metrics collects every parsed function's metrics."""
+    findings = {}
     metrics_summaries = []
     parsed_files = []
+    repo_metrics = RepoMetrics()
 
-    for f in files:
-        path, content, lang = f["path"], f["content"], f["language"]
+    for f, record in zip(files, records):
+        path, lang = f["path"], f["language"]
 
-        # AST-level parsing where we have a real parser for the language
-        parse_result = None
-        if lang == "python":
-            try:
-                parse_result = py_parser.parse(content, path)
-            except Exception as e:
-                print(f"Python parse error for {path}: {e}")
-        elif lang in ("javascript", "typescript"):
-            try:
-                parse_result = js_parser.parse(content, path)
-            except Exception as e:
-                print(f"JS parse error for {path}: {e}")
-
-        if parse_result and not parse_result.get("error"):
+        if record["parsed"]:
             parsed_files.append(path)
-            for issue in parse_result.get("issues", []):
-                all_issues.append({
-                    "type": issue.get("category", "quality"),
-                    "severity": issue.get("severity", "low"),
-                    "file": path,
-                    "line": issue.get("line"),
-                    "message": issue.get("title", "Code issue"),
-                    "recommendation": issue.get("description", ""),
-                    "source": "static",
-                })
-            m = parse_result.get("metrics", {})
+            repo_metrics.add_file(path, record.get("functions"))
+            m = record["metrics"]
+            metrics_summaries.append(
+                f"- {path} ({lang}): {m['lines_of_code']} LOC, "
+                f"{m['function_count']} functions, "
+                f"max complexity {m['max_function_complexity']}"
+            )
+        elif record.get("streamed"):
             metrics_summaries.append(
-                f"- {path} ({lang}): {m.get('lines_of_code', 0)} LOC, "
-                f"{m.get('function_count', 0)} functions, "
-                f"max complexity {m.get('max_function_complexity', 0)}"
+                f"- {path} ({lang}): {record['metrics']['lines_of_code']} LOC, "
+                f"too large for AST analysis (security scan only)"
             )
-        elif parse_result and parse_result.get("error"):
+        elif record["parse_error"]:
             # e.g. TypeScript-specific syntax esprima can't handle - still
-            # worth running the security scan below, just no AST metrics
-            metrics_summaries.append(f"- {path} ({lang}): AST parse unavailable ({parse_result['error'][:80]})")
-
-        # Security pattern scan runs on raw text regardless of AST support,
-        # so TS-only syntax files still get real security coverage
-        for issue in security_analyzer.scan(path, content):
-            all_issues.append({
-                "type": issue["category"],
-                "severity": issue["severity"],
-                "file": path,
-                "line": issue["line"],
-                "message": issue["title"],
-                "recommendation": issue["description"],
-                "source": "static",
-            })
-
-    return all_issues, metrics_summaries, parsed_files
-
-
-def _build_code_context(files, limit_chars=6000):
+            # worth running the security scan, just no AST metrics
+            metrics_summaries.append(f"- {path} ({lang}): AST parse unavailable ({record['parse_error'][:80]})")
+
+        if record["issues"]:
+            findings[path] = record["issues"]
+
+    return findings, metrics_summaries, parsed_files, repo_metrics
+
+
+def _expand_finding(path: str, row) -> Dict[str, Any]:
+    finding = Finding.unpack(row)
+    return {
+        "type": finding.category,
+        "severity": finding.effective_severity,
+        "file": path,
+        "line": finding.line,
+        "message": finding.title,
+        "recommendation": finding.description,
+        "source": "static",
+        "rule_id": finding.rule_id,
+    }
+
+
+def _compact_finding(path: str, row) -> Dict[str, Any]:
+    finding = Finding.unpack(row)
+    return {
+        "rule_id": finding.rule_id,
+        "severity": finding.effective_severity,
+        "file": path,
+        "line": finding.line,
+        "args": finding.args,
+        "source": "static",
+    }
+
+
+def _result_issues(result, compact: bool = False):
+    """Static then LLM issues of a stored result, with static ones expanded
+    from the rule table or, if compact, left as references to it"""
+    convert = _compact_finding if compact else _expand_finding
+    issues = [convert(path, row) for path, rows in result.get("findings", {}).items() for row in rows]
+    return issues + result.get("llm_issues", [])
+
+
+def _issue_count(result) -> int:
+    return sum(len(rows) for rows in result.get("findings", {}).values()) + len(result.get("llm_issues", []))
+
+
+def _result_view(result, compact: bool = False):
+    """A stored result in the AnalysisResult response shape"""
+    view = {k: v for k, v in result.items() if k not in ("findings", "llm_issues")}
+    view["issues"] = _result_issues(result, compact)
+    if compact:
+        view["rules"] = rule_table(row[0] for rows in result.get("findings", {}).values() for row in rows)
+    return view
+
+
+async def _incremental_static_analysis(owner: str, repo: str, client: httpx.AsyncClient,
+                                       budget: SelectionBudget, fetch_deadline: Deadline, deadline: Deadline,
+                                       executor: Optional[Executor] = None, refs=DEFAULT_REFS):
+    """Like _fetch_source_files + _run_static_analysis, but only for blobs that
+    changed since this repo's last incremental run. Unchanged blobs (matched
+    by git blob SHA and language, so a rename counts as unchanged unless it
+    changes the language, e.g. .js -> .ts) take their record and code
+    excerpt from the stored snapshot without being downloaded. Changed
+    blobs not fetched by fetch_deadline, or analyzed by the analysis share of
+    deadline (as in a full run), are left out of both the result and the
+    snapshot, so the next run picks them up.
+
+    Returns (files, records, reused_count); files carry only the first
+    CODE_CONTEXT_CHARS of content, which is all the LLM context needs."""
+    snapshot_key = content_key("repo-snapshot", FILE_ANALYSIS_VERSION, owner.lower(), repo.lower())
+    previous = snapshot_cache.get(snapshot_key) or {}
+    if previous.get("ruleset") != security_analyzer.RULESET_VERSION:
+        previous = {}
+    known = {(entry["sha"], entry["language"]): entry for entry in previous.get("files", {}).values()}
+
+    for ref in refs:
+        selected = await _fetch_tree_entries(owner, repo, ref, client, budget, fetch_deadline)
+        if not selected:
+            continue
+
+        changed = [entry for entry in selected if (entry.get("sha"), language_for(entry["path"])) not in known]
+        with stage("raw_fetch"):
+            fetched = await fetch_deadline.gather(
+                "fetch",
+                [_fetch_entry(owner, repo, ref, entry, client) for entry in changed],
+                [entry["path"] for entry in changed],
+            )
+        fetched = [f for f in fetched if f is not None]
+        new_records = await deadline.portion(ANALYZE_DEADLINE_SHARE).gather(
+            "analyze", [_analyze_fetched(f, executor) for f in fetched], [f["path"] for f in fetched],
+        )
+        fresh = {
+            f["path"]: {"language": f["language"], "head": f["content"][:CODE_CONTEXT_CHARS], "record": record}
+            for f, record in zip(fetched, new_records) if record is not None
+        }
+
+        snapshot_files = {}
+        reused = 0
+        for entry in selected:
+            path, sha = entry["path"], entry.get("sha")
+            if (sha, language_for(path)) in known:
+                snapshot_files[path] = known[sha, language_for(path)]
+                reused += 1
+            elif path in fresh:
+                snapshot_files[path] = dict(fresh[path], sha=sha)
+
+        if not snapshot_files:
+            continue  # wrong ref, try the next one
+
+        snapshot_cache.set(snapshot_key, {
+            "ref": ref,
+            "ruleset": security_analyzer.RULESET_VERSION,
+            "files": snapshot_files,
+        })
+        files = [
+            {"path": path, "content": entry["head"], "language": entry["language"]}
+            for path, entry in snapshot_files.items()
+        ]
+        return files, [entry["record"] for entry in snapshot_files.values()], reused
+
+    return [], [], 0
+
+
+def _build_code_context(files, limit_chars=CODE_CONTEXT_CHARS):
     """Build a trimmed code excerpt block to feed to the LLM for supplementary review."""
     blocks = []
     budget = limit_chars
@@ -209,13 +750,10 @@ def _build_code_context(files, limit_chars=6000):
     return "\n\n".join(blocks)
 
 
-def _get_llm_supplementary_issues(repo_url: str, code_context: str, metrics_summaries: list):
+async def _get_llm_supplementary_issues(repo_url: str, code_context: str, metrics_summaries: list):
     """LLM pass is explicitly supplementary - it runs after real static analysis
     and is tagged source='llm' so it's never confused with a verified finding."""
     try:
-        from groq import Groq
-        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
         if code_context:
             user_prompt = (
                 f"Review this real code from the GitHub repository {repo_url}.\n\n"
@@ -232,9 +770,9 @@ def _get_llm_supplementary_issues(repo_url: str, code_context: str, metrics_summ
                 "\"line\": 10, \"message\": \"description\", \"recommendation\": \"how to fix\"}]}"
             )
         else:
-            return [], " (limited scan: no readable source files found, no supplementary AI review performed)"
+            return [], " (limited scan: no readable source files found, no supplementary AI review performed)", False
 
-        response = client.chat.completions.create(
+        response = await get_llm_client().complete(
             model="openai/gpt-oss-120b",
             messages=[
                 {"role": "system", "content": "You are a precise code reviewer. Only report issues you can justify from the given code. Respond with valid JSON only."},
@@ -245,77 +783,585 @@ def _get_llm_supplementary_issues(repo_url: str, code_context: str, metrics_summ
             response_format={"type": "json_object"},
         )
 
-        raw = response.choices[0].message.content
-        result = json.loads(raw)
+        result = json.loads(response.content)
         issues = result.get("issues", [])
         for issue in issues:
             issue["source"] = "llm"
-        return issues, ""
+        return issues, "", response.cached
+
+    except asyncio.TimeoutError:
+        logger.warning("LLM review timed out", repo_url=repo_url)
+        return [], "", False
+    except Exception as e:
+        logger.error("LLM review failed", repo_url=repo_url, error=str(e))
+        return [], "", False
+
+
+def _publish_file(analysis_id: str, f, record) -> None:
+    progress_hub.publish(
+        analysis_id, "file",
+        path=f["path"],
+        language=f["language"],
+        parsed=record["parsed"],
+        parse_error=record["parse_error"],
+        metrics=record["metrics"],
+        issues=[_expand_finding(f["path"], row) for row in record["issues"]],
+    )
+
 
+async def perform_analysis(analysis_id: str, repo_url: str, language: str,
+                           http_client: Optional[httpx.AsyncClient] = None,
+                           executor: Optional[Executor] = None,
+                           ingestion: str = "raw",
+                           commit_sha: Optional[str] = None,
+                           incremental: bool = False,
+                           profile: bool = False,
+                           time_budget_seconds: Optional[float] = None,
+                           byte_budget: Optional[int] = None,
+                           host_limits: Optional[HostLimits] = None):
+    try:
+        await _perform_analysis(analysis_id, repo_url, language, http_client, executor,
+                                ingestion, commit_sha, incremental, profile,
+                                time_budget_seconds, byte_budget, host_limits)
     except Exception as e:
-        print(f"Groq error: {e}")
-        return [], ""
+        progress_hub.publish(analysis_id, "error", message=str(e))
+        raise
+    finally:
+        # Ends every open stream, whatever happened
+        progress_hub.close(analysis_id)
+
 
+def create_queue_consumer(http_client: Optional[httpx.AsyncClient] = None,
+                          executor: Optional[Executor] = None,
+                          host_limits: Optional[HostLimits] = None) -> QueueConsumer:
+    """Consumer running queued analyses with the app's shared client, pool
+    and host limits. Progress streams stay open across retries and close on
+    the final outcome."""
+    async def run(job: AnalysisJob):
+        await _perform_analysis(job.analysis_id, http_client=http_client, executor=executor,
+                                host_limits=host_limits, **job.payload)
+        progress_hub.close(job.analysis_id)
+
+    def on_retry(job: AnalysisJob, error: str, delay: float):
+        progress_hub.publish(job.analysis_id, "retry", attempt=job.attempts, delay=delay, error=error)
+
+    def on_failure(job: AnalysisJob, error: str):
+        previous = analysis_results.get(job.analysis_id) or {}
+        analysis_results[job.analysis_id] = dict(
+            previous,
+            status="failed",
+            summary=f"Analysis failed after {job.attempts} attempts: {error}",
+        )
+        progress_hub.publish(job.analysis_id, "error", message=error, attempts=job.attempts)
+        progress_hub.close(job.analysis_id)
 
-async def perform_analysis(analysis_id: str, repo_url: str, language: str):
-    scan_note = ""
+    return QueueConsumer(
+        job_queue,
+        run,
+        concurrency=settings.MAX_CONCURRENT_ANALYSES,
+        timeout_seconds=settings.ANALYSIS_TIMEOUT_SECONDS + DEADLINE_GRACE_SECONDS,
+        backoff_seconds=settings.ANALYSIS_RETRY_BACKOFF_SECONDS,
+        on_retry=on_retry,
+        on_failure=on_failure,
+    )
+
+
+async def _perform_analysis(analysis_id, repo_url, language, http_client, executor,
+                            ingestion, commit_sha, incremental, profile=False,
+                            time_budget_seconds=None, byte_budget=None, host_limits=None):
+    # Only now, not at submission: a queued analysis holds no channel until
+    # it runs or someone subscribes (a retry reuses the open one)
+    progress_hub.open(analysis_id)
+    # Outside the app lifespan there are no shared limits; this analysis gets its own
+    limits_token = _host_limits.set(host_limits or HostLimits(settings.GITHUB_FETCH_CONCURRENCY))
+    try:
+        with trace_analysis() as trace:
+            if profile:
+                from src.utils.profiling import ProfileCollector
+                trace.profiler = ProfileCollector(top_n=settings.PROFILE_TOP_N)
+            await _analysis_pipeline(trace, analysis_id, repo_url, language, http_client, executor,
+                                     ingestion, commit_sha, incremental, time_budget_seconds, byte_budget)
+    finally:
+        _host_limits.reset(limits_token)
+    stage_ms: Dict[str, float] = {}
+    for span in trace.stages:
+        stage_ms[span["stage"]] = round(stage_ms.get(span["stage"], 0.0) + span["duration_ms"], 2)
+    logger.info("Analysis finished", analysis_id=analysis_id, repo_url=repo_url,
+                total_ms=trace.as_dict()["total_ms"], files=len(trace.files), stages_ms=stage_ms)
+
+
+async def _analysis_pipeline(trace, analysis_id, repo_url, language, http_client, executor,
+                             ingestion, commit_sha, incremental, time_budget_seconds=None, byte_budget=None):
+    scan_note = ignored_note = ""
     owner, repo = _parse_owner_repo(repo_url)
+    refs = (commit_sha,) if commit_sha else DEFAULT_REFS
+    if incremental and ingestion != "raw":
+        # The API refuses this; direct callers get a note instead
+        incremental = False
+        ignored_note = f" (incremental ignored: raw ingestion only, not {ingestion})"
+    # Stages stop at this (fetch and analysis sooner, see *_DEADLINE_SHARE),
+    # keeping what they finished; see utils.deadline
+    deadline = Deadline(settings.ANALYSIS_TIMEOUT_SECONDS)
+    fetch_deadline = deadline.portion(FETCH_DEADLINE_SHARE)
 
-    async with httpx.AsyncClient(timeout=20.0) as http_client:
-        files = []
-        if owner and repo:
+    async def fetch(client):
+        if ingestion in ("git", "archive"):
+            # No per-file request to pay for, so only the parse cost counts
+            budget = _selection_budget(time_budget_seconds, byte_budget,
+                                       max_files=ARCHIVE_MAX_FILES, seconds_per_file=0.0)
+        else:
+            budget = _selection_budget(time_budget_seconds, byte_budget)
+        if ingestion == "git":
+            # The thread can't be cancelled, but git itself is killed at the deadline
+            files = await fetch_deadline.wait_for(asyncio.to_thread(
+                load_git_files, repo_url, commit_sha, settings.REPO_CACHE_DIR, settings.LOCAL_REPO_ROOTS,
+                budget, ARCHIVE_MAX_FILE_BYTES,
+                settings.GIT_MIRROR_REFRESH_SECONDS, fetch_deadline.bound(settings.GIT_TIMEOUT_SECONDS),
+                settings.GIT_ALLOWED_HOSTS, settings.GIT_MIRROR_MAX_BYTES,
+                _stream_large_file, STREAM_MAX_FILE_BYTES,
+            ), "fetch")
+            return files, None, 0
+        if incremental:
+            return await _incremental_static_analysis(owner, repo, client, budget, fetch_deadline, deadline,
+                                                      executor, refs)
+        if ingestion == "archive":
+            return await _fetch_archive_source_files(owner, repo, client, budget, fetch_deadline, refs), None, 0
+        return await _fetch_source_files(owner, repo, client, budget, fetch_deadline, refs), None, 0
+
+    progress_hub.publish(analysis_id, "stage", stage="fetch", state="started")
+    files, records, reused = [], None, 0
+    with _loop_stage("fetch"):
+        if ingestion == "git":
+            # Local paths and non-GitHub remotes are fine here; no HTTP client needed
+            try:
+                files, records, reused = await fetch(None)
+            except GitError as e:
+                if fetch_deadline.expired:
+                    # git was killed at the deadline
+                    fetch_deadline.skip("fetch")
+                else:
+                    logger.warning("Git ingestion failed", analysis_id=analysis_id, repo_url=repo_url, error=str(e))
+                    scan_note = " (limited scan: repository could not be read with git)"
+            except DeadlineExceeded:
+                pass
+        elif owner and repo:
             try:
-                files = await _fetch_source_files(owner, repo, http_client)
+                if http_client is not None:
+                    files, records, reused = await fetch(http_client)
+                else:
+                    # No app-level pool (e.g. called outside the FastAPI lifespan)
+                    async with httpx.AsyncClient(timeout=settings.HTTP_TIMEOUT_SECONDS) as client:
+                        files, records, reused = await fetch(client)
             except RuntimeError:
                 scan_note = " (limited scan: GitHub API rate limit reached)"
+            except DeadlineExceeded:
+                pass
 
-        if not files and not scan_note:
-            scan_note = " (limited scan: no readable source files found)"
+    if not files and not scan_note and not deadline.missed:
+        scan_note = " (limited scan: no readable source files found)"
+    elif trace.selection and trace.selection["selected"] < trace.selection["candidates"]:
+        scan_note += (f" (sampled {trace.selection['selected']} of {trace.selection['candidates']} "
+                      f"candidate files within the analysis budget)")
+    scan_note += ignored_note
+    progress_hub.publish(analysis_id, "stage", stage="fetch", state="finished",
+                         files=[f["path"] for f in files])
 
-    static_issues, metrics_summaries, parsed_files = _run_static_analysis(files) if files else ([], [], [])
+    # Parsing and the security scan run together, one worker call per file
+    progress_hub.publish(analysis_id, "stage", stage="analyze", state="started")
+    with stage("analyze"):
+        if records is not None:
+            for f, record in zip(files, records):
+                _publish_file(analysis_id, f, record)
+            findings, metrics_summaries, parsed_files, repo_metrics = _merge_file_records(files, records)
+            if files:
+                scan_note += f" (incremental: {len(files) - reused} of {len(files)} files re-analyzed)"
+        elif files:
+            files, findings, metrics_summaries, parsed_files, repo_metrics = await _run_static_analysis(
+                files, deadline.portion(ANALYZE_DEADLINE_SHARE), executor,
+                on_file=lambda f, record: _publish_file(analysis_id, f, record),
+            )
+        else:
+            findings, metrics_summaries, parsed_files, repo_metrics = {}, [], [], RepoMetrics()
+    static_count = sum(len(rows) for rows in findings.values())
+    progress_hub.publish(analysis_id, "stage", stage="analyze", state="finished",
+                         issues=static_count, parsed_files=len(parsed_files))
     code_context = _build_code_context(files) if files else ""
 
-    llm_issues, llm_note = _get_llm_supplementary_issues(repo_url, code_context, metrics_summaries)
+    progress_hub.publish(analysis_id, "stage", stage="llm", state="started")
+    llm_issues, llm_note, llm_cached = [], "", False
+    with _loop_stage("llm"):
+        if deadline.expired:
+            deadline.skip("llm")
+        else:
+            try:
+                llm_issues, llm_note, llm_cached = await deadline.wait_for(
+                    _get_llm_supplementary_issues(repo_url, code_context, metrics_summaries), "llm",
+                )
+            except DeadlineExceeded:
+                pass
     if llm_note:
         scan_note = scan_note or llm_note
+    elif llm_cached:
+        scan_note += " (AI review served from cache)"
+    progress_hub.publish(analysis_id, "stage", stage="llm", state="finished",
+                         issues=llm_issues, cached=llm_cached)
 
-    all_issues = static_issues + llm_issues
-    score = quality_score.compute_score(all_issues)
+    with _loop_stage("score"):
+        static_findings = (Finding.unpack(row) for rows in findings.values() for row in rows)
+        score = quality_score.compute_score(llm_issues, static_findings)
+    with _loop_stage("metrics"):
+        repo_metrics_list = repo_metrics.to_metrics()
+    progress_hub.publish(analysis_id, "score", score=score)
 
-    analysis_results[analysis_id] = {
+    status = "completed"
+    if deadline.missed:
+        # Scored on whatever was gathered before the deadline
+        status = "partial"
+        scan_note += _deadline_note(deadline)
+    trace.status = status
+    result = {
         "analysis_id": analysis_id,
-        "status": "completed",
+        "status": status,
         "repo_url": repo_url,
         "score": score,
-        "issues": all_issues,
+        # Static issues stay packed (path -> [[rule_id, line, ...]]) until a
+        # response expands them; see _result_view
+        "findings": findings,
+        "llm_issues": llm_issues,
         "files_analyzed": [f["path"] for f in files],
+        "llm_cache_hit": llm_cached,
+        "maintainability_index": next(
+            (m["value"] for m in repo_metrics_list if m["metric_type"] == "maintainability_index"), None,
+        ),
+        "metrics": repo_metrics_list,
+        "timings": trace.as_dict(),
         "summary": (
-            f"Found {len(static_issues)} static + {len(llm_issues)} AI-suggested issues "
+            f"Found {static_count} static + {len(llm_issues)} AI-suggested issues "
             f"across {len(files)} files in {repo_url.split('/')[-1]}{scan_note}. Score: {score}/100"
         ),
     }
+    if trace.profiler is not None:
+        result["profile"] = trace.profiler.as_dict()
+    if trace.selection is not None:
+        result["selection"] = trace.selection
+    if deadline.missed:
+        result["skipped"] = deadline.as_dict()
+    analysis_results[analysis_id] = result
+    progress_hub.publish(analysis_id, "done", status=status, summary=result["summary"])
 
-@router.post("/analyze", response_model=AnalysisResponse)
-async def analyze_repository(request: AnalysisRequest, background_tasks: BackgroundTasks):
-    analysis_id = str(uuid.uuid4())
+
+def _deadline_note(deadline: Deadline) -> str:
+    note = f" (partial: {deadline.seconds:g}s analysis deadline reached; skipped {', '.join(deadline.skipped_stages)}"
+    if deadline.skipped_files:
+        note += f", {len(deadline.skipped_files)} files unfinished"
+    return note + ")"
+
+def _start_result(analysis_id: str, repo_url: str) -> None:
     analysis_results[analysis_id] = {
         "analysis_id": analysis_id,
         "status": "processing",
-        "repo_url": request.repo_url,
+        "repo_url": repo_url,
         "score": None,
-        "issues": [],
+        "findings": {},
+        "llm_issues": [],
         "files_analyzed": [],
         "summary": "Analysis in progress..."
     }
-    background_tasks.add_task(perform_analysis, analysis_id, request.repo_url, request.language)
+
+
+async def _feed_batch(consumer: QueueConsumer, jobs: List[AnalysisJob]) -> None:
+    """Submit a batch's jobs as queue space allows instead of all at once"""
+    share = max(1, int(consumer.queue.max_size * BATCH_QUEUE_SHARE))
+    for job in jobs:
+        # Below the share means below max_size, so the submit can't be refused
+        await consumer.queue.wait_for_room(share)
+        consumer.submit(job)
+
+
+async def stop_batch_feeders() -> None:
+    """Cancel batch submissions still waiting for queue space (at shutdown)"""
+    feeders = list(_batch_feeders)
+    for feeder in feeders:
+        feeder.cancel()
+    await asyncio.gather(*feeders, return_exceptions=True)
+
+
+def _batch_status(counts: Dict[str, int]) -> str:
+    if counts.get("processing"):
+        return "processing"
+    finished = counts.get("completed", 0)
+    if finished == sum(counts.values()):
+        return "completed"
+    if not finished and not counts.get("partial"):
+        return "failed"
+    return "partial"
+
+
+async def _run_batch_unqueued(jobs: List[AnalysisJob], http_client: Optional[httpx.AsyncClient],
+                              executor: Optional[Executor], host_limits: Optional[HostLimits] = None) -> None:
+    """Batch fallback without a queue consumer: the same concurrency limit,
+    with one HTTP client and one set of host limits shared by the whole batch"""
+    slots = asyncio.Semaphore(settings.MAX_CONCURRENT_ANALYSES)
+    host_limits = host_limits or HostLimits(settings.GITHUB_FETCH_CONCURRENCY)
+
+    async def run(job, client):
+        async with slots:
+            try:
+                await perform_analysis(job.analysis_id, http_client=client, executor=executor,
+                                       host_limits=host_limits, **job.payload)
+            except Exception as e:
+                logger.error("Batch analysis failed", analysis_id=job.analysis_id,
+                             repo_url=job.payload["repo_url"], error=str(e))
+
+    if http_client is not None:
+        await asyncio.gather(*(run(job, http_client) for job in jobs))
+        return
+    async with httpx.AsyncClient(timeout=settings.HTTP_TIMEOUT_SECONDS) as client:
+        await asyncio.gather(*(run(job, client) for job in jobs))
+
+
+def _check_incremental(ingestion: Optional[str], incremental: Optional[bool]) -> None:
+    if incremental and ingestion != "raw":
+        raise HTTPException(status_code=422, detail="incremental is only supported with ingestion=\"raw\"")
+
+
+@router.post("/analyze", response_model=AnalysisResponse)
+async def analyze_repository(request: AnalysisRequest, background_tasks: BackgroundTasks, http_request: Request):
+    if request.profile and not settings.ALLOW_PROFILING:
+        raise HTTPException(status_code=403, detail="Profiling is disabled on this server")
+    _check_incremental(request.ingestion, request.incremental)
+    for budget in (request.time_budget_seconds, request.byte_budget):
+        if budget is not None and budget <= 0:
+            raise HTTPException(status_code=422, detail="Budgets must be positive")
+    analysis_id = str(uuid.uuid4())
+    consumer = getattr(http_request.app.state, "queue_consumer", None)
+    if consumer is not None:
+        job = AnalysisJob(
+            analysis_id=analysis_id,
+            payload={
+                "repo_url": request.repo_url,
+                "language": request.language,
+                "ingestion": request.ingestion,
+                "commit_sha": request.commit_sha,
+                "incremental": request.incremental,
+                "profile": bool(request.profile),
+                "time_budget_seconds": request.time_budget_seconds,
+                "byte_budget": request.byte_budget,
+            },
+            priority=request.priority or 0,
+            max_attempts=settings.ANALYSIS_MAX_ATTEMPTS,
+        )
+        try:
+            consumer.submit(job)
+        except QueueFull as e:
+            raise HTTPException(
+                status_code=429,
+                detail="Analysis queue is full, try again later",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+    _start_result(analysis_id, request.repo_url)
+    if consumer is None:
+        # No queue outside the app lifespan; run unqueued as before
+        background_tasks.add_task(
+            perform_analysis, analysis_id, request.repo_url, request.language,
+            getattr(http_request.app.state, "http_client", None),
+            getattr(http_request.app.state, "process_pool", None),
+            request.ingestion,
+            request.commit_sha,
+            request.incremental,
+            bool(request.profile),
+            request.time_budget_seconds,
+            request.byte_budget,
+            getattr(http_request.app.state, "host_limits", None),
+        )
     return AnalysisResponse(
         analysis_id=analysis_id,
         status="processing",
         message=f"Analysis started for {request.repo_url}"
     )
 
+@router.post("/analyze/batch", response_model=BatchAnalysisResponse)
+async def analyze_batch(request: BatchAnalysisRequest, background_tasks: BackgroundTasks, http_request: Request):
+    """Queue one analysis per repository and return a single batch id to poll.
+    Every analysis in the batch shares the app's HTTP connection pool,
+    parser process pool and caches."""
+    _check_incremental(request.ingestion, request.incremental)
+    repo_urls = list(dict.fromkeys(url.strip() for url in request.repo_urls if url.strip()))
+    if not repo_urls:
+        raise HTTPException(status_code=422, detail="repo_urls is empty")
+    if len(repo_urls) > settings.BATCH_MAX_REPOS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_REPOS} repositories per batch")
+
+    batch_id = str(uuid.uuid4())
+    jobs = [
+        AnalysisJob(
+            analysis_id=str(uuid.uuid4()),
+            payload={
+                "repo_url": url,
+                "language": request.language,
+                "ingestion": request.ingestion,
+                "commit_sha": None,
+                "incremental": request.incremental,
+            },
+            priority=request.priority if request.priority is not None else -1,
+            max_attempts=settings.ANALYSIS_MAX_ATTEMPTS,
+        )
+        for url in repo_urls
+    ]
+    for job in jobs:
+        _start_result(job.analysis_id, job.payload["repo_url"])
+
+    analyses = [{"repo_url": job.payload["repo_url"], "analysis_id": job.analysis_id} for job in jobs]
+    batch_results[batch_id] = {"batch_id": batch_id, "analyses": analyses}
+
+    consumer = getattr(http_request.app.state, "queue_consumer", None)
+    if consumer is not None:
+        feeder = asyncio.create_task(_feed_batch(consumer, jobs))
+        _batch_feeders.add(feeder)
+        feeder.add_done_callback(_batch_feeders.discard)
+    else:
+        background_tasks.add_task(
+            _run_batch_unqueued, jobs,
+            getattr(http_request.app.state, "http_client", None),
+            getattr(http_request.app.state, "process_pool", None),
+            getattr(http_request.app.state, "host_limits", None),
+        )
+    return BatchAnalysisResponse(batch_id=batch_id, status="processing", analyses=analyses)
+
+@router.get("/analyze/batch/{batch_id}", response_model=BatchResult)
+async def get_batch(batch_id: str, include_issues: bool = False, compact: bool = False):
+    """Status, score and issue count of every analysis in a batch. With
+    include_issues, each result also lists its issues; compact additionally
+    returns static issues by rule_id with one rules table for the batch."""
+    batch = batch_results.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    results = []
+    counts: Dict[str, int] = {}
+    rule_ids = set()
+    for entry in batch["analyses"]:
+        # Results evicted past their TTL report as expired rather than vanishing
+        result = analysis_results.get(entry["analysis_id"]) or {"status": "expired"}
+        status = result.get("status", "processing")
+        counts[status] = counts.get(status, 0) + 1
+        results.append({
+            "analysis_id": entry["analysis_id"],
+            "repo_url": entry["repo_url"],
+            "status": status,
+            "score": result.get("score"),
+            "issue_count": _issue_count(result),
+            "summary": result.get("summary", ""),
+            "issues": _result_issues(result, compact) if include_issues else None,
+        })
+        if include_issues and compact:
+            rule_ids.update(row[0] for rows in result.get("findings", {}).values() for row in rows)
+
+    scores = [r["score"] for r in results if r["score"] is not None]
+    return {
+        "batch_id": batch_id,
+        "status": _batch_status(counts),
+        "counts": counts,
+        "average_score": round(sum(scores) / len(scores), 1) if scores else None,
+        "results": results,
+        "rules": rule_table(sorted(rule_ids)) if include_issues and compact else None,
+    }
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    llm_cache = get_llm_client().cache
+    return {
+        "file_cache": file_cache.stats() if file_cache is not None else {"enabled": False},
+        "llm_cache": llm_cache.stats() if llm_cache is not None else {"enabled": False},
+        "result_store": analysis_results.stats(),
+    }
+
+def scrape_metrics(consumer: Optional[QueueConsumer] = None):
+    """Cache, result store and queue gauges read at scrape time, in the
+    shape telemetry.render takes for its extra metrics"""
+    extra = []
+    caches = [("file", file_cache), ("llm", get_llm_client().cache)]
+    lookups = []
+    for name, cache in caches:
+        if cache is None:
+            continue
+        stats = cache.stats()
+        lookups += [
+            ({"cache": name, "result": "memory_hit"}, stats["memory_hits"]),
+            ({"cache": name, "result": "disk_hit"}, stats["disk_hits"]),
+            ({"cache": name, "result": "miss"}, stats["misses"]),
+        ]
+    extra.append(("codesage_cache_lookups_total", "counter", "Cache lookups by cache and result", lookups))
+
+    store = analysis_results.stats()
+    extra.append(("codesage_result_store_entries", "gauge", "Results held in memory", [({}, store["entries"])]))
+    extra.append(("codesage_result_store_bytes", "gauge", "Approximate bytes of in-memory results",
+                  [({}, store["bytes"])]))
+
+    if consumer is not None:
+        queue = consumer.stats()
+        extra.append(("codesage_queue_depth", "gauge", "Analyses waiting in the queue", [({}, queue["queued"])]))
+        extra.append(("codesage_queue_running", "gauge", "Analyses running from the queue",
+                      [({}, queue["running"])]))
+        extra.append(("codesage_queue_jobs_total", "counter", "Queued jobs by final outcome", [
+            ({"outcome": "completed"}, queue["completed"]),
+            ({"outcome": "failed"}, queue["failed"]),
+        ]))
+    return extra
+
+@router.get("/queue/stats")
+async def get_queue_stats(http_request: Request):
+    consumer = getattr(http_request.app.state, "queue_consumer", None)
+    return consumer.stats() if consumer is not None else {"enabled": False}
+
+def _format_event(event, sse: bool) -> str:
+    data = json.dumps(event, default=str)
+    if sse:
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+@router.get("/analyze/{analysis_id}/stream")
+async def stream_analysis(analysis_id: str, format: str = "ndjson"):
+    """Stage events (fetch, analyze, llm), one 'file' event per file as it
+    finishes, then 'score' and 'done'. format=sse for text/event-stream,
+    otherwise newline-delimited JSON. A finished analysis streams only its
+    terminal event, or a single 'done' event carrying the stored result once
+    that has aged out too."""
+    sse = format == "sse"
+    channel = progress_hub.get(analysis_id)
+    if channel is None:
+        result = analysis_results.get(analysis_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        if result.get("status") == "processing":
+            # Still queued: follow from the start, the job reuses this channel
+            channel = progress_hub.open(analysis_id)
+    if channel is None:
+        events = [{"type": "done", "status": result.get("status"), "result": _result_view(result)}]
+
+        async def replay():
+            for event in events:
+                yield _format_event(event, sse)
+        body = replay()
+    else:
+        async def follow():
+            async for event in channel.follow():
+                yield _format_event(event, sse)
+        body = follow()
+
+    return StreamingResponse(
+        body,
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache"},
+    )
+
 @router.get("/analyze/{analysis_id}", response_model=AnalysisResult)
-async def get_analysis(analysis_id: str):
-    if analysis_id not in analysis_results:
+async def get_analysis(analysis_id: str, compact: bool = False):
+    """compact=true lists static issues by rule_id (plus any template args)
+    and returns each rule's text once, in rules"""
+    result = analysis_results.get(analysis_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Analysis not found")
-    return analysis_results[analysis_id]
\ No newline at end of file
+    return _result_view(result, compact)
\ No newline at end of file
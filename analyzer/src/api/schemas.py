@@ -32,7 +32,9 @@ class MetricSchema(BaseModel):
     """Code metric"""
     metric_type: str
     value: float
-    file_path: Optional[str] = None
+    file_path: Optional[str] = None  # file, or directory for directory_* rollups
+    function: Optional[str] = None  # hotspot_* metrics only
+    line: Optional[int] = None
 
 
 class AnalysisResultSchema(BaseModel):
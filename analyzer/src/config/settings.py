@@ -29,15 +29,63 @@ class Settings(BaseSettings):
     DEFAULT_LLM_PROVIDER: str = "anthropic"
     LLM_MAX_TOKENS: int = 2000
     LLM_TEMPERATURE: float = 0.3
+    LLM_PROVIDER: str = "groq"  # "groq" or "fake" (offline, fixed latency)
+    LLM_TIMEOUT_SECONDS: float = 30.0
+    LLM_MAX_CONCURRENT_CALLS: int = 4
+    LLM_FAKE_LATENCY_SECONDS: float = 0.5
     
     # Analysis Configuration
     MAX_FILE_SIZE_MB: int = 10
     MAX_CONCURRENT_ANALYSES: int = 5
-    ANALYSIS_TIMEOUT_SECONDS: int = 600
+    ANALYSIS_TIMEOUT_SECONDS: float = 600  # past this an analysis stops and stores a "partial" result
+    ANALYSIS_QUEUE_MAX_SIZE: int = 100  # queued jobs beyond this get a 429
+    ANALYSIS_MAX_ATTEMPTS: int = 3
+    ANALYSIS_RETRY_BACKOFF_SECONDS: float = 5.0
+    BATCH_MAX_REPOS: int = 1000
+    ALLOW_PROFILING: bool = False  # honour AnalysisRequest.profile; an operator opt-in, requests are unauthenticated
+    PROFILE_TOP_N: int = 20  # functions / allocation sites kept in a profile
+
+    # Node workers running @babel/parser for TypeScript, per process: the API
+    # process and each analysis pool worker get their own, so the total is
+    # BABEL_WORKERS_PER_PROCESS * (pool workers + 1). A pool worker parses one
+    # file at a time, so one each is enough. Needs node and `npm ci` in
+    # js_ast/ (the Docker image has both); otherwise TypeScript falls back to esprima.
+    BABEL_WORKERS_PER_PROCESS: int = 1
+    BABEL_TIMEOUT_SECONDS: float = 10.0
+    BABEL_MAX_QUEUE: int = 32
+    
+    # File selection budget per analysis (raw and git ingestion); see
+    # file_processor.select_files. Requests may override the two budgets.
+    SELECTION_MAX_FILES: int = 100
+    SELECTION_BYTE_BUDGET: int = 2_000_000
+    SELECTION_TIME_BUDGET_SECONDS: float = 10.0
+    SELECTION_SECONDS_PER_FILE: float = 0.02  # raw fetch latency spread over GITHUB_FETCH_CONCURRENCY
+    SELECTION_BYTES_PER_SECOND: float = 500_000  # download + parse + scan throughput
+    
+    # GitHub fetching
+    HTTP_TIMEOUT_SECONDS: float = 20.0
+    HTTP_MAX_CONNECTIONS: int = 50
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    GITHUB_FETCH_CONCURRENCY: int = 8  # in-flight requests per host
     
     # Cache Configuration
     CACHE_TTL_SECONDS: int = 3600
     ENABLE_FILE_CACHE: bool = True
+    FILE_CACHE_MAX_ENTRIES: int = 5000
+    FILE_CACHE_MAX_DISK_BYTES: int = 512 * 1024 * 1024  # oldest entries are evicted past this
+    ENABLE_LLM_CACHE: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 500
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    LLM_CACHE_MAX_DISK_BYTES: int = 64 * 1024 * 1024
+    SNAPSHOT_CACHE_MAX_ENTRIES: int = 1000  # repos remembered for incremental analysis
+    SNAPSHOT_CACHE_TTL_SECONDS: int = 604800
+    SNAPSHOT_CACHE_MAX_DISK_BYTES: int = 256 * 1024 * 1024
+    
+    # Analysis result store (memory, spilling to SQLite)
+    RESULT_STORE_MAX_ENTRIES: int = 200
+    RESULT_STORE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESULT_STORE_TTL_SECONDS: int = 86400
     
     # CORS
     CORS_ORIGINS: List[str] = [
@@ -47,7 +95,16 @@ class Settings(BaseSettings):
     
     # File paths
     TEMP_DIR: str = "/tmp/codesage"
-    REPO_CACHE_DIR: str = "/tmp/codesage/repos"
+    REPO_CACHE_DIR: str = "/tmp/codesage/repos"  # bare mirrors for ingestion="git"
+    LOCAL_REPO_ROOTS: List[str] = []  # local paths ingestion="git" may read; empty = none
+    GIT_MIRROR_REFRESH_SECONDS: float = 60.0
+    GIT_TIMEOUT_SECONDS: float = 300.0
+    GIT_ALLOWED_HOSTS: List[str] = ["github.com"]  # hosts ingestion="git" may clone from
+    GIT_MIRROR_MAX_BYTES: int = 1024 * 1024 * 1024  # a clone/fetch growing a mirror past this is killed
+    FILE_CACHE_DIR: str = "/tmp/codesage/file_cache"
+    LLM_CACHE_DIR: str = "/tmp/codesage/llm_cache"  # empty = memory-only LLM cache
+    SNAPSHOT_CACHE_DIR: str = "/tmp/codesage/snapshots"
+    RESULT_STORE_PATH: str = "/tmp/codesage/results.sqlite3"  # empty = evicted results are dropped
     
     class Config:
         env_file = ".env"
@@ -2,25 +2,26 @@ from typing import Dict, List, Optional, Any
 import asyncio
 import structlog
 import json
-from groq import AsyncGroq
 
 from ..config.settings import settings
+from .llm_client import get_llm_client
 
 logger = structlog.get_logger()
 
 
 class CodeReviewer:
-    """LLM-powered code reviewer using Groq"""
+    """LLM-powered code reviewer. Calls go through the shared LLM client, so
+    they share its connection pool, concurrency limit and response cache."""
     
     def __init__(self):
-        self.logger = logger.bind(service="code_reviewer", provider="groq")
-        self.client = AsyncGroq(api_key=settings.GROQ_API_KEY)
+        self.logger = logger.bind(service="code_reviewer", provider=settings.LLM_PROVIDER)
+        self.client = get_llm_client()
         self.model = "llama-3.3-70b-versatile"
     
     async def review_code(self, code, file_path, language, static_issues, metrics):
         try:
             prompt = self._build_review_prompt(code, file_path, language, static_issues, metrics)
-            response = await self._call_groq(prompt)
+            response = await self._call_llm(prompt)
             return self._parse_review_response(response)
         except Exception as e:
             self.logger.error("Error reviewing code", error=str(e), file=file_path)
@@ -29,7 +30,7 @@ class CodeReviewer:
     async def generate_refactoring_suggestions(self, code, issue, context=None):
         try:
             prompt = self._build_refactoring_prompt(code, issue, context)
-            response = await self._call_groq(prompt)
+            response = await self._call_llm(prompt)
             return self._parse_refactoring_response(response)
         except Exception as e:
             self.logger.error("Error generating refactoring", error=str(e))
@@ -38,14 +39,14 @@ class CodeReviewer:
     async def analyze_architecture(self, files, dependencies, project_structure):
         try:
             prompt = self._build_architecture_prompt(files, dependencies, project_structure)
-            response = await self._call_groq(prompt, max_tokens=4000)
+            response = await self._call_llm(prompt, max_tokens=4000)
             return self._parse_architecture_response(response)
         except Exception as e:
             self.logger.error("Error analyzing architecture", error=str(e))
             return {"success": False, "error": str(e)}
     
-    async def _call_groq(self, prompt, max_tokens=2000):
-        response = await self.client.chat.completions.create(
+    async def _call_llm(self, prompt, max_tokens=2000):
+        response = await self.client.complete(
             model=self.model,
             messages=[
                 {"role": "system", "content": "You are an expert code reviewer. Always respond with valid JSON only."},
@@ -54,7 +55,7 @@ class CodeReviewer:
             max_tokens=max_tokens,
             temperature=0.3
         )
-        return response.choices[0].message.content
+        return response.content
     
     def _build_review_prompt(self, code, file_path, language, static_issues, metrics):
         issues_summary = "\n".join([
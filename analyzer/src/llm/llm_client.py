@@ -0,0 +1,195 @@
+"""
+Shared, non-blocking chat-completion client. Every LLM call in the analyzer
+goes through one process-wide LLMClient, which holds a pooled provider
+connection, applies an explicit per-call timeout and caps how many calls are
+in flight at once, so a burst of analyses queues for the LLM instead of
+opening unbounded concurrent requests.
+
+Responses are cached by a fingerprint of the full request (model,
+temperature, token limit, response format and messages), so re-analyzing
+unchanged code skips the slowest stage of the pipeline entirely.
+"""
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import structlog
+
+from ..config.settings import settings
+from ..utils.cache import TieredCache, content_key
+from ..utils.telemetry import LLM_REQUESTS, LLM_SECONDS
+
+logger = structlog.get_logger()
+
+
+class LLMProvider:
+    """A chat-completion backend. Returns the assistant message content."""
+
+    name = "base"
+
+    async def complete(self, messages: List[Dict[str, str]], model: str, temperature: float,
+                       max_tokens: int, response_format: Optional[Dict[str, str]] = None) -> str:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+
+class GroqProvider(LLMProvider):
+    """Groq via its async SDK; the SDK keeps one pooled httpx client per instance"""
+
+    name = "groq"
+
+    def __init__(self, api_key: str, timeout_seconds: float):
+        from groq import AsyncGroq
+        self.client = AsyncGroq(api_key=api_key, timeout=timeout_seconds, max_retries=1)
+
+    async def complete(self, messages, model, temperature, max_tokens, response_format=None) -> str:
+        kwargs: Dict[str, Any] = {}
+        if response_format:
+            kwargs["response_format"] = response_format
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
+        return response.choices[0].message.content
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+class FakeProvider(LLMProvider):
+    """Offline stand-in that answers after a fixed delay, for exercising
+    concurrency and throughput without network access or API keys"""
+
+    name = "fake"
+
+    def __init__(self, latency_seconds: float = 0.5, response: Optional[str] = None):
+        self.latency_seconds = latency_seconds
+        self.response = response if response is not None else json.dumps({"issues": []})
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def complete(self, messages, model, temperature, max_tokens, response_format=None) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency_seconds)
+            return self.response
+        finally:
+            self.in_flight -= 1
+
+
+@dataclass
+class LLMResponse:
+    content: str
+    cached: bool = False
+
+
+def prompt_fingerprint(messages: List[Dict[str, str]], model: str, temperature: float,
+                       max_tokens: int, response_format: Optional[Dict[str, str]] = None) -> str:
+    return content_key(
+        model,
+        repr(float(temperature)),
+        str(max_tokens),
+        json.dumps(response_format, sort_keys=True),
+        json.dumps(messages, sort_keys=True, ensure_ascii=False),
+    )
+
+
+class LLMClient:
+    """Provider wrapper enforcing the timeout and the global in-flight limit,
+    with an optional response cache in front"""
+
+    def __init__(self, provider: LLMProvider, max_concurrent_calls: int, timeout_seconds: float,
+                 cache: Optional[TieredCache] = None):
+        self.provider = provider
+        self.timeout_seconds = timeout_seconds
+        self.cache = cache
+        self._slots = asyncio.Semaphore(max_concurrent_calls)
+
+    async def complete(self, messages: List[Dict[str, str]], model: str, temperature: float,
+                       max_tokens: int, response_format: Optional[Dict[str, str]] = None) -> LLMResponse:
+        key = None
+        if self.cache is not None:
+            key = prompt_fingerprint(messages, model, temperature, max_tokens, response_format)
+            content = self.cache.get(key)
+            if content is not None:
+                LLM_REQUESTS.inc(outcome="cached")
+                return LLMResponse(content, cached=True)
+
+        # The timeout covers the call itself, not time spent waiting for a slot
+        async with self._slots:
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                content = await asyncio.wait_for(
+                    self.provider.complete(messages, model, temperature, max_tokens, response_format),
+                    timeout=self.timeout_seconds,
+                )
+                outcome = "ok"
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                raise
+            finally:
+                LLM_SECONDS.observe(time.perf_counter() - started, provider=self.provider.name)
+                LLM_REQUESTS.inc(outcome=outcome)
+
+        # Only successful responses get here, so failures are always retried
+        if key is not None and content:
+            self.cache.set(key, content)
+        return LLMResponse(content)
+
+    async def aclose(self) -> None:
+        await self.provider.aclose()
+
+
+def create_provider(name: str) -> LLMProvider:
+    if name == "fake":
+        return FakeProvider(latency_seconds=settings.LLM_FAKE_LATENCY_SECONDS)
+    if name == "groq":
+        return GroqProvider(api_key=settings.GROQ_API_KEY, timeout_seconds=settings.LLM_TIMEOUT_SECONDS)
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """The process-wide client, created on first use from settings"""
+    global _client
+    if _client is None:
+        cache = TieredCache(
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+            directory=settings.LLM_CACHE_DIR or None,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+            max_disk_bytes=settings.LLM_CACHE_MAX_DISK_BYTES,
+        ) if settings.ENABLE_LLM_CACHE else None
+        _client = LLMClient(
+            create_provider(settings.LLM_PROVIDER),
+            max_concurrent_calls=settings.LLM_MAX_CONCURRENT_CALLS,
+            timeout_seconds=settings.LLM_TIMEOUT_SECONDS,
+            cache=cache,
+        )
+        logger.info("LLM client ready", provider=_client.provider.name)
+    return _client
+
+
+def set_llm_client(client: Optional[LLMClient]) -> None:
+    """Swap the process-wide client, e.g. for one built on FakeProvider"""
+    global _client
+    _client = client
+
+
+async def close_llm_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
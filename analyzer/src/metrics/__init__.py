@@ -1,2 +1,4 @@
 # Metrics package
-__all__ = []
\ No newline at end of file
+from .code_metrics import RepoMetrics
+
+__all__ = ['RepoMetrics']
\ No newline at end of file
@@ -0,0 +1,70 @@
+"""
+One-pass line counts (total, code, comment, blank) over text that may
+arrive in pieces. Counts match splitting the whole text on '\n' and
+classifying each stripped line, without building the list of lines (or the
+filtered copies of it) for the whole file.
+"""
+from typing import Dict, List
+
+# Pieces of a fully in-memory string are fed this many characters at a time
+CHUNK_CHARS = 1 << 20
+
+
+class LineCounter:
+    __slots__ = ("comment_prefix", "total", "code", "comment", "blank", "_partial")
+
+    def __init__(self, comment_prefix: str):
+        self.comment_prefix = comment_prefix
+        self.total = 0
+        self.code = 0
+        self.comment = 0
+        self.blank = 0
+        # Text of the current, not yet terminated line
+        self._partial: List[str] = []
+
+    def _count(self, lines: List[str]) -> None:
+        prefix = self.comment_prefix
+        code = comment = blank = 0
+        for line in lines:
+            stripped = line.strip()
+            if not stripped:
+                blank += 1
+            elif stripped.startswith(prefix):
+                comment += 1
+            else:
+                code += 1
+        self.total += len(lines)
+        self.code += code
+        self.comment += comment
+        self.blank += blank
+
+    def feed(self, text: str) -> None:
+        cut = text.rfind("\n")
+        if cut == -1:
+            self._partial.append(text)
+            return
+        self._partial.append(text[:cut])
+        block = "".join(self._partial)
+        self._partial = [text[cut + 1:]]
+        self._count(block.split("\n"))
+
+    def finish(self) -> "LineCounter":
+        # Like str.split, the text after the last newline is a line even when empty
+        self._count(["".join(self._partial)])
+        self._partial = []
+        return self
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "total_lines": self.total,
+            "lines_of_code": self.code,
+            "comment_lines": self.comment,
+            "blank_lines": self.blank,
+        }
+
+
+def count_lines(text: str, comment_prefix: str) -> LineCounter:
+    counter = LineCounter(comment_prefix)
+    for start in range(0, len(text), CHUNK_CHARS):
+        counter.feed(text[start:start + CHUNK_CHARS])
+    return counter.finish()
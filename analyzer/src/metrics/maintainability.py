@@ -0,0 +1,35 @@
+"""
+Maintainability index, vectorized over many functions at once.
+
+The classic formula is
+
+    MI = 171 - 5.2 ln(HalsteadVolume) - 0.23 CyclomaticComplexity - 16.2 ln(LOC)
+
+rescaled to 0-100 as Visual Studio does. The parsers don't compute Halstead
+volume, so that term is left out: scores here run higher than tools that
+include it and are meant for comparing functions, directories and runs of
+this analyzer with each other.
+"""
+from typing import Optional
+
+import numpy as np
+
+# Visual Studio's bands on the 0-100 scale
+LOW_THRESHOLD = 10
+MODERATE_THRESHOLD = 20
+
+
+def maintainability_index(complexity: np.ndarray, lines_of_code: np.ndarray) -> np.ndarray:
+    """Per-function index in [0, 100]"""
+    loc = np.maximum(lines_of_code, 1).astype(np.float64)
+    raw = 171.0 - 0.23 * complexity - 16.2 * np.log(loc)
+    return np.clip(raw * 100.0 / 171.0, 0.0, 100.0)
+
+
+def weighted_index(index: np.ndarray, lines_of_code: np.ndarray) -> Optional[float]:
+    """LOC-weighted mean, so a repo's long functions count for more than its
+    one-line helpers; None when there are no functions"""
+    if not len(index):
+        return None
+    return round(float(np.average(index, weights=np.maximum(lines_of_code, 1))), 2)
+
@@ -3,7 +3,9 @@ Single source of truth for turning a list of issues into a 0-100 score.
 Kept separate from routes.py so it's independently testable and isn't
 duplicated or drifted between endpoints.
 """
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any
+
+from ..analyzers.rule_table import Finding
 
 SEVERITY_WEIGHTS = {"high": 20, "medium": 10, "low": 4}
 
@@ -16,8 +18,11 @@ MIN_SCORE = 10
 MAX_SCORE = 100
 
 
-def compute_score(issues: List[Dict[str, Any]]) -> int:
-    if not issues:
+def compute_score(issues: List[Dict[str, Any]], findings: Iterable[Finding] = ()) -> int:
+    """issues are dicts with "severity" and "category" (LLM issues carry
+    "type" instead, so get no multiplier); findings are static rule hits"""
+    findings = list(findings)
+    if not issues and not findings:
         return MAX_SCORE
 
     deduction = 0.0
@@ -25,6 +30,11 @@ def compute_score(issues: List[Dict[str, Any]]) -> int:
         base = SEVERITY_WEIGHTS.get(issue.get("severity", "low"), 4)
         multiplier = CATEGORY_MULTIPLIER.get(issue.get("category", ""), 1.0)
         deduction += base * multiplier
+    for finding in findings:
+        # Severity only, deliberately: static issues were once dicts with
+        # their category under "type", which the multiplier never read, and
+        # applying it now would lower every stored score's baseline
+        deduction += SEVERITY_WEIGHTS.get(finding.effective_severity, 4)
 
     return max(int(MAX_SCORE - deduction), MIN_SCORE)
 
@@ -0,0 +1,220 @@
+"""
+Pool of long-lived Node processes running js_ast/worker.js, so files that
+need @babel/parser (TypeScript, TSX, newer syntax) are parsed without paying
+Node's startup cost per file.
+
+Each worker handles one request at a time over length-prefixed JSON frames
+on its stdin/stdout. A worker that crashes or overruns the per-file timeout
+(which covers writing the request as well as reading the reply) is killed
+and replaced on its next use; callers beyond the queue limit are turned away
+instead of piling up behind a slow file.
+
+Pools are per process: the API process and every analysis pool worker each
+get their own, shaped by configure_babel_pool (the app passes its settings
+to each worker as the process pool's initializer). Without Node and
+`npm ci` in js_ast/ the pool is never used; see TypeScriptParser.
+"""
+import atexit
+import json
+import os
+import queue
+import select
+import shutil
+import struct
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+JS_AST_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "js_ast"))
+WORKER_SCRIPT = os.path.join(JS_AST_DIR, "worker.js")
+
+_HEADER = struct.Struct(">I")
+
+
+class BabelWorkerError(RuntimeError):
+    """The worker died or broke protocol while handling a request"""
+
+
+class BabelPoolBusy(RuntimeError):
+    """Every worker is busy and the wait queue is full"""
+
+
+def babel_available(node_bin: str = "node") -> bool:
+    """Node on PATH and `npm ci` run in js_ast/"""
+    return (
+        shutil.which(node_bin) is not None
+        and os.path.isdir(os.path.join(JS_AST_DIR, "node_modules", "@babel", "parser"))
+    )
+
+
+class _NodeWorker:
+    """One Node process; not thread-safe, the pool hands it to one caller at a time"""
+
+    def __init__(self, command: List[str]):
+        self.command = command
+        self.process: Optional[subprocess.Popen] = None
+        self.requests_served = 0
+
+    def request(self, payload: Dict[str, Any], timeout_seconds: float,
+                object_hook: Optional[Callable] = None) -> Any:
+        if self.process is None or self.process.poll() is not None:
+            self._start()
+
+        body = json.dumps(payload).encode("utf-8", "surrogatepass")
+        deadline = time.monotonic() + timeout_seconds
+        try:
+            self._write_all(_HEADER.pack(len(body)) + body, deadline)
+            (length,) = _HEADER.unpack(self._read_exact(_HEADER.size, deadline))
+            reply = self._read_exact(length, deadline)
+        except TimeoutError:
+            # The worker may still be busy with this file; a fresh one is cheaper than draining it
+            self.kill()
+            raise
+        except (BrokenPipeError, OSError, BabelWorkerError) as e:
+            self.kill()
+            raise BabelWorkerError(f"Babel worker failed: {e}") from e
+
+        self.requests_served += 1
+        return json.loads(reply, object_hook=object_hook)
+
+    def _start(self) -> None:
+        self.kill()
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=JS_AST_DIR,
+        )
+        # Writes go through _write_all, which waits for the pipe with a deadline
+        os.set_blocking(self.process.stdin.fileno(), False)
+        self.requests_served = 0
+
+    def _write_all(self, data: bytes, deadline: float) -> None:
+        fd = self.process.stdin.fileno()
+        view = memoryview(data)
+        while view:
+            wait = deadline - time.monotonic()
+            if wait <= 0 or not select.select([], [fd], [], wait)[1]:
+                raise TimeoutError("Babel worker timed out")
+            try:
+                written = os.write(fd, view)
+            except BlockingIOError:
+                continue
+            view = view[written:]
+
+    def _read_exact(self, size: int, deadline: float) -> bytes:
+        fd = self.process.stdout.fileno()
+        parts = []
+        remaining = size
+        while remaining:
+            wait = deadline - time.monotonic()
+            if wait <= 0 or not select.select([fd], [], [], wait)[0]:
+                raise TimeoutError("Babel worker timed out")
+            chunk = os.read(fd, min(remaining, 1 << 20))
+            if not chunk:
+                raise BabelWorkerError(f"worker exited with code {self.process.poll()}")
+            parts.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(parts)
+
+    def kill(self) -> None:
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        self.process = None
+
+
+class BabelWorkerPool:
+    """Fixed set of Node workers shared by every thread in the process.
+
+    Workers start lazily, so an idle pool costs nothing. A request waits for
+    a free worker only while fewer than max_queue other callers are already
+    waiting; past that it raises BabelPoolBusy straight away."""
+
+    def __init__(self, size: int = 2, timeout_seconds: float = 10.0, max_queue: int = 32,
+                 command: Optional[List[str]] = None, object_hook: Optional[Callable] = None):
+        self.size = size
+        self.timeout_seconds = timeout_seconds
+        self.max_queue = max_queue
+        self.object_hook = object_hook
+        self.command = command or ["node", WORKER_SCRIPT]
+        self._workers = [_NodeWorker(self.command) for _ in range(size)]
+        self._idle: "queue.Queue[_NodeWorker]" = queue.Queue()
+        for worker in self._workers:
+            self._idle.put(worker)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self.timeouts = 0
+        self.crashes = 0
+
+    def parse(self, code: str) -> Any:
+        """Decoded worker reply for one file: {"ast": ...} or {"error": ...}.
+        Raises TimeoutError, BabelWorkerError or BabelPoolBusy."""
+        with self._lock:
+            if self._waiting >= self.max_queue:
+                raise BabelPoolBusy("Babel worker queue is full")
+            self._waiting += 1
+        try:
+            worker = self._idle.get()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        try:
+            return worker.request({"code": code}, self.timeout_seconds, self.object_hook)
+        except TimeoutError:
+            self.timeouts += 1
+            raise
+        except BabelWorkerError:
+            self.crashes += 1
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.kill()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.size,
+            "running": sum(1 for w in self._workers if w.process is not None),
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+        }
+
+
+_pool: Optional[BabelWorkerPool] = None
+_pool_lock = threading.Lock()
+
+# Shape of this process' pool; see configure_babel_pool
+_pool_config: Dict[str, Any] = {"size": 1, "timeout_seconds": 10.0, "max_queue": 32}
+
+
+def configure_babel_pool(size: int, timeout_seconds: float, max_queue: int) -> None:
+    """Set the shape of this process' pool. Takes effect for a pool not yet
+    created, so call it at process start."""
+    _pool_config.update(size=size, timeout_seconds=timeout_seconds, max_queue=max_queue)
+
+
+def get_babel_pool(object_hook: Optional[Callable] = None) -> BabelWorkerPool:
+    """The per-process pool, created on first use as configured"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BabelWorkerPool(object_hook=object_hook, **_pool_config)
+            atexit.register(_pool.close)
+        return _pool
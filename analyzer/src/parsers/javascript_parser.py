@@ -6,6 +6,10 @@ try:
 except ImportError:  # pragma: no cover
     esprima = None
 
+from ..analyzers.rule_engine import LoopFrame, RuleContext, rules_for
+from ..analyzers.rule_table import Finding
+from ..metrics.line_metrics import count_lines
+
 logger = structlog.get_logger()
 
 DECISION_TYPES = {
@@ -15,43 +19,171 @@ DECISION_TYPES = {
 FUNCTION_TYPES = {"FunctionDeclaration", "FunctionExpression", "ArrowFunctionExpression"}
 
 
-def _walk(node):
-    """Generic recursive walker over esprima's dict-based AST (from toDict())."""
-    if isinstance(node, dict):
-        yield node
-        for value in node.values():
-            yield from _walk(value)
-    elif isinstance(node, list):
-        for item in node:
-            yield from _walk(item)
+LOOP_TYPES = {"ForStatement", "ForInStatement", "ForOfStatement", "WhileStatement", "DoWhileStatement"}
+CLASS_TYPES = {"ClassDeclaration", "ClassExpression"}
 
+# Markers pushed on the traversal stack to run work when a subtree is done
+_ENTER_LOOP_BODY = object()
+_EXIT_LOOP_BODY = object()
+_EXIT_FUNCTION = object()
+_EXIT_NODE = object()
 
-def _line_span(node):
-    loc = node.get("loc") or {}
-    start = loc.get("start", {}).get("line", 0)
-    end = loc.get("end", {}).get("line", start)
-    return start, end
 
+class JsonNode:
+    """Attribute view over one decoded JSON object (use as json object_hook),
+    so a dict AST such as Babel's ESTree output walks through the same
+    visitor as esprima's node objects. Missing fields read as None."""
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.__dict__ = fields
+
+    def __getattr__(self, name):
+        return None
 
-def _cyclomatic_complexity(node) -> int:
-    complexity = 1
-    for child in _walk(node):
-        t = child.get("type")
-        if t in DECISION_TYPES:
-            complexity += 1
-        elif t == "SwitchCase" and child.get("test") is not None:
-            complexity += 1
-        elif t == "LogicalExpression" and child.get("operator") in ("&&", "||"):
-            complexity += 1
-    return complexity
+
+_NODE_CLASSES = (JsonNode, esprima.nodes.Node) if esprima is not None else (JsonNode,)
+
+
+def _line_span(node):
+    loc = node.loc
+    if loc is None:
+        return 0, 0
+    return loc.start.line, loc.end.line
 
 
 def _function_name(node) -> str:
-    if node.get("id") and node["id"].get("name"):
-        return node["id"]["name"]
+    if node.id is not None and node.id.name:
+        return node.id.name
     return "anonymous"
 
 
+class _SinglePassVisitor:
+    """
+    Collects functions and classes in one iterative preorder walk over
+    esprima's node objects (or JsonNodes), so no dict copy of the tree is
+    built and deep nesting can't hit the recursion limit, running the
+    javascript rules of analyzers.rule_engine on the way.
+
+    Children are visited in field order, matching a walk over toDict().
+    Function complexity comes from a decision counter snapshotted on entry
+    and read back on exit; nested-loop detection tracks which loop bodies
+    are open, so no subtree is ever walked twice. Rule findings are ordered
+    by preorder index.
+    """
+
+    def __init__(self):
+        self.functions: List[Dict[str, Any]] = []
+        self.classes: List[Dict[str, Any]] = []
+        self.issues: List[Finding] = []
+
+    def visit(self, tree) -> None:
+        functions, classes = self.functions, self.classes
+        open_bodies = []  # LoopFrames whose body is being walked
+        decisions = 0
+        index = 0
+        node_classes = _NODE_CLASSES
+        rules = rules_for("javascript")
+        enter_rules, exit_rules = rules.enter, rules.exit
+        ctx = RuleContext(rules)
+
+        stack = [tree]
+        while stack:
+            item = stack.pop()
+
+            if type(item) is tuple:
+                marker, payload = item
+                if marker is _ENTER_LOOP_BODY:
+                    open_bodies.append(payload)
+                elif marker is _EXIT_LOOP_BODY:
+                    open_bodies.pop()
+                elif marker is _EXIT_FUNCTION:
+                    record, decisions_at_entry = payload
+                    record["complexity"] = 1 + decisions - decisions_at_entry
+                else:
+                    node, ctx.key, ctx.record = payload
+                    for handler in exit_rules[node.type]:
+                        handler(node, ctx)
+                continue
+            if isinstance(item, list):
+                stack.extend(reversed(item))
+                continue
+            if not isinstance(item, node_classes):
+                continue
+
+            t = item.type
+            key = index
+            index += 1
+            record = None
+            if t in DECISION_TYPES:
+                decisions += 1
+            elif t == "SwitchCase":
+                if item.test is not None:
+                    decisions += 1
+            elif t == "LogicalExpression":
+                if item.operator in ("&&", "||"):
+                    decisions += 1
+
+            if t in FUNCTION_TYPES:
+                start, end = _line_span(item)
+                record = {
+                    "name": _function_name(item),
+                    "line_start": start,
+                    "line_end": end,
+                    "complexity": 1,
+                    "parameters": len(item.params or []),
+                    "lines_of_code": max(end - start + 1, 1),
+                }
+                functions.append(record)
+                if t in exit_rules:
+                    # Below _EXIT_FUNCTION, so rules see the final complexity
+                    stack.append((_EXIT_NODE, (item, key, JsonNode(record))))
+                stack.append((_EXIT_FUNCTION, (record, decisions)))
+                record = None
+            elif t in CLASS_TYPES:
+                start, end = _line_span(item)
+                body = item.body.body if item.body is not None else None
+                record = {
+                    "name": item.id.name if item.id is not None and item.id.name is not None else "anonymous",
+                    "line_start": start,
+                    "line_end": end,
+                    "methods": sum(1 for m in body or [] if m is not None and m.type == "MethodDefinition"),
+                    "lines_of_code": max(end - start + 1, 1),
+                }
+                classes.append(record)
+
+            loop = None
+            if t in LOOP_TYPES:
+                if open_bodies:
+                    open_bodies[-1].nested = True
+                loop = LoopFrame(_line_span(item)[0])
+                if t in exit_rules:
+                    stack.append((_EXIT_NODE, (item, key, loop)))
+            elif t in exit_rules and t not in FUNCTION_TYPES:
+                stack.append((_EXIT_NODE, (item, key, None)))
+
+            handlers = enter_rules.get(t)
+            if handlers:
+                # Rules read records through the same attribute view as nodes
+                ctx.key, ctx.record = key, JsonNode(record) if record is not None else None
+                for handler in handlers:
+                    handler(item, ctx)
+
+            children = [
+                (key, value) for key, value in item.__dict__.items()
+                if value is not None and key != "loc" and not key.startswith("_")
+            ]
+            for key, value in reversed(children):
+                if loop is not None and key == "body":
+                    # Only loops inside the body (not the test/update) count as nested
+                    stack.append((_EXIT_LOOP_BODY, None))
+                    stack.append(value)
+                    stack.append((_ENTER_LOOP_BODY, loop))
+                else:
+                    stack.append(value)
+
+        self.issues = ctx.findings()
+
+
 class JavaScriptParser:
     """Real AST-based analysis for JavaScript/JSX using esprima. TypeScript-only
     syntax (type annotations, interfaces) will fail to parse - caller should
@@ -70,7 +202,7 @@ class JavaScriptParser:
         try:
             tree = esprima.parseModule(
                 code, options={"loc": True, "jsx": True, "tolerant": True}
-            ).toDict()
+            )
         except Exception as e:
             self.logger.info(f"JS parse failed for {file_path}: {e}")
             return {
@@ -79,9 +211,12 @@ class JavaScriptParser:
                 "functions": [], "classes": [], "issues": [], "metrics": {},
             }
 
-        functions = self._extract_functions(tree)
-        classes = self._extract_classes(tree)
-        issues = self._detect_issues(tree, functions)
+        visitor = _SinglePassVisitor()
+        visitor.visit(tree)
+        functions = visitor.functions
+        classes = visitor.classes
+        # Raised by the rule engine during the traversal
+        issues = visitor.issues
 
         metrics = self._calculate_file_metrics(code, functions, classes)
 
@@ -94,127 +229,12 @@ class JavaScriptParser:
             "metrics": metrics,
         }
 
-    def _extract_functions(self, tree) -> List[Dict[str, Any]]:
-        functions = []
-        for node in _walk(tree):
-            if node.get("type") in FUNCTION_TYPES:
-                start, end = _line_span(node)
-                functions.append({
-                    "name": _function_name(node),
-                    "line_start": start,
-                    "line_end": end,
-                    "complexity": _cyclomatic_complexity(node),
-                    "parameters": len(node.get("params", [])),
-                    "lines_of_code": max(end - start + 1, 1),
-                })
-        return functions
-
-    def _extract_classes(self, tree) -> List[Dict[str, Any]]:
-        classes = []
-        for node in _walk(tree):
-            if node.get("type") in ("ClassDeclaration", "ClassExpression"):
-                start, end = _line_span(node)
-                body = (node.get("body") or {}).get("body", [])
-                methods = sum(1 for m in body if m.get("type") == "MethodDefinition")
-                classes.append({
-                    "name": (node.get("id") or {}).get("name", "anonymous"),
-                    "line_start": start,
-                    "line_end": end,
-                    "methods": methods,
-                    "lines_of_code": max(end - start + 1, 1),
-                })
-        return classes
-
-    def _detect_issues(self, tree, functions) -> List[Dict[str, Any]]:
-        issues = []
-
-        for func in functions:
-            if func["complexity"] > 10:
-                issues.append({
-                    "severity": "high" if func["complexity"] > 15 else "medium",
-                    "category": "complexity",
-                    "title": f"High cyclomatic complexity in function '{func['name']}'",
-                    "description": f"Function has complexity of {func['complexity']}, consider refactoring",
-                    "line": func["line_start"],
-                    "rule_id": "HIGH_COMPLEXITY",
-                })
-            if func["lines_of_code"] > 50:
-                issues.append({
-                    "severity": "medium",
-                    "category": "maintainability",
-                    "title": f"Long function '{func['name']}'",
-                    "description": f"Function has {func['lines_of_code']} lines, consider splitting",
-                    "line": func["line_start"],
-                    "rule_id": "LONG_FUNCTION",
-                })
-
-        for node in _walk(tree):
-            t = node.get("type")
-
-            # Empty catch block - swallows errors silently
-            if t == "CatchClause":
-                body = (node.get("body") or {}).get("body", [])
-                if not body:
-                    start, _ = _line_span(node)
-                    issues.append({
-                        "severity": "medium",
-                        "category": "style",
-                        "title": "Empty catch block",
-                        "description": "Catching an error and doing nothing hides real failures",
-                        "line": start,
-                        "rule_id": "EMPTY_CATCH",
-                    })
-
-            # var instead of let/const
-            if t == "VariableDeclaration" and node.get("kind") == "var":
-                start, _ = _line_span(node)
-                issues.append({
-                    "severity": "low",
-                    "category": "style",
-                    "title": "Use of 'var'",
-                    "description": "Prefer 'let' or 'const' over 'var' for block scoping",
-                    "line": start,
-                    "rule_id": "VAR_USAGE",
-                })
-
-            # Loose equality
-            if t == "BinaryExpression" and node.get("operator") in ("==", "!="):
-                start, _ = _line_span(node)
-                issues.append({
-                    "severity": "low",
-                    "category": "style",
-                    "title": f"Loose equality operator '{node.get('operator')}'",
-                    "description": "Use strict equality (=== or !==) to avoid type coercion bugs",
-                    "line": start,
-                    "rule_id": "LOOSE_EQUALITY",
-                })
-
-        # Nested loops - real performance risk
-        loop_types = {"ForStatement", "ForInStatement", "ForOfStatement", "WhileStatement", "DoWhileStatement"}
-        for node in _walk(tree):
-            if node.get("type") in loop_types:
-                body = node.get("body")
-                for child in _walk(body):
-                    if child is not node and child.get("type") in loop_types:
-                        start, _ = _line_span(node)
-                        issues.append({
-                            "severity": "medium",
-                            "category": "performance",
-                            "title": "Nested loop detected",
-                            "description": "Nested loops can lead to O(n^2) or worse time complexity - verify this scales for expected input size",
-                            "line": start,
-                            "rule_id": "NESTED_LOOP",
-                        })
-                        break
-
-        return issues
-
     def _calculate_file_metrics(self, code, functions, classes) -> Dict[str, Any]:
-        lines = code.split("\n")
+        lines = count_lines(code, "//")
         complexities = [f["complexity"] for f in functions]
         return {
-            "total_lines": len(lines),
-            "lines_of_code": len([l for l in lines if l.strip() and not l.strip().startswith("//")]),
+            "total_lines": lines.total,
+            "lines_of_code": lines.code,
             "function_count": len(functions),
             "class_count": len(classes),
             "average_function_complexity": sum(complexities) / len(complexities) if complexities else 0,
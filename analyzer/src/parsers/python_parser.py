@@ -3,6 +3,10 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 import structlog
 
+from ..analyzers.rule_engine import LoopFrame, RuleContext, rules_for
+from ..analyzers.rule_table import Finding
+from ..metrics.line_metrics import count_lines
+
 logger = structlog.get_logger()
 
 
@@ -31,6 +35,183 @@ class ClassMetrics:
     lines_of_code: int
 
 
+_FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+_LOOP_NODES = (ast.For, ast.While)
+# Nodes that add a level of nesting for cognitive complexity
+_BRANCH_NODES = (ast.If, ast.For, ast.While)
+# Nodes cognitive complexity scores once without descending into
+_OPAQUE_NODES = (ast.ExceptHandler, ast.BoolOp, ast.Compare)
+_COMPREHENSION_NODES = (ast.ListComp, ast.DictComp, ast.SetComp, ast.GeneratorExp)
+
+
+class _FunctionFrame:
+    """Running totals for a function whose subtree is still being walked"""
+    __slots__ = ("node", "decisions", "returns", "branch_depth", "opaque_depth", "cognitive")
+
+    def __init__(self, node, decisions, returns, branch_depth, opaque_depth):
+        self.node = node
+        self.decisions = decisions
+        self.returns = returns
+        self.branch_depth = branch_depth
+        self.opaque_depth = opaque_depth
+        self.cognitive = 0
+
+
+class _SinglePassVisitor:
+    """
+    Collects functions, classes and imports in one iterative depth-first
+    traversal, running the python rules of analyzers.rule_engine on the way.
+
+    Per-function totals come from counters snapshotted on entry and read back
+    on exit, so nested functions never trigger a re-walk. Results are emitted
+    in ast.walk (breadth-first) order: each item is keyed by (depth, preorder
+    index), and nodes at equal depth are visited in preorder order by a BFS.
+    Rule findings are ordered by the same keys.
+    """
+
+    def __init__(self):
+        self.functions: List[FunctionMetrics] = []
+        self.classes: List[ClassMetrics] = []
+        self.imports: List[Dict[str, Any]] = []
+        self.issues: List[Finding] = []
+
+    def visit(self, tree: ast.AST) -> None:
+        functions, classes, imports = [], [], []
+        frames: List[_FunctionFrame] = []
+        loops: List[LoopFrame] = []
+        decisions = returns = branch_depth = opaque_depth = 0
+        index = 0
+        rules = rules_for("python")
+        enter_rules, exit_rules = rules.enter, rules.exit
+        ctx = RuleContext(rules)
+
+        # (node, depth, None) to enter a node; (node, depth, key) to leave it
+        stack = [(tree, 0, None)]
+        while stack:
+            node, depth, entry_key = stack.pop()
+
+            if entry_key is not None:
+                record = None
+                if isinstance(node, _BRANCH_NODES):
+                    branch_depth -= 1
+                elif isinstance(node, _OPAQUE_NODES):
+                    opaque_depth -= 1
+                if isinstance(node, _LOOP_NODES):
+                    record = loops.pop()
+                elif isinstance(node, _FUNCTION_NODES):
+                    frame = frames.pop()
+                    line_end = node.end_lineno or node.lineno
+                    record = FunctionMetrics(
+                        name=node.name,
+                        line_start=node.lineno,
+                        line_end=line_end,
+                        complexity=1 + decisions - frame.decisions,
+                        parameters=len(node.args.args),
+                        returns=returns > frame.returns,
+                        lines_of_code=line_end - node.lineno + 1,
+                        cognitive_complexity=frame.cognitive
+                    )
+                    functions.append((entry_key, record))
+                handlers = exit_rules.get(type(node))
+                if handlers:
+                    ctx.key, ctx.depth, ctx.record = entry_key, depth, record
+                    for handler in handlers:
+                        handler(node, ctx)
+                continue
+
+            key = (depth, index)
+            index += 1
+            leave = False
+            record = None
+
+            if isinstance(node, _BRANCH_NODES):
+                decisions += 1
+                # Enclosing functions whose view of this node isn't hidden
+                # behind an opaque node form a suffix of the frame stack
+                for frame in reversed(frames):
+                    if frame.opaque_depth != opaque_depth:
+                        break
+                    frame.cognitive += 1 + branch_depth - frame.branch_depth
+                branch_depth += 1
+                leave = True
+                if isinstance(node, _LOOP_NODES):
+                    if loops:
+                        loops[-1].nested = True
+                    loops.append(LoopFrame(node.lineno))
+            elif isinstance(node, _OPAQUE_NODES):
+                if isinstance(node, ast.ExceptHandler):
+                    decisions += 1
+                    for frame in reversed(frames):
+                        if frame.opaque_depth != opaque_depth:
+                            break
+                        frame.cognitive += 1 + branch_depth - frame.branch_depth
+                else:
+                    if isinstance(node, ast.BoolOp):
+                        decisions += len(node.values) - 1
+                    for frame in reversed(frames):
+                        if frame.opaque_depth != opaque_depth:
+                            break
+                        frame.cognitive += 1
+                opaque_depth += 1
+                leave = True
+            elif isinstance(node, _COMPREHENSION_NODES):
+                decisions += 1
+            elif isinstance(node, ast.Return):
+                returns += 1
+            elif isinstance(node, _FUNCTION_NODES):
+                frames.append(_FunctionFrame(node, decisions, returns, branch_depth, opaque_depth))
+                leave = True
+            elif isinstance(node, ast.ClassDef):
+                line_end = node.end_lineno or node.lineno
+                record = ClassMetrics(
+                    name=node.name,
+                    line_start=node.lineno,
+                    line_end=line_end,
+                    methods=sum(1 for n in node.body if isinstance(n, _FUNCTION_NODES)),
+                    attributes=sum(1 for n in node.body if isinstance(n, ast.Assign)),
+                    inheritance_depth=len(node.bases),
+                    lines_of_code=line_end - node.lineno + 1
+                )
+                classes.append((key, record))
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    imports.append((key, {
+                        "module": alias.name,
+                        "alias": alias.asname,
+                        "line": node.lineno
+                    }))
+            elif isinstance(node, ast.ImportFrom):
+                for alias in node.names:
+                    imports.append((key, {
+                        "module": f"{node.module}.{alias.name}" if node.module else alias.name,
+                        "alias": alias.asname,
+                        "line": node.lineno
+                    }))
+
+            handlers = enter_rules.get(type(node))
+            if handlers:
+                ctx.key, ctx.depth, ctx.record = key, depth, record
+                for handler in handlers:
+                    handler(node, ctx)
+
+            if leave or type(node) in exit_rules:
+                stack.append((node, depth, key))
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            stack.extend((child, depth + 1, None) for child in children)
+
+        self.functions = _in_walk_order(functions)
+        self.classes = _in_walk_order(classes)
+        self.imports = _in_walk_order(imports)
+        self.issues = ctx.findings()
+
+
+def _in_walk_order(keyed: List[tuple]) -> List[Any]:
+    # sort() is stable, so several imports from one statement keep their order
+    keyed.sort(key=lambda item: item[0])
+    return [value for _, value in keyed]
+
+
 class PythonParser:
     """Advanced Python code parser using AST"""
     
@@ -50,14 +231,19 @@ class PythonParser:
         """
         try:
             tree = ast.parse(code)
+
+            # One traversal collects functions, classes, imports and the
+            # node-level issue candidates; everything below reuses it
+            visitor = _SinglePassVisitor()
+            visitor.visit(tree)
             
             results = {
                 "file_path": file_path,
                 "language": "python",
-                "functions": self._extract_functions(tree, code),
-                "classes": self._extract_classes(tree, code),
-                "imports": self._extract_imports(tree),
-                "complexity": self._calculate_complexity(tree),
+                "functions": visitor.functions,
+                "classes": visitor.classes,
+                "imports": visitor.imports,
+                "complexity": self._calculate_complexity(visitor.functions),
                 "issues": [],
                 "metrics": {}
             }
@@ -65,8 +251,8 @@ class PythonParser:
             # Calculate file-level metrics
             results["metrics"] = self._calculate_file_metrics(results, code)
             
-            # Detect issues
-            results["issues"] = self._detect_issues(tree, code, results)
+            # Issues were raised by the rule engine during the traversal
+            results["issues"] = visitor.issues
             
             return results
             
@@ -84,234 +270,29 @@ class PythonParser:
             self.logger.error(f"Error parsing {file_path}", error=str(e))
             raise
     
-    def _extract_functions(self, tree: ast.AST, code: str) -> List[FunctionMetrics]:
-        """Extract all function definitions and their metrics"""
-        functions = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                metrics = FunctionMetrics(
-                    name=node.name,
-                    line_start=node.lineno,
-                    line_end=node.end_lineno or node.lineno,
-                    complexity=self._calculate_cyclomatic_complexity(node),
-                    parameters=len(node.args.args),
-                    returns=any(isinstance(n, ast.Return) for n in ast.walk(node)),
-                    lines_of_code=self._count_lines_of_code(node),
-                    cognitive_complexity=self._calculate_cognitive_complexity(node)
-                )
-                functions.append(metrics)
-        
-        return functions
-    
-    def _extract_classes(self, tree: ast.AST, code: str) -> List[ClassMetrics]:
-        """Extract all class definitions and their metrics"""
-        classes = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                methods = sum(1 for n in node.body if isinstance(n, ast.FunctionDef))
-                attributes = sum(1 for n in node.body if isinstance(n, ast.Assign))
-                
-                metrics = ClassMetrics(
-                    name=node.name,
-                    line_start=node.lineno,
-                    line_end=node.end_lineno or node.lineno,
-                    methods=methods,
-                    attributes=attributes,
-                    inheritance_depth=len(node.bases),
-                    lines_of_code=self._count_lines_of_code(node)
-                )
-                classes.append(metrics)
-        
-        return classes
-    
-    def _extract_imports(self, tree: ast.AST) -> List[Dict[str, Any]]:
-        """Extract all import statements"""
-        imports = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Import):
-                for alias in node.names:
-                    imports.append({
-                        "module": alias.name,
-                        "alias": alias.asname,
-                        "line": node.lineno
-                    })
-            elif isinstance(node, ast.ImportFrom):
-                for alias in node.names:
-                    imports.append({
-                        "module": f"{node.module}.{alias.name}" if node.module else alias.name,
-                        "alias": alias.asname,
-                        "line": node.lineno
-                    })
-        
-        return imports
-    
-    def _calculate_cyclomatic_complexity(self, node: ast.AST) -> int:
-        """Calculate McCabe cyclomatic complexity"""
-        complexity = 1  # Base complexity
-        
-        for child in ast.walk(node):
-            # Add 1 for each decision point
-            if isinstance(child, (ast.If, ast.While, ast.For, ast.ExceptHandler)):
-                complexity += 1
-            elif isinstance(child, ast.BoolOp):
-                complexity += len(child.values) - 1
-            elif isinstance(child, (ast.ListComp, ast.DictComp, ast.SetComp, ast.GeneratorExp)):
-                complexity += 1
-        
-        return complexity
-    
-    def _calculate_cognitive_complexity(self, node: ast.AST, nesting: int = 0) -> int:
-        """Calculate cognitive complexity (more human-friendly than cyclomatic)"""
-        complexity = 0
-        
-        for child in ast.iter_child_nodes(node):
-            if isinstance(child, (ast.If, ast.While, ast.For)):
-                complexity += 1 + nesting
-                complexity += self._calculate_cognitive_complexity(child, nesting + 1)
-            elif isinstance(child, ast.ExceptHandler):
-                complexity += 1 + nesting
-            elif isinstance(child, (ast.BoolOp, ast.Compare)):
-                complexity += 1
-            else:
-                complexity += self._calculate_cognitive_complexity(child, nesting)
-        
-        return complexity
-    
-    def _count_lines_of_code(self, node: ast.AST) -> int:
-        """Count actual lines of code (excluding comments and blank lines)"""
-        if hasattr(node, 'end_lineno') and node.end_lineno:
-            return node.end_lineno - node.lineno + 1
-        return 1
-    
-    def _calculate_complexity(self, tree: ast.AST) -> Dict[str, int]:
+    def _calculate_complexity(self, functions: List[FunctionMetrics]) -> Dict[str, int]:
         """Calculate overall file complexity metrics"""
-        total_complexity = 0
-        max_complexity = 0
-        function_count = 0
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                complexity = self._calculate_cyclomatic_complexity(node)
-                total_complexity += complexity
-                max_complexity = max(max_complexity, complexity)
-                function_count += 1
-        
+        total_complexity = sum(f.complexity for f in functions)
+        max_complexity = max((f.complexity for f in functions), default=0)
+
         return {
             "total": total_complexity,
             "max": max_complexity,
-            "average": total_complexity / function_count if function_count > 0 else 0
+            "average": total_complexity / len(functions) if functions else 0
         }
     
     def _calculate_file_metrics(self, results: Dict, code: str) -> Dict[str, Any]:
         """Calculate comprehensive file-level metrics"""
-        lines = code.split('\n')
+        lines = count_lines(code, '#')
         
         return {
-            "total_lines": len(lines),
-            "lines_of_code": len([l for l in lines if l.strip() and not l.strip().startswith('#')]),
-            "comment_lines": len([l for l in lines if l.strip().startswith('#')]),
-            "blank_lines": len([l for l in lines if not l.strip()]),
+            "total_lines": lines.total,
+            "lines_of_code": lines.code,
+            "comment_lines": lines.comment,
+            "blank_lines": lines.blank,
             "function_count": len(results["functions"]),
             "class_count": len(results["classes"]),
             "import_count": len(results["imports"]),
             "average_function_complexity": sum(f.complexity for f in results["functions"]) / len(results["functions"]) if results["functions"] else 0,
             "max_function_complexity": max((f.complexity for f in results["functions"]), default=0)
         }
-    
-    def _detect_issues(self, tree: ast.AST, code: str, results: Dict) -> List[Dict[str, Any]]:
-        """Detect potential code issues and anti-patterns"""
-        issues = []
-        
-        # Check for high complexity functions
-        for func in results["functions"]:
-            if func.complexity > 10:
-                issues.append({
-                    "severity": "high" if func.complexity > 15 else "medium",
-                    "category": "complexity",
-                    "title": f"High cyclomatic complexity in function '{func.name}'",
-                    "description": f"Function has complexity of {func.complexity}, consider refactoring",
-                    "line": func.line_start,
-                    "rule_id": "HIGH_COMPLEXITY"
-                })
-            
-            if func.cognitive_complexity > 15:
-                issues.append({
-                    "severity": "medium",
-                    "category": "complexity",
-                    "title": f"High cognitive complexity in function '{func.name}'",
-                    "description": f"Function has cognitive complexity of {func.cognitive_complexity}",
-                    "line": func.line_start,
-                    "rule_id": "HIGH_COGNITIVE_COMPLEXITY"
-                })
-            
-            if func.lines_of_code > 50:
-                issues.append({
-                    "severity": "medium",
-                    "category": "maintainability",
-                    "title": f"Long function '{func.name}'",
-                    "description": f"Function has {func.lines_of_code} lines, consider splitting",
-                    "line": func.line_start,
-                    "rule_id": "LONG_FUNCTION"
-                })
-        
-        # Check for large classes
-        for cls in results["classes"]:
-            if cls.methods > 20:
-                issues.append({
-                    "severity": "medium",
-                    "category": "maintainability",
-                    "title": f"Class '{cls.name}' has too many methods",
-                    "description": f"Class has {cls.methods} methods, consider splitting responsibilities",
-                    "line": cls.line_start,
-                    "rule_id": "TOO_MANY_METHODS"
-                })
-        
-        # Detect common anti-patterns
-        for node in ast.walk(tree):
-            # Bare except clauses
-            if isinstance(node, ast.ExceptHandler) and node.type is None:
-                issues.append({
-                    "severity": "medium",
-                    "category": "style",
-                    "title": "Bare except clause",
-                    "description": "Using bare 'except:' catches all exceptions, specify exception types",
-                    "line": node.lineno,
-                    "rule_id": "BARE_EXCEPT"
-                })
-
-        # Global variables (excluding constants) - only true module-level assignments,
-        # not ones nested inside functions/methods/classes
-        for node in tree.body:
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        if not target.id.isupper():  # Not a constant
-                            issues.append({
-                                "severity": "low",
-                                "category": "style",
-                                "title": f"Global variable '{target.id}'",
-                                "description": "Global variables can make code harder to maintain",
-                                "line": node.lineno,
-                                "rule_id": "GLOBAL_VARIABLE"
-                            })
-
-        # Detect nested loops (real performance risk, not a guess)
-        loop_types = (ast.For, ast.While)
-        for node in ast.walk(tree):
-            if isinstance(node, loop_types):
-                for child in ast.walk(node):
-                    if child is not node and isinstance(child, loop_types):
-                        issues.append({
-                            "severity": "medium",
-                            "category": "performance",
-                            "title": "Nested loop detected",
-                            "description": "Nested loops can lead to O(n^2) or worse time complexity - verify this scales for expected input size",
-                            "line": node.lineno,
-                            "rule_id": "NESTED_LOOP",
-                        })
-                        break  # only flag once per outer loop
-
-        return issues
\ No newline at end of file
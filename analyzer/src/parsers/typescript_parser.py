@@ -0,0 +1,54 @@
+from typing import Dict, Any
+
+from .babel_worker_pool import BabelPoolBusy, BabelWorkerError, babel_available, get_babel_pool
+from .javascript_parser import JavaScriptParser, JsonNode, _SinglePassVisitor
+
+
+class TypeScriptParser(JavaScriptParser):
+    """AST-based analysis for TypeScript/TSX (and any JS esprima rejects) via
+    @babel/parser running in a pool of persistent Node workers. The ESTree
+    output goes through the JavaScript visitor, so rules and metrics are the
+    same as for .js files. Without Node or js_ast/node_modules this falls
+    back to esprima, which handles TS files that avoid TS-only syntax."""
+
+    def __init__(self):
+        super().__init__()
+        self.logger = self.logger.bind(parser="typescript")
+
+    def parse(self, code: str, file_path: str) -> Dict[str, Any]:
+        if not babel_available():
+            return super().parse(code, file_path)
+
+        pool = get_babel_pool(object_hook=JsonNode)
+        try:
+            reply = pool.parse(code)
+        except (TimeoutError, BabelWorkerError, BabelPoolBusy) as e:
+            self.logger.info(f"Babel parse failed for {file_path}: {e}")
+            return {
+                "file_path": file_path, "error": f"Babel parser unavailable: {e}",
+                "functions": [], "classes": [], "issues": [], "metrics": {},
+            }
+
+        if reply.error is not None:
+            return {
+                "file_path": file_path,
+                "error": f"Parse error: {reply.error}",
+                "functions": [], "classes": [], "issues": [], "metrics": {},
+            }
+
+        visitor = _SinglePassVisitor()
+        visitor.visit(reply.ast)
+        functions = visitor.functions
+        classes = visitor.classes
+        issues = visitor.issues
+
+        metrics = self._calculate_file_metrics(code, functions, classes)
+
+        return {
+            "file_path": file_path,
+            "language": "typescript",
+            "functions": functions,
+            "classes": classes,
+            "issues": issues,
+            "metrics": metrics,
+        }
@@ -1,2 +1,9 @@
 # Utils package
-__all__ = []
\ No newline at end of file
+from .cache import TieredCache, content_key
+from .result_store import ResultStore
+from .telemetry import AnalysisTrace, current_trace, stage, trace_analysis
+
+__all__ = [
+    'TieredCache', 'content_key', 'ResultStore',
+    'AnalysisTrace', 'current_trace', 'stage', 'trace_analysis',
+]
@@ -0,0 +1,215 @@
+"""
+Two-tier cache for JSON-serializable analysis results: a size-bounded
+in-memory LRU in front of an optional on-disk store, with a shared TTL. Keys are
+SHA-256 digests, so identical inputs (e.g. the same file content under the
+same rule-set version) resolve to the same entry across analyses and repos.
+
+Both tiers hold values JSON-encoded, so every get returns a fresh copy that
+callers may mutate (e.g. pop per-run keys) without touching the cache.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+# Disk writes between sweeps of the directory for expired entries (a sweep
+# also runs whenever the disk tier goes over its byte cap)
+DISK_SWEEP_WRITES = 500
+
+# An over-cap sweep evicts down to this share of the cap, so the next few
+# writes don't each trigger another sweep
+DISK_SWEEP_LOW_WATER = 0.9
+
+
+def content_key(*parts: str) -> str:
+    """SHA-256 over the given parts, NUL-separated so ('ab', 'c') != ('a', 'bc')"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class TieredCache:
+    """Memory LRU backed by a directory of JSON files, both under one TTL.
+
+    Disk hits are promoted into the memory tier, keeping their original
+    write time. Entries evicted from memory stay on disk until their TTL
+    runs out, so a process restart or a cold LRU still avoids
+    recomputation. Pass directory=None for memory only.
+
+    The disk tier is swept every DISK_SWEEP_WRITES writes, deleting expired
+    entries, and whenever it grows past max_disk_bytes, which also evicts
+    the oldest entries down to DISK_SWEEP_LOW_WATER of the cap. The byte
+    count is this process' estimate between sweeps; a sweep re-measures it.
+    """
+
+    def __init__(self, max_entries: int, directory: Optional[str] = None, ttl_seconds: int = 3600,
+                 max_disk_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_evictions = 0
+        self._disk_bytes = 0
+        self._writes_since_sweep = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._sweep_disk()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, encoded = entry
+            if time.time() - stored_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(encoded)
+            del self._entries[key]
+            self.expirations += 1
+
+        found = self._read_disk(key)
+        if found is not None:
+            stored_at, encoded = found
+            self.disk_hits += 1
+            self._remember(key, encoded, stored_at)
+            return json.loads(encoded)
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        try:
+            encoded = json.dumps(value, separators=(",", ":"))
+        except (TypeError, ValueError) as e:
+            logger.warning("Not caching unserializable value", key=key, error=str(e))
+            return
+        self._remember(key, encoded, time.time())
+        self._write_disk(key, encoded)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "disk_bytes": self._disk_bytes if self.directory else None,
+            "disk_evictions": self.disk_evictions,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, encoded: str, stored_at: float) -> None:
+        self._entries[key] = (stored_at, encoded)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        # Shard by the first byte so a busy cache doesn't put every entry in one directory
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, str]]:
+        """(write time, JSON text) of a live disk entry"""
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if time.time() - stored_at > self.ttl_seconds:
+                os.remove(path)
+                self.expirations += 1
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                encoded = f.read()
+            json.loads(encoded)  # a torn or corrupt file is a miss, not an error later
+            return stored_at, encoded
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Discarding unreadable cache entry", key=key, error=str(e))
+            return None
+
+    def _write_disk(self, key: str, encoded: str) -> None:
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(encoded)
+            # Atomic rename: concurrent readers see the old entry or the new one, never half of one
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Failed to persist cache entry", key=key, error=str(e))
+            return
+        self._disk_bytes += len(encoded)
+        self._writes_since_sweep += 1
+        if (self._writes_since_sweep >= DISK_SWEEP_WRITES
+                or (self.max_disk_bytes is not None and self._disk_bytes > self.max_disk_bytes)):
+            self._sweep_disk()
+
+    def _sweep_disk(self) -> None:
+        """Delete expired disk entries, then the oldest live ones while the
+        tier is over max_disk_bytes, and re-measure its size"""
+        self._writes_since_sweep = 0
+        now = time.time()
+        live: List[Tuple[float, int, str]] = []
+        total = 0
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                    if entry.name.endswith(".tmp"):
+                        # Another writer's, mid-write; only a stale one is ours to clear
+                        if now - stat.st_mtime > self.ttl_seconds:
+                            os.remove(entry.path)
+                        continue
+                    if now - stat.st_mtime > self.ttl_seconds:
+                        os.remove(entry.path)
+                        self.expirations += 1
+                        continue
+                except FileNotFoundError:
+                    continue  # removed concurrently
+                except OSError as e:
+                    logger.warning("Cache sweep skipped an entry", path=entry.path, error=str(e))
+                    continue
+                live.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if self.max_disk_bytes is not None and total > self.max_disk_bytes:
+            target = self.max_disk_bytes * DISK_SWEEP_LOW_WATER
+            live.sort()
+            for _, size, path in live:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning("Cache sweep could not evict an entry", path=path, error=str(e))
+                    continue
+                total -= size
+                self.disk_evictions += 1
+        self._disk_bytes = total
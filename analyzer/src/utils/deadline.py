@@ -0,0 +1,108 @@
+"""
+A per-analysis deadline that stages check cooperatively. Each stage bounds
+its awaits by the time left; when that runs out, in-flight work is
+cancelled and the stage records what it had to drop, so the analysis can
+still finish with everything gathered up to that point.
+
+Cancellation only reaches work that yields to the event loop: downloads and
+queued executor jobs stop, but a parse already running on a pool process or
+thread runs to completion in the background and its result is discarded.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Iterable, List, Optional, Sequence
+
+
+class DeadlineExceeded(Exception):
+    """A stage bounded by Deadline.wait_for ran out of time"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"{stage} did not finish before the analysis deadline")
+        self.stage = stage
+
+
+class Deadline:
+    """seconds=None never expires, so callers can thread one unconditionally"""
+    __slots__ = ("seconds", "expires_at", "skipped_stages", "skipped_files")
+
+    def __init__(self, seconds: Optional[float]):
+        self.seconds = seconds
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+        self.skipped_stages: List[str] = []
+        self.skipped_files: List[str] = []
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (never negative), or None without a deadline"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    @property
+    def missed(self) -> bool:
+        """Whether any stage lost work to the deadline"""
+        return bool(self.skipped_stages)
+
+    def skip(self, stage: str, paths: Iterable[str] = ()) -> None:
+        if stage not in self.skipped_stages:
+            self.skipped_stages.append(stage)
+        self.skipped_files.extend(paths)
+
+    def portion(self, share: float) -> "Deadline":
+        """A deadline share of the way to this one, so a stage can't starve
+        the stages after it; it records skips into this deadline"""
+        part = Deadline(None)
+        part.seconds = self.seconds
+        if self.expires_at is not None:
+            part.expires_at = time.monotonic() + self.remaining() * share
+        part.skipped_stages = self.skipped_stages
+        part.skipped_files = self.skipped_files
+        return part
+
+    def bound(self, seconds: float) -> float:
+        """seconds, or less if the deadline comes first; for blocking calls
+        that take their own timeout"""
+        remaining = self.remaining()
+        return seconds if remaining is None else min(seconds, remaining)
+
+    async def wait_for(self, awaitable: Awaitable[Any], stage: str) -> Any:
+        """awaitable's result; cancels it and raises DeadlineExceeded, with
+        stage recorded as skipped, if the deadline passes first. Timeouts
+        raised by the awaitable itself propagate unchanged."""
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining())
+        except asyncio.TimeoutError:
+            if not self.expired:
+                raise
+            self.skip(stage)
+            raise DeadlineExceeded(stage) from None
+
+    async def gather(self, stage: str, awaitables: Sequence[Awaitable[Any]],
+                     paths: Sequence[str]) -> List[Any]:
+        """Like asyncio.gather, but whatever hasn't finished at the deadline
+        is cancelled, its paths[i] recorded as skipped and its result left
+        as None"""
+        tasks = [asyncio.ensure_future(a) for a in awaitables]
+        if not tasks:
+            return []
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=self.remaining())
+        finally:
+            # Also on our own cancellation, as asyncio.gather would
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        if pending:
+            await asyncio.wait(pending)
+            self.skip(stage, [path for path, task in zip(paths, tasks) if task in pending])
+        return [task.result() if task in done else None for task in tasks]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "timeout_seconds": self.seconds,
+            "stages": list(self.skipped_stages),
+            "files": list(self.skipped_files),
+        }
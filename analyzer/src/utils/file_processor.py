@@ -0,0 +1,337 @@
+"""
+Source file selection shared by every ingestion mode, plus streaming
+repository-archive ingestion: the tarball is decompressed and walked as it
+downloads, keeping only matching members, so the archive is never written
+to disk or held in memory as a whole.
+"""
+import asyncio
+import io
+import math
+import os
+import queue
+import tarfile
+from collections import defaultdict
+from contextlib import asynccontextmanager, nullcontext
+from typing import (
+    AbstractSet, Any, AsyncContextManager, AsyncIterator, BinaryIO, Callable, Dict, List, Optional, Tuple,
+)
+
+import httpx
+
+# Extension -> language label. Anything not in here still gets a raw
+# security_analyzer.scan pass, just no AST-level parsing.
+LANGUAGE_EXTENSIONS = {
+    ".py": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+}
+
+SKIPPED_DIR_PREFIXES = ("dist/", "build/", ".venv/")
+
+
+def is_analyzable_path(path: str) -> bool:
+    """Supported language and not vendored/build output"""
+    return (
+        os.path.splitext(path)[1] in LANGUAGE_EXTENSIONS
+        and "node_modules" not in path
+        and not path.startswith(SKIPPED_DIR_PREFIXES)
+    )
+
+
+def language_for(path: str) -> str:
+    return LANGUAGE_EXTENSIONS[os.path.splitext(path)[1]]
+
+
+def is_test_path(path: str) -> bool:
+    return "test" in path.lower()
+
+
+class SelectionBudget:
+    """How much one analysis may fetch and analyze. A file costs its size in
+    bytes, and seconds_per_file plus size / bytes_per_second in estimated
+    time; None leaves that limit off."""
+    __slots__ = ("max_files", "max_bytes", "max_seconds", "seconds_per_file", "bytes_per_second")
+
+    def __init__(self, max_files: int, max_bytes: Optional[int] = None, max_seconds: Optional[float] = None,
+                 seconds_per_file: float = 0.0, bytes_per_second: float = 1e6):
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.seconds_per_file = seconds_per_file
+        self.bytes_per_second = bytes_per_second
+
+    def seconds(self, size: int) -> float:
+        return self.seconds_per_file + size / self.bytes_per_second
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"max_files": self.max_files, "max_bytes": self.max_bytes, "max_seconds": self.max_seconds}
+
+
+def _directory(path: str, depth: int) -> str:
+    parts = path.split("/")[:-1][:depth]
+    return "/".join(parts) + "/" if parts else "./"
+
+
+# Per-file work beyond reading its bytes (parser setup, the record, merging),
+# as a byte equivalent, so ranking never favours near-empty files
+_FILE_OVERHEAD_BYTES = 4096
+
+
+def _value_per_cost(entry: Dict[str, Any], budget: SelectionBudget) -> float:
+    # What a file tells us grows with its size, but far slower than its
+    # cost: a 20 KB module says about as much as a 2 MB generated one, and
+    # an empty __init__.py nothing. Deeper paths count slightly less.
+    size = entry.get("size", 0)
+    value = math.log2(1 + size / 1024) / (1 + entry["path"].count("/") * 0.1)
+    return value / budget.seconds(size + _FILE_OVERHEAD_BYTES)
+
+
+def _interleave_buckets(buckets: Dict[Tuple[str, str], List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+    """Bucket visiting order: each language's buckets largest first, with
+    languages interleaved in proportion to their share of candidate bytes"""
+    by_language: Dict[str, List[List[Dict[str, Any]]]] = defaultdict(list)
+    language_bytes: Dict[str, int] = defaultdict(int)
+    for (language, _), entries in sorted(buckets.items()):
+        by_language[language].append(entries)
+        language_bytes[language] += sum(e.get("size", 0) for e in entries)
+    for lists in by_language.values():
+        lists.sort(key=lambda entries: -sum(e.get("size", 0) for e in entries))
+    total = sum(language_bytes.values()) or 1
+    share = {language: max(size / total, 1e-9) for language, size in language_bytes.items()}
+
+    order: List[List[Dict[str, Any]]] = []
+    taken = dict.fromkeys(by_language, 0)
+    while len(order) < len(buckets):
+        # Largest deficit against its share so far (ties: larger language)
+        language = max(
+            (lang for lang in by_language if taken[lang] < len(by_language[lang])),
+            key=lambda lang: (share[lang] * (len(order) + 1) - taken[lang], share[lang]),
+        )
+        order.append(by_language[language][taken[language]])
+        taken[language] += 1
+    return order
+
+
+def select_files(entries: List[Dict[str, Any]], budget: SelectionBudget,
+                 directory_depth: int = 2) -> List[Dict[str, Any]]:
+    """Pick the most representative analyzable entries (dicts with path and
+    size, e.g. git tree entries) that fit budget, best first.
+
+    Candidates are bucketed by language and directory (first directory_depth
+    path components). Selection goes round-robin over the buckets, taking
+    each bucket's next best file by value per unit cost, so every directory
+    gets a file before any gets a second and languages come up in
+    proportion to their share of the code. Files that don't fit what's left
+    of the budget are passed over for smaller ones. Test files are only
+    considered once every other candidate has been; empty files never are."""
+    selected: List[Dict[str, Any]] = []
+    used_bytes, used_seconds = 0, 0.0
+
+    def fits(entry) -> bool:
+        size = entry.get("size", 0)
+        if budget.max_bytes is not None and used_bytes + size > budget.max_bytes:
+            return False
+        return budget.max_seconds is None or used_seconds + budget.seconds(size) <= budget.max_seconds
+
+    # (source buckets, test buckets)
+    phases: Tuple[Dict[Tuple[str, str], List[Dict[str, Any]]], ...] = (defaultdict(list), defaultdict(list))
+    for entry in entries:
+        path = entry.get("path", "")
+        if entry.get("size", 0) and is_analyzable_path(path):
+            phases[is_test_path(path)][(language_for(path), _directory(path, directory_depth))].append(entry)
+
+    for buckets in phases:
+        for bucket in buckets.values():
+            bucket.sort(key=lambda e: (-_value_per_cost(e, budget), e["path"]))
+            bucket.reverse()  # best last, so pop() takes it
+
+        active = _interleave_buckets(buckets)
+        while active and len(selected) < budget.max_files:
+            remaining = []
+            for bucket in active:
+                if len(selected) >= budget.max_files:
+                    break
+                while bucket and not fits(bucket[-1]):
+                    bucket.pop()  # never fits; a smaller file in the bucket might
+                if not bucket:
+                    continue
+                entry = bucket.pop()
+                selected.append(entry)
+                used_bytes += entry.get("size", 0)
+                used_seconds += budget.seconds(entry.get("size", 0))
+                if bucket:
+                    remaining.append(bucket)
+            active = remaining
+    return selected
+
+
+# stream_large(path, language, fileobj) -> file dict, for members read incrementally
+LargeFileHandler = Callable[[str, str, BinaryIO], Dict[str, Any]]
+
+
+def read_archive_files(fileobj: BinaryIO, max_files: int, max_file_bytes: int,
+                       stream_large: Optional[LargeFileHandler] = None,
+                       stream_max_bytes: int = 0,
+                       paths: Optional[AbstractSet[str]] = None) -> List[Dict[str, Any]]:
+    """Read analyzable files out of a gzipped tar stream, in archive order.
+
+    The archive is consumed strictly sequentially ("r|gz"), so fileobj can be
+    a non-seekable stream. GitHub tarballs wrap everything in a single
+    '<owner>-<repo>-<sha>/' directory, which is stripped from paths.
+
+    Members over max_file_bytes are skipped, unless stream_large is given and
+    they fit stream_max_bytes: those are handed to stream_large as a file
+    object, which reads them in pieces, and its file dict is kept instead.
+
+    With paths (e.g. picked by select_files from a tree listing), only those
+    members are read, and reading stops once all of them have been."""
+    files = []
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            large = member.size > max_file_bytes
+            if large and (stream_large is None or member.size > stream_max_bytes):
+                continue
+            path = member.name.split("/", 1)[1] if "/" in member.name else member.name
+            if not is_analyzable_path(path) or (paths is not None and path not in paths):
+                continue
+            if large:
+                files.append(stream_large(path, language_for(path), archive.extractfile(member)))
+            else:
+                data = archive.extractfile(member).read()
+                files.append({
+                    "path": path,
+                    "content": data.decode("utf-8", errors="replace"),
+                    "language": language_for(path),
+                })
+            if len(files) >= max_files or (paths is not None and len(files) == len(paths)):
+                break
+    return files
+
+
+class _StreamBridge(io.RawIOBase):
+    """Blocking, read-only file object over chunks pushed from the event loop.
+
+    The bounded queue applies backpressure to the download, so at most a
+    few chunks are buffered however large the archive is. Either side can
+    stop() the bridge, which releases the other from any wait."""
+
+    EOF = b""
+
+    def __init__(self, max_chunks: int = 16):
+        self._chunks: "queue.Queue[bytes]" = queue.Queue(maxsize=max_chunks)
+        self._pending = memoryview(b"")
+        self._eof = False
+        self._stopped = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            if self._eof:
+                return 0
+            try:
+                chunk = self._chunks.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopped:
+                    return 0
+                continue
+            if chunk is self.EOF:
+                self._eof = True
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def put(self, chunk: bytes) -> None:
+        """Blocks while the queue is full; returns immediately once stopped"""
+        while not self._stopped:
+            try:
+                self._chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def stop(self) -> None:
+        self._stopped = True
+
+
+def _read_then_stop(bridge: _StreamBridge, max_files: int, max_file_bytes: int,
+                    stream_large: Optional[LargeFileHandler], stream_max_bytes: int,
+                    paths: Optional[AbstractSet[str]]) -> List[Dict[str, Any]]:
+    try:
+        return read_archive_files(bridge, max_files, max_file_bytes, stream_large, stream_max_bytes, paths)
+    finally:
+        # Stops the download side once we have enough files (or failed)
+        bridge.stop()
+
+
+# host -> the limit a request to that host runs under (e.g. a semaphore)
+HostLimit = Callable[[str], AsyncContextManager[Any]]
+
+MAX_ARCHIVE_REDIRECTS = 5
+
+
+@asynccontextmanager
+async def _stream_by_host(client: httpx.AsyncClient, url: str, headers: Dict[str, str],
+                          host_limit: HostLimit) -> AsyncIterator[httpx.Response]:
+    """client.stream("GET", url), following redirects itself so that each
+    hop holds only its own host's limit: a redirect (GitHub's API sends
+    tarballs to codeload.github.com) releases the API host's limit as soon
+    as its headers arrive, and only the final host's is held for the body.
+    Like httpx, drops Authorization when a redirect leaves the host."""
+    target = httpx.URL(url)
+    for _ in range(MAX_ARCHIVE_REDIRECTS + 1):
+        async with host_limit(target.host):
+            async with client.stream("GET", target, headers=headers) as resp:
+                if not resp.is_redirect:
+                    yield resp
+                    return
+                location = resp.url.join(resp.headers["location"])
+        if location.host != target.host:
+            headers = {k: v for k, v in headers.items() if k.lower() != "authorization"}
+        target = location
+    raise httpx.TooManyRedirects("Exceeded maximum allowed redirects.", request=resp.request)
+
+
+async def fetch_archive_files(client: httpx.AsyncClient, url: str, headers: Dict[str, str],
+                              max_files: int, max_file_bytes: int,
+                              stream_large: Optional[LargeFileHandler] = None,
+                              stream_max_bytes: int = 0,
+                              paths: Optional[AbstractSet[str]] = None,
+                              host_limit: HostLimit = lambda host: nullcontext()) -> Optional[List[Dict[str, Any]]]:
+    """Stream a .tar.gz from url and return its analyzable files, or None if the
+    archive isn't available (e.g. wrong branch). Raises RuntimeError on a
+    GitHub rate limit, matching the tree-API fetch, and tarfile.TarError on a
+    corrupt archive. stream_large runs on the reader thread; stream_large and
+    paths are as for read_archive_files. The download stops as soon as the
+    reader has what it wants. Each request, redirects included, runs under
+    host_limit of its host (see _stream_by_host)."""
+    bridge = _StreamBridge()
+    reader = asyncio.ensure_future(asyncio.to_thread(
+        _read_then_stop, bridge, max_files, max_file_bytes, stream_large, stream_max_bytes, paths,
+    ))
+    try:
+        async with _stream_by_host(client, url, headers, host_limit) as resp:
+            if resp.status_code == 403 and "rate limit" in (await resp.aread()).decode(errors="replace").lower():
+                raise RuntimeError("github_rate_limited")
+            if resp.status_code != 200:
+                return None
+            async for chunk in resp.aiter_bytes():
+                if reader.done():
+                    break  # reader has all the files it wants; stop downloading
+                await asyncio.to_thread(bridge.put, chunk)
+        await asyncio.to_thread(bridge.put, _StreamBridge.EOF)
+        return await reader
+    finally:
+        # Never leave the reader thread blocked behind an abandoned download
+        bridge.stop()
+        await asyncio.wait({reader})
+        if not reader.cancelled():
+            reader.exception()  # mark retrieved; the normal path already re-raised it
@@ -0,0 +1,406 @@
+"""
+Git-backed ingestion: analyze a repository straight from git objects instead
+of the GitHub HTTP API. Remote repositories are cloned once as bare mirrors
+under REPO_CACHE_DIR and only fetched afterwards; local repositories (under
+an allowed root) are read in place. Blobs at a ref are streamed through one
+`git cat-file --batch` process. Files over the size cap but within a larger
+streaming cap are handed to a stream_large hook as file objects, as archive
+ingestion does, instead of being read whole.
+
+Remote URLs must point at an allowed host, mirrors are capped in size, and
+every git process of a load is killed once its timeout runs out.
+
+Everything here is blocking; callers run it in a thread.
+"""
+import hashlib
+import os
+import re
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import structlog
+
+from .file_processor import LargeFileHandler, SelectionBudget, language_for, select_files
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+# Bytes per read when draining what a stream_large hook left of a blob
+_DRAIN_CHUNK_BYTES = 64 * 1024
+
+_REMOTE_URL = re.compile(r"^(https?://|ssh://|git@)[\w.@:/~+-]+$")
+_SCP_URL = re.compile(r"^git@([\w.-]+):")
+_REF = re.compile(r"^[\w][\w./^~-]*$")
+
+# Never let a repo URL pick a transport that runs commands or reads local files
+_GIT_SAFE_CONFIG = ["-c", "protocol.ext.allow=never", "-c", "protocol.file.allow=never"]
+
+# How often a clone/fetch's mirror directory is measured against its cap
+_SIZE_POLL_SECONDS = 0.2
+
+_mirror_locks: Dict[str, threading.Lock] = {}
+_mirror_locks_guard = threading.Lock()
+
+
+class GitError(RuntimeError):
+    pass
+
+
+def _remaining(stop_at: Optional[float]) -> Optional[float]:
+    """Seconds left until stop_at (a time.monotonic() value), or None for no limit"""
+    if stop_at is None:
+        return None
+    left = stop_at - time.monotonic()
+    if left <= 0:
+        raise GitError("git timed out")
+    return left
+
+
+def _directory_bytes(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _git(args: List[str], cwd: Optional[str] = None, timeout: Optional[float] = None,
+         watch_dir: Optional[str] = None, max_bytes: Optional[int] = None) -> bytes:
+    """Run git; killed after timeout seconds, or once watch_dir grows past max_bytes"""
+    try:
+        proc = subprocess.Popen(
+            ["git", *_GIT_SAFE_CONFIG, *args],
+            cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            env=dict(os.environ, GIT_TERMINAL_PROMPT="0"),
+            start_new_session=True,  # own process group, so helpers (git-remote-https) die with it
+        )
+    except OSError as e:
+        raise GitError(f"git {args[0]} failed: {e}") from e
+    stop_at = None if timeout is None else time.monotonic() + timeout
+    with proc:
+        try:
+            while True:
+                wait = _remaining(stop_at)
+                if max_bytes is not None:
+                    wait = _SIZE_POLL_SECONDS if wait is None else min(wait, _SIZE_POLL_SECONDS)
+                try:
+                    stdout, stderr = proc.communicate(timeout=wait)
+                    break
+                except subprocess.TimeoutExpired:
+                    pass
+                if max_bytes is not None and _directory_bytes(watch_dir) > max_bytes:
+                    raise GitError(f"git {args[0]} failed: repository is larger than {max_bytes} bytes")
+        except GitError:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.communicate()
+            raise
+    if proc.returncode != 0:
+        raise GitError(f"git {args[0]} failed: {stderr.decode(errors='replace').strip()[:300]}")
+    if max_bytes is not None and _directory_bytes(watch_dir) > max_bytes:
+        # Finished between two polls
+        raise GitError(f"git {args[0]} failed: repository is larger than {max_bytes} bytes")
+    return stdout
+
+
+def remote_host(repo_url: str) -> Optional[str]:
+    """Lower-cased host of a remote URL git would accept, or None"""
+    if not _REMOTE_URL.match(repo_url):
+        return None
+    scp = _SCP_URL.match(repo_url)
+    if scp:
+        return scp.group(1).lower()
+    try:
+        parts = urlsplit(repo_url)
+        if parts.port is not None and parts.scheme != "ssh":
+            return None
+    except ValueError:
+        return None
+    if parts.password is not None or (parts.username is not None and parts.scheme != "ssh"):
+        return None  # no credentials in URLs (they'd also end up in the mirror's config)
+    return parts.hostname
+
+
+def resolve_local_repo(repo: str, allowed_roots: Iterable[str]) -> Optional[str]:
+    """Absolute path of a local repository inside one of allowed_roots, or
+    None if repo isn't a local path (or isn't allowed)"""
+    path = repo[len("file://"):] if repo.startswith("file://") else repo
+    if not os.path.isabs(path):
+        return None
+    path = os.path.realpath(path)
+    for root in allowed_roots:
+        root = os.path.realpath(root)
+        if path == root or path.startswith(root + os.sep):
+            return path if os.path.isdir(path) else None
+    return None
+
+
+def mirror_path(repo_url: str, cache_dir: str) -> str:
+    """Stable per-repository mirror directory under cache_dir"""
+    name = re.sub(r"[^\w.-]+", "_", repo_url.rstrip("/").split("/")[-1].removesuffix(".git"))[:60]
+    digest = hashlib.sha256(repo_url.strip().rstrip("/").lower().encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{name}-{digest}.git")
+
+
+def ensure_mirror(repo_url: str, cache_dir: str, refresh_seconds: float, timeout: float,
+                  allowed_hosts: Iterable[str] = ("github.com",), max_bytes: Optional[int] = None) -> str:
+    """Bare mirror of repo_url, cloned on first use and fetched again once it
+    is more than refresh_seconds old. Returns the mirror's git dir.
+
+    repo_url's host must be one of allowed_hosts. A clone or fetch that takes
+    the mirror past max_bytes is killed; a clone's partial mirror is removed."""
+    if remote_host(repo_url) not in {host.lower() for host in allowed_hosts}:
+        raise GitError(f"Unsupported repository URL: {repo_url}")
+    path = mirror_path(repo_url, cache_dir)
+    with _mirror_locks_guard:
+        lock = _mirror_locks.setdefault(path, threading.Lock())
+
+    # One clone/fetch per mirror at a time; concurrent analyses of the same
+    # repo wait and then reuse the fresh mirror
+    with lock:
+        stamp = os.path.join(path, "codesage-fetched")
+        if os.path.isdir(path):
+            try:
+                fresh = time.time() - os.path.getmtime(stamp) < refresh_seconds
+            except OSError:
+                fresh = False
+            if not fresh:
+                _git(["remote", "update", "--prune"], cwd=path, timeout=timeout,
+                     watch_dir=path, max_bytes=max_bytes)
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                _git(["clone", "--mirror", "--quiet", "--", repo_url, tmp_path], timeout=timeout,
+                     watch_dir=tmp_path, max_bytes=max_bytes)
+            except GitError:
+                shutil.rmtree(tmp_path, ignore_errors=True)
+                raise
+            os.replace(tmp_path, path)
+        with open(stamp, "w"):
+            pass
+    return path
+
+
+def list_tree(git_dir: str, ref: str, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Blob entries (path, sha, size) of ref's tree, recursively"""
+    if not _REF.match(ref):
+        raise GitError(f"Invalid ref: {ref}")
+    out = _git(["ls-tree", "-r", "-l", "-z", "--full-tree", ref, "--"], cwd=git_dir, timeout=timeout)
+    entries = []
+    for record in out.split(b"\0"):
+        if not record:
+            continue
+        meta, path = record.split(b"\t", 1)
+        mode, obj_type, sha, size = meta.split()
+        if obj_type != b"blob" or mode == b"120000":  # skip symlinks too
+            continue
+        entries.append({
+            "path": path.decode("utf-8", errors="replace"),
+            "sha": sha.decode(),
+            "size": int(size),
+        })
+    return entries
+
+
+class _BlobStream:
+    """Readable view of the next size bytes of a cat-file output stream"""
+
+    def __init__(self, stdout: IO[bytes], size: int):
+        self._stdout = stdout
+        self.remaining = size
+
+    def read(self, n: int = -1) -> bytes:
+        if n < 0 or n > self.remaining:
+            n = self.remaining
+        data = self._stdout.read(n) if n else b""
+        self.remaining -= len(data)
+        return data
+
+    def drain(self) -> None:
+        while self.remaining and self.read(_DRAIN_CHUNK_BYTES):
+            pass
+
+
+class BlobReader:
+    """One long-lived `git cat-file --batch` process; read(sha) -> bytes,
+    or stream(sha, consume) to have consume read it as a file object.
+
+    With a timeout, the process is killed once it runs out, which fails the
+    read in progress and every one after it with GitError."""
+
+    def __init__(self, git_dir: str, timeout: Optional[float] = None):
+        self.process = subprocess.Popen(
+            ["git", *_GIT_SAFE_CONFIG, "cat-file", "--batch"],
+            cwd=git_dir, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            env=dict(os.environ, GIT_TERMINAL_PROMPT="0"),
+        )
+        self.timed_out = False
+        self._timer = None
+        if timeout is not None:
+            self._timer = threading.Timer(max(timeout, 0.0), self._kill)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _kill(self) -> None:
+        self.timed_out = True
+        self.process.kill()
+
+    def read(self, sha: str) -> bytes:
+        return self.stream(sha, lambda blob: blob.read())
+
+    def stream(self, sha: str, consume: Callable[[_BlobStream], T]) -> T:
+        """consume(blob) for the blob's content as a file object, read
+        straight off cat-file's output; whatever consume doesn't read is
+        skipped afterwards"""
+        try:
+            self.process.stdin.write(sha.encode() + b"\n")
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().split()
+        except (BrokenPipeError, ValueError):
+            header = []
+        if self.timed_out:
+            raise GitError("cat-file timed out")
+        if len(header) != 3:
+            raise GitError(f"cat-file: {b' '.join(header).decode(errors='replace') or 'no output'}")
+        blob = _BlobStream(self.process.stdout, int(header[2]))
+        try:
+            return consume(blob)
+        finally:
+            # Leave the output at the next header, even if consume failed
+            blob.drain()
+            self.process.stdout.read(1)  # trailing newline
+            if self.timed_out or blob.remaining:
+                # Killed mid-blob: the output ended early
+                raise GitError("cat-file timed out")
+
+    def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.process.wait()
+        self.process.stdout.close()
+
+    def __enter__(self) -> "BlobReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _select(entries: List[Dict[str, Any]], budget: SelectionBudget, max_file_bytes: int,
+            stream_large: Optional[LargeFileHandler], stream_max_bytes: int) -> List[Dict[str, Any]]:
+    """Same ranking as the tree-API path (file_processor.select_files)"""
+    cap = max(max_file_bytes, stream_max_bytes) if stream_large is not None else max_file_bytes
+    return select_files([e for e in entries if e["size"] <= cap], budget)
+
+
+def read_ref_files(git_dir: str, ref: str, budget: SelectionBudget, max_file_bytes: int,
+                   timeout: Optional[float] = None, stream_large: Optional[LargeFileHandler] = None,
+                   stream_max_bytes: int = 0) -> List[Dict[str, Any]]:
+    """Analyzable files of ref, read from git objects (no checkout needed).
+    Blobs over max_file_bytes (up to stream_max_bytes) go to stream_large."""
+    stop_at = None if timeout is None else time.monotonic() + timeout
+    selected = _select(list_tree(git_dir, ref, _remaining(stop_at)), budget, max_file_bytes,
+                       stream_large, stream_max_bytes)
+    files = []
+    with BlobReader(git_dir, _remaining(stop_at)) as reader:
+        for entry in selected:
+            path, language = entry["path"], language_for(entry["path"])
+            if entry["size"] > max_file_bytes:
+                f = reader.stream(entry["sha"], lambda blob: stream_large(path, language, blob))
+            else:
+                f = {
+                    "path": path,
+                    "content": reader.read(entry["sha"]).decode("utf-8", errors="replace"),
+                    "language": language,
+                }
+            f["sha"] = entry["sha"]
+            files.append(f)
+    return files
+
+
+def _walk_working_tree(root: str) -> Iterator[Tuple[str, str, int]]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != ".git" and d != "node_modules"]
+        for filename in filenames:
+            full = os.path.join(dirpath, filename)
+            if os.path.islink(full):
+                continue
+            try:
+                size = os.path.getsize(full)
+            except OSError:
+                continue
+            yield os.path.relpath(full, root).replace(os.sep, "/"), full, size
+
+
+def read_working_tree_files(root: str, budget: SelectionBudget, max_file_bytes: int,
+                            timeout: Optional[float] = None, stream_large: Optional[LargeFileHandler] = None,
+                            stream_max_bytes: int = 0) -> List[Dict[str, Any]]:
+    """Analyzable files of a checkout as they are on disk, uncommitted edits
+    included. Files over max_file_bytes (up to stream_max_bytes) go to
+    stream_large."""
+    stop_at = None if timeout is None else time.monotonic() + timeout
+    entries = [{"path": rel, "full": full, "size": size} for rel, full, size in _walk_working_tree(root)]
+    files = []
+    for entry in _select(entries, budget, max_file_bytes, stream_large, stream_max_bytes):
+        _remaining(stop_at)
+        path, language = entry["path"], language_for(entry["path"])
+        try:
+            with open(entry["full"], "rb") as fileobj:
+                if entry["size"] > max_file_bytes:
+                    files.append(stream_large(path, language, fileobj))
+                    continue
+                content = fileobj.read().decode("utf-8", errors="replace")
+        except OSError as e:
+            logger.warning("Skipping unreadable file", path=path, error=str(e))
+            continue
+        files.append({"path": path, "content": content, "language": language})
+    return files
+
+
+def load_git_files(repo: str, ref: Optional[str], cache_dir: str, allowed_roots: Iterable[str],
+                   budget: SelectionBudget, max_file_bytes: int, refresh_seconds: float = 60.0,
+                   timeout: float = 300.0, allowed_hosts: Iterable[str] = ("github.com",),
+                   max_mirror_bytes: Optional[int] = None, stream_large: Optional[LargeFileHandler] = None,
+                   stream_max_bytes: int = 0) -> List[Dict[str, Any]]:
+    """The analyzable files of a repository that budget selects, however
+    it's reachable:
+
+    - a local path under allowed_roots: its working tree, or ref's tree if
+      ref is given
+    - a remote URL on one of allowed_hosts: ref (default HEAD, i.e. the
+      default branch) of a cached mirror under cache_dir, at most
+      max_mirror_bytes
+
+    Files over max_file_bytes but within stream_max_bytes are handed to
+    stream_large (as for file_processor.read_archive_files) rather than
+    read whole, if it is given; otherwise they are skipped.
+
+    timeout covers the whole load, every git process included; running out
+    raises GitError."""
+    stop_at = time.monotonic() + timeout
+    local = resolve_local_repo(repo, allowed_roots)
+    if local is not None:
+        if ref is None:
+            return read_working_tree_files(local, budget, max_file_bytes, _remaining(stop_at),
+                                           stream_large, stream_max_bytes)
+        return read_ref_files(local, ref, budget, max_file_bytes, _remaining(stop_at),
+                              stream_large, stream_max_bytes)
+    if os.path.isabs(repo) or repo.startswith("file://"):
+        raise GitError(f"Local repository is not under an allowed root: {repo}")
+
+    git_dir = ensure_mirror(repo, cache_dir, refresh_seconds, _remaining(stop_at), allowed_hosts, max_mirror_bytes)
+    return read_ref_files(git_dir, ref or "HEAD", budget, max_file_bytes, _remaining(stop_at),
+                          stream_large, stream_max_bytes)
@@ -0,0 +1,211 @@
+"""
+On-demand profiling of a single analysis' CPU work. Each file of a profiled
+analysis is parsed and scanned under cProfile and tracemalloc by
+profile_call, inside whichever pool worker analyzes it, so the event loop
+never runs parser code or pays for tracing. The worker returns raw
+per-function and per-allocation-site totals with the record, and a
+ProfileCollector on the analysis' trace sums them into the top-N functions
+by cumulative time and top-N allocation sites for the "analyze" stage.
+Streamed large files are analyzed on threads, piece by piece, each piece
+under profile_call too.
+
+Loop-side stages (fetch, llm, score, metrics) are profiled by profile_block,
+on the event loop thread for the stage's whole duration. While a stage
+awaits, the loop runs other requests' coroutines, and those land in the
+same profile; under concurrent load treat these stages' functions as the
+loop's, not the analysis'.
+
+Nothing here is imported unless an analysis asks to be profiled.
+"""
+import cProfile
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+# Frames kept per allocation traceback; the innermost one names the site
+TRACEMALLOC_FRAMES = 1
+
+# Allocation sites each file reports, largest first; far above any top N, so
+# summing across files rarely misses a site that matters
+RAW_ALLOCATION_SITES = 200
+
+_IGNORED_ALLOCATIONS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+# tracemalloc is process-wide; profiled calls sharing a process (the thread
+# pool fallback) take turns so each sees only its own allocations
+_trace_lock = threading.Lock()
+
+# Open profile_blocks, and whether the first of them started tracemalloc
+# (the last to close stops it)
+_open_blocks = 0
+_blocks_started_tracing = False
+
+# A thread runs one cProfile at a time; a block opened while another is
+# profiling the same thread only times itself
+_thread_profiling = threading.local()
+
+
+def _short_path(path: str) -> str:
+    """Trim a source path to its last two components"""
+    parts = path.replace(os.sep, "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def _function_label(filename: str, line: int, name: str) -> str:
+    return f"{_short_path(filename)}:{line}({name})" if line else name
+
+
+def profile_call(fn: Callable[..., Any], *args: Any) -> Tuple[Any, Dict[str, Any]]:
+    """fn(*args) under cProfile and tracemalloc. Returns (result, raw), raw
+    being plain data for ProfileCollector.add:
+
+        {"wall_ms", "peak_kb",
+         "functions": {label: [calls, own_seconds, cumulative_seconds]},
+         "allocations": {site: [bytes, blocks]}}"""
+    with _trace_lock:
+        owns_tracemalloc = not tracemalloc.is_tracing()
+        if owns_tracemalloc:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            before = None
+        else:
+            before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            result = fn(*args)
+        finally:
+            profile.disable()
+            seconds = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if owns_tracemalloc:
+                tracemalloc.stop()
+
+    return result, _raw_profile(profile, before, snapshot, seconds, peak)
+
+
+def _raw_profile(profile, before, snapshot, seconds: float, peak: int) -> Dict[str, Any]:
+    functions = {}
+    if profile is not None:
+        functions = {
+            _function_label(filename, line, name): [calls, own, cumulative]
+            for (filename, line, name), (_, calls, own, cumulative, _) in pstats.Stats(profile).stats.items()
+        }
+    snapshot = snapshot.filter_traces(_IGNORED_ALLOCATIONS)
+    if before is None:
+        rows = [(stat.traceback, stat.size, stat.count) for stat in snapshot.statistics("lineno")]
+    else:
+        # Someone else was already tracing; only count what this call added
+        stats = snapshot.compare_to(before.filter_traces(_IGNORED_ALLOCATIONS), "lineno")
+        rows = [(stat.traceback, stat.size_diff, stat.count_diff) for stat in stats if stat.size_diff > 0]
+    allocations = {
+        f"{_short_path(traceback[0].filename)}:{traceback[0].lineno}": [size, count]
+        for traceback, size, count in rows[:RAW_ALLOCATION_SITES]
+    }
+    return {
+        "wall_ms": round(seconds * 1000, 3),
+        "peak_kb": round(peak / 1024, 1),
+        "functions": functions,
+        "allocations": allocations,
+    }
+
+
+@contextmanager
+def profile_block() -> Iterator[Dict[str, Any]]:
+    """Profile the calling thread, and trace allocations process-wide, for
+    the with block, which may await. Yields a dict that holds the raw
+    profile (as profile_call's) once the block exits.
+
+    Tracing stays on until the last open block closes, so overlapping
+    blocks each count only what was allocated during them. peak_kb is the
+    peak above what was traced when the block opened."""
+    global _open_blocks, _blocks_started_tracing
+    raw: Dict[str, Any] = {}
+    with _trace_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            _blocks_started_tracing = True
+        _open_blocks += 1
+        before = tracemalloc.take_snapshot()
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    profile = None
+    if not getattr(_thread_profiling, "active", False):
+        profile = cProfile.Profile()
+        _thread_profiling.active = True
+    started = time.perf_counter()
+    if profile is not None:
+        profile.enable()
+    try:
+        yield raw
+    finally:
+        if profile is not None:
+            profile.disable()
+            _thread_profiling.active = False
+        seconds = time.perf_counter() - started
+        with _trace_lock:
+            snapshot = tracemalloc.take_snapshot()
+            peak = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+            _open_blocks -= 1
+            if _open_blocks == 0 and _blocks_started_tracing:
+                tracemalloc.stop()
+                _blocks_started_tracing = False
+        raw.update(_raw_profile(profile, before, snapshot, seconds, peak))
+
+
+class ProfileCollector:
+    """Sums the raw profiles of an analysis' files, per stage"""
+
+    def __init__(self, top_n: int = 20):
+        self.top_n = top_n
+        self._stages: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, stage: str, raw: Dict[str, Any], files: int = 1) -> None:
+        """files is how many files raw finishes: 0 for a piece of a streamed
+        file or a loop-side stage, which then reports "files": 0"""
+        totals = self._stages.setdefault(stage, {"files": 0, "wall_ms": 0.0, "peak_kb": 0.0,
+                                                 "functions": {}, "allocations": {}})
+        totals["files"] += files
+        totals["wall_ms"] += raw["wall_ms"]
+        totals["peak_kb"] = max(totals["peak_kb"], raw["peak_kb"])
+        for label, (calls, own, cumulative) in raw["functions"].items():
+            row = totals["functions"].setdefault(label, [0, 0.0, 0.0])
+            row[0] += calls
+            row[1] += own
+            row[2] += cumulative
+        for site, (size, blocks) in raw["allocations"].items():
+            row = totals["allocations"].setdefault(site, [0, 0])
+            row[0] += size
+            row[1] += blocks
+
+    def _stage_dict(self, totals: Dict[str, Any]) -> Dict[str, Any]:
+        functions = sorted(totals["functions"].items(), key=lambda item: item[1][2], reverse=True)
+        allocations = sorted(totals["allocations"].items(), key=lambda item: item[1][0], reverse=True)
+        return {
+            "files": totals["files"],
+            "wall_ms": round(totals["wall_ms"], 2),
+            "peak_kb": totals["peak_kb"],
+            "functions": [
+                {"function": label, "calls": calls,
+                 "own_ms": round(own * 1000, 3), "cumulative_ms": round(cumulative * 1000, 3)}
+                for label, (calls, own, cumulative) in functions[:self.top_n]
+            ],
+            "allocations": [
+                {"site": site, "kb": round(size / 1024, 1), "blocks": blocks}
+                for site, (size, blocks) in allocations[:self.top_n]
+            ],
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"top_n": self.top_n, "stages": {name: self._stage_dict(t) for name, t in self._stages.items()}}
+
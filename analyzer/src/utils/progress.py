@@ -0,0 +1,96 @@
+"""
+In-process progress events for running analyses. The pipeline publishes
+stage transitions and per-file findings as they happen; any number of
+stream subscribers replay what they missed and then follow live, so a
+client that connects late still sees the whole run.
+
+Channels are opened when an analysis starts (or someone subscribes to a
+queued one), not when it is submitted. Once finished, a channel keeps only
+its terminal event, so the per-file payloads of finished runs aren't held
+for late subscribers; the stored result has them.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+TERMINAL_EVENTS = ("done", "error")
+
+
+class ProgressChannel:
+    """Append-only event log for one analysis, with a wakeup for followers"""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        if self.closed:
+            return
+        self.events.append(event)
+        self._wake()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake()
+
+    def _wake(self) -> None:
+        # Swap in a fresh Event so every current follower wakes exactly once
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def compact(self) -> None:
+        """Drop everything but the last terminal event (closed channels only).
+        The log is replaced rather than trimmed, so followers still reading
+        it finish undisturbed."""
+        terminal = [event for event in self.events if event["type"] in TERMINAL_EVENTS]
+        self.events = terminal[-1:]
+
+    async def follow(self) -> AsyncIterator[Dict[str, Any]]:
+        """Every event so far, then new ones as published, until closed"""
+        events = self.events
+        sent = 0
+        while True:
+            while sent < len(events):
+                yield events[sent]
+                sent += 1
+            if self.closed:
+                return
+            await self._changed.wait()
+
+
+class ProgressHub:
+    """analysis_id -> ProgressChannel. Finished channels are compacted and
+    kept for late subscribers, up to max_finished of them, oldest dropped
+    first."""
+
+    def __init__(self, max_finished: int = 100):
+        self.max_finished = max_finished
+        self._channels: "OrderedDict[str, ProgressChannel]" = OrderedDict()
+
+    def open(self, analysis_id: str) -> ProgressChannel:
+        channel = self._channels.get(analysis_id)
+        if channel is None:
+            channel = self._channels[analysis_id] = ProgressChannel()
+        return channel
+
+    def get(self, analysis_id: str) -> Optional[ProgressChannel]:
+        return self._channels.get(analysis_id)
+
+    def publish(self, analysis_id: str, event_type: str, **fields: Any) -> None:
+        """No-op for analyses nobody opened a channel for"""
+        channel = self._channels.get(analysis_id)
+        if channel is not None:
+            channel.publish({"type": event_type, **fields})
+
+    def close(self, analysis_id: str) -> None:
+        channel = self._channels.get(analysis_id)
+        if channel is None:
+            return
+        channel.close()
+        channel.compact()
+        self._channels.move_to_end(analysis_id)
+        finished = [key for key, c in self._channels.items() if c.closed]
+        for key in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._channels[key]
@@ -0,0 +1,251 @@
+"""
+Bounded store for analysis results. Recent results live in memory under an
+entry-count and byte budget; whatever the LRU pushes out is zlib-compressed
+into a SQLite file and read back (and promoted) the next time it is asked
+for. Both tiers share one TTL, so memory stays flat however long the
+service runs and disk holds at most a TTL's worth of results.
+
+Spills are encoded, compressed and written on the store's own writer
+thread, so a write that evicts never runs zlib or SQLite on the event
+loop; until its row is written, an evicted result is still served from
+memory.
+"""
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+# Containers longer than this are sized from this many evenly spaced items
+SIZE_SAMPLE_ITEMS = 64
+
+# Writes between sweeps of the memory tier for expired results, which are
+# otherwise only noticed when asked for
+EXPIRY_SWEEP_WRITES = 100
+
+
+def _json_len(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":"), default=str))
+
+
+def estimate_json_size(value: Any) -> int:
+    """About len(json.dumps(value)), without encoding all of it.
+
+    Dicts and lists are walked until one is longer than SIZE_SAMPLE_ITEMS;
+    that one is sized by encoding an evenly spaced sample of its items and
+    scaling up. A result's bulk is a few long lists and dicts of similar
+    items (findings per file, issues), so this costs a bounded amount per
+    write however large the result, at the price of a sampling error
+    (a few percent, typically) in the byte budget."""
+    if isinstance(value, dict):
+        if len(value) <= SIZE_SAMPLE_ITEMS:
+            return 2 + sum(_json_len(str(key)) + 2 + estimate_json_size(item) for key, item in value.items())
+        keys = list(value)
+        step = len(keys) / SIZE_SAMPLE_ITEMS
+        sample = {str(keys[int((i + 0.5) * step)]): value[keys[int((i + 0.5) * step)]]
+                  for i in range(SIZE_SAMPLE_ITEMS)}
+        return round(_json_len(sample) * len(keys) / SIZE_SAMPLE_ITEMS)
+    if isinstance(value, (list, tuple)):
+        if len(value) <= SIZE_SAMPLE_ITEMS:
+            return 1 + sum(estimate_json_size(item) + 1 for item in value) if value else 2
+        step = len(value) / SIZE_SAMPLE_ITEMS
+        sample = [value[int((i + 0.5) * step)] for i in range(SIZE_SAMPLE_ITEMS)]
+        return round(_json_len(sample) * len(value) / SIZE_SAMPLE_ITEMS)
+    return _json_len(value)
+
+
+class ResultStore:
+    """Dict-like (store[id] = result, id in store, store[id]) mapping of
+    analysis id to JSON-serializable result.
+
+    Sizes are estimate_json_size of each result, approximately the length
+    of its JSON encoding, so the byte cap tracks what a result costs to serve
+    rather than Python object overhead, without encoding it on every write.
+    Results are treated as immutable once stored: replace them, don't
+    mutate them in place. Pass path=None to drop evicted results instead
+    of spilling them; stores sharing a path need different tables."""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: int, path: Optional[str] = None,
+                 table: str = "results"):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._writes_since_sweep = 0
+        self.spills = 0
+        self.rehydrations = 0
+        self.drops = 0
+        self.expirations = 0
+
+        # Evicted results whose spill hasn't been written yet
+        self._pending: Dict[str, Tuple[float, Any]] = {}
+        self._pending_lock = threading.Lock()
+        self._db = None
+        self._writer = None
+        if path:
+            self._table = table
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            # The writer thread and readers on the loop share the connection
+            self._db_lock = threading.Lock()
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " analysis_id TEXT PRIMARY KEY, stored_at REAL NOT NULL, payload BLOB NOT NULL)"
+            )
+            self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_stored_at ON {table} (stored_at)")
+            # One thread, so spills of the same id land in eviction order
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{table}-spill")
+
+    def __setitem__(self, analysis_id: str, result: Any) -> None:
+        self._remember(analysis_id, result, time.time())
+
+    def __getitem__(self, analysis_id: str) -> Any:
+        result = self.get(analysis_id)
+        if result is None:
+            raise KeyError(analysis_id)
+        return result
+
+    def __contains__(self, analysis_id: str) -> bool:
+        return self.get(analysis_id) is not None
+
+    def get(self, analysis_id: str, default: Any = None) -> Any:
+        entry = self._entries.get(analysis_id)
+        if entry is not None:
+            stored_at, result, size = entry
+            if time.time() - stored_at <= self.ttl_seconds:
+                self._entries.move_to_end(analysis_id)
+                return result
+            del self._entries[analysis_id]
+            self._bytes -= size
+            self.expirations += 1
+
+        with self._pending_lock:
+            found = self._pending.get(analysis_id)
+        if found is None:
+            found = self._read_cold(analysis_id)
+        elif time.time() - found[0] > self.ttl_seconds:
+            return default
+        if found is None:
+            return default
+        stored_at, result = found
+        self.rehydrations += 1
+        self._remember(analysis_id, result, stored_at)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        cold_entries = None
+        if self._db is not None:
+            with self._db_lock:
+                cold_entries = self._db.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "cold_entries": cold_entries,
+            "spills": self.spills,
+            "rehydrations": self.rehydrations,
+            "drops": self.drops,
+            "expirations": self.expirations,
+            "pending_spills": len(self._pending),
+        }
+
+    def flush(self) -> None:
+        """Block until every spill queued so far is written"""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._writer.shutdown(wait=True)
+            self._db.close()
+            self._db = None
+            self._writer = None
+
+    def _remember(self, analysis_id: str, result: Any, stored_at: float) -> None:
+        old = self._entries.pop(analysis_id, None)
+        if old is not None:
+            self._bytes -= old[2]
+        size = estimate_json_size(result)
+        self._entries[analysis_id] = (stored_at, result, size)
+        self._bytes += size
+
+        self._writes_since_sweep += 1
+        if self._writes_since_sweep >= EXPIRY_SWEEP_WRITES:
+            self._expire_memory()
+
+        # Always keep the newest entry, even if it alone is over the byte budget
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            evicted_id, (evicted_at, evicted, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._spill(evicted_id, evicted, evicted_at)
+
+    def _expire_memory(self) -> None:
+        self._writes_since_sweep = 0
+        now = time.time()
+        expired = [key for key, (stored_at, _, _) in self._entries.items() if now - stored_at > self.ttl_seconds]
+        for key in expired:
+            self._bytes -= self._entries.pop(key)[2]
+        self.expirations += len(expired)
+
+    def _spill(self, analysis_id: str, result: Any, stored_at: float) -> None:
+        if self._db is None:
+            self.drops += 1
+            return
+        if time.time() - stored_at > self.ttl_seconds:
+            self.expirations += 1
+            return
+        with self._pending_lock:
+            self._pending[analysis_id] = (stored_at, result)
+        self._writer.submit(self._write_spill, analysis_id, result, stored_at)
+
+    def _write_spill(self, analysis_id: str, result: Any, stored_at: float) -> None:
+        """Runs on the writer thread"""
+        try:
+            payload = zlib.compress(json.dumps(result, separators=(",", ":"), default=str).encode("utf-8"), 6)
+            with self._db_lock:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self._table} (analysis_id, stored_at, payload) VALUES (?, ?, ?)",
+                    (analysis_id, stored_at, payload),
+                )
+                # Expire in the same place rows are added, so the file can't outgrow the TTL
+                self.expirations += self._db.execute(
+                    f"DELETE FROM {self._table} WHERE stored_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+            self.spills += 1
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self.drops += 1
+            logger.warning("Failed to spill analysis result", analysis_id=analysis_id, error=str(e))
+        finally:
+            with self._pending_lock:
+                # Unless a later eviction of the same id has queued a newer spill
+                if self._pending.get(analysis_id, (None, None))[1] is result:
+                    del self._pending[analysis_id]
+
+    def _read_cold(self, analysis_id: str) -> Optional[Tuple[float, Any]]:
+        if self._db is None:
+            return None
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    f"SELECT stored_at, payload FROM {self._table} WHERE analysis_id = ?", (analysis_id,)
+                ).fetchone()
+                if row is None:
+                    return None
+                stored_at, payload = row
+                if time.time() - stored_at > self.ttl_seconds:
+                    self._db.execute(f"DELETE FROM {self._table} WHERE analysis_id = ?", (analysis_id,))
+                    self.expirations += 1
+                    return None
+            return stored_at, json.loads(zlib.decompress(payload))
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning("Discarding unreadable analysis result", analysis_id=analysis_id, error=str(e))
+            return None
@@ -0,0 +1,200 @@
+"""
+Timing spans for the analysis pipeline and process-wide metrics in the
+Prometheus text exposition format, without pulling in a client library.
+
+perform_analysis installs an AnalysisTrace in a context variable; stage()
+blocks anywhere below it (including in tasks it gathers) record into that
+trace and into the stage histogram. With no trace installed, stage() still
+feeds the histogram, so library code can be instrumented unconditionally.
+A trace can also carry a profiler (see profiling.ProfileCollector) that
+profiled per-file work reports into; it is None unless requested.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_LabelKey = Tuple[Tuple[str, str], ...]
+
+# Seconds; spans everything from a cache hit to a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _label_key(labels: Dict[str, Any]) -> _LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: _LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[_LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {value:g}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # label key -> [per-bucket counts..., sum, count]
+        self._series: Dict[_LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in self._series.items():
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+ANALYSES_IN_FLIGHT = Gauge("codesage_analyses_in_flight", "Analyses currently running")
+ANALYSES_TOTAL = Counter("codesage_analyses_total", "Finished analyses by outcome: completed, partial or failed")
+ANALYSIS_SECONDS = Histogram("codesage_analysis_duration_seconds", "End-to-end analysis time")
+STAGE_SECONDS = Histogram("codesage_stage_duration_seconds", "Time spent per pipeline stage")
+FILES_ANALYZED = Counter("codesage_files_analyzed_total", "Files run through static analysis")
+FILE_SECONDS = Histogram("codesage_file_analysis_seconds", "Per-file static analysis time, cache hits included")
+LLM_SECONDS = Histogram("codesage_llm_request_duration_seconds", "LLM provider call latency, cache hits excluded")
+LLM_REQUESTS = Counter("codesage_llm_requests_total", "LLM completions by outcome")
+
+REGISTRY = [
+    ANALYSES_IN_FLIGHT, ANALYSES_TOTAL, ANALYSIS_SECONDS, STAGE_SECONDS,
+    FILES_ANALYZED, FILE_SECONDS, LLM_SECONDS, LLM_REQUESTS,
+]
+
+
+def render(extra: Optional[List[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]] = None) -> str:
+    """Every registered metric in exposition format, plus extra metrics
+    computed at scrape time as (name, kind, help, [(labels, value)])"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    for name, kind, help_text, values in extra or []:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{_format_labels(_label_key(labels))} {value:g}" for labels, value in values)
+    return "\n".join(lines) + "\n"
+
+
+class AnalysisTrace:
+    """Stage and per-file spans for one analysis, in milliseconds from its start"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Dict[str, Any]] = []
+        self.files: List[Dict[str, Any]] = []
+        self.profiler = None
+        # How the analyzed files were picked; see file_processor.select_files
+        self.selection: Optional[Dict[str, Any]] = None
+        # Set by the pipeline when it finishes short of completed (e.g. "partial")
+        self.status: Optional[str] = None
+
+    def _offset_ms(self, at: float) -> float:
+        return round((at - self.started) * 1000, 2)
+
+    def add_stage(self, name: str, started: float, seconds: float) -> None:
+        self.stages.append({"stage": name, "start_ms": self._offset_ms(started), "duration_ms": round(seconds * 1000, 2)})
+
+    def add_file(self, path: str, started: float, seconds: float, **fields: Any) -> None:
+        self.files.append({
+            "path": path,
+            "start_ms": self._offset_ms(started),
+            "duration_ms": round(seconds * 1000, 2),
+            **fields,
+        })
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_ms": self._offset_ms(time.perf_counter()),
+            "stages": self.stages,
+            "files": self.files,
+        }
+
+
+_current_trace: ContextVar[Optional[AnalysisTrace]] = ContextVar("codesage_analysis_trace", default=None)
+
+
+def current_trace() -> Optional[AnalysisTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_analysis() -> Iterator[AnalysisTrace]:
+    """Install a fresh trace for the enclosed analysis and count it in flight.
+    It is counted as failed if it raises, else by trace.status (default
+    completed)."""
+    trace = AnalysisTrace()
+    token = _current_trace.set(trace)
+    ANALYSES_IN_FLIGHT.inc()
+    outcome = "failed"
+    try:
+        yield trace
+        outcome = trace.status or "completed"
+    finally:
+        ANALYSES_IN_FLIGHT.dec()
+        ANALYSES_TOTAL.inc(status=outcome)
+        ANALYSIS_SECONDS.observe(time.perf_counter() - trace.started)
+        _current_trace.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    trace = _current_trace.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, stage=name)
+        if trace is not None:
+            trace.add_stage(name, started, seconds)
@@ -1,2 +1,5 @@
 # Workers package
-__all__ = []
\ No newline at end of file
+from .analysis_worker import analyze_file, create_process_pool
+from .queue_consumer import AnalysisJob, JobQueue, QueueConsumer, QueueFull
+
+__all__ = ['analyze_file', 'create_process_pool', 'AnalysisJob', 'JobQueue', 'QueueConsumer', 'QueueFull']
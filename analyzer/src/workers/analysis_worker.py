@@ -0,0 +1,179 @@
+"""
+CPU-bound per-file analysis (AST parsing, regex scans), kept free of API and
+settings imports so it can run cheaply inside process pool workers.
+"""
+import codecs
+import functools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import BinaryIO, Dict, Any, Optional
+
+from src.parsers.python_parser import PythonParser
+from src.parsers.javascript_parser import JavaScriptParser
+from src.parsers.typescript_parser import TypeScriptParser
+from src.parsers.babel_worker_pool import configure_babel_pool
+from src.analyzers import security_analyzer
+from src.metrics.line_metrics import LineCounter
+
+# Line-comment marker per language, for the line counts of streamed files
+COMMENT_PREFIXES = {"python": "#", "javascript": "//", "typescript": "//"}
+
+# Streamed files are read, decoded and scanned this many bytes/characters at a time
+STREAM_CHUNK_SIZE = security_analyzer.SCAN_CHUNK_CHARS
+
+
+def create_process_pool(max_concurrent_analyses: int,
+                        babel_pool: Optional[Dict[str, Any]] = None) -> ProcessPoolExecutor:
+    """Pool sized to the analysis concurrency limit, capped at the core count.
+    Uses spawn so workers never inherit the event loop's threads or sockets.
+    babel_pool (configure_babel_pool's arguments) shapes each worker's own
+    Babel pool."""
+    workers = max(1, min(max_concurrent_analyses, os.cpu_count() or 1))
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=functools.partial(configure_babel_pool, **babel_pool) if babel_pool else None,
+    )
+
+
+def _function_columns(functions) -> Dict[str, list]:
+    """Per-function metrics as parallel lists (see metrics.code_metrics).
+    Python parsers yield FunctionMetrics, the JS visitor plain dicts, which
+    have no cognitive complexity."""
+    columns = {"name": [], "line": [], "complexity": [], "cognitive_complexity": [],
+               "lines_of_code": [], "parameters": []}
+    for func in functions:
+        if isinstance(func, dict):
+            values = (func["name"], func["line_start"], func["complexity"], None,
+                      func["lines_of_code"], func["parameters"])
+        else:
+            values = (func.name, func.line_start, func.complexity, func.cognitive_complexity,
+                      func.lines_of_code, func.parameters)
+        for column, value in zip(columns.values(), values):
+            column.append(value)
+    return columns
+
+
+def analyze_file(path: str, content: str, lang: str) -> Dict[str, Any]:
+    """Parse + security-scan one file. The record is path-independent so it
+    can be cached by content hash and reused for any path holding the same
+    content. Its issues are packed findings ([rule_id, line, severity,
+    args], see rule_table.Finding); their text comes from the rule table.
+
+    Runs inside pool worker processes, so it must stay a picklable
+    module-level function whose arguments and result are plain data.
+
+    record["timings"] holds parse_ms/scan_ms for this run only; callers drop
+    it before caching the record."""
+    started = time.perf_counter()
+    # AST-level parsing where we have a real parser for the language
+    parse_result = None
+    if lang == "python":
+        try:
+            parse_result = PythonParser().parse(content, path)
+        except Exception as e:
+            print(f"Python parse error for {path}: {e}")
+    elif lang == "javascript":
+        try:
+            parse_result = JavaScriptParser().parse(content, path)
+        except Exception as e:
+            print(f"JS parse error for {path}: {e}")
+    elif lang == "typescript":
+        try:
+            parse_result = TypeScriptParser().parse(content, path)
+        except Exception as e:
+            print(f"TS parse error for {path}: {e}")
+
+    record = {"parsed": False, "parse_error": None, "metrics": None, "functions": None, "issues": []}
+    if parse_result and not parse_result.get("error"):
+        record["parsed"] = True
+        record["issues"].extend(finding.pack() for finding in parse_result.get("issues", []))
+        m = parse_result.get("metrics", {})
+        record["metrics"] = {
+            "lines_of_code": m.get("lines_of_code", 0),
+            "function_count": m.get("function_count", 0),
+            "max_function_complexity": m.get("max_function_complexity", 0),
+        }
+        record["functions"] = _function_columns(parse_result.get("functions", []))
+    elif parse_result and parse_result.get("error"):
+        record["parse_error"] = parse_result["error"]
+
+    parsed_at = time.perf_counter()
+
+    # Security pattern scan runs on raw text regardless of AST support,
+    # so TS-only syntax files still get real security coverage
+    record["issues"].extend(finding.pack() for finding in security_analyzer.scan(path, content))
+
+    record["timings"] = {
+        "parse_ms": round((parsed_at - started) * 1000, 2),
+        "scan_ms": round((time.perf_counter() - parsed_at) * 1000, 2),
+    }
+    return record
+
+
+def analyze_file_profiled(path: str, content: str, lang: str) -> Dict[str, Any]:
+    """analyze_file under cProfile and tracemalloc, in whichever process runs
+    it; record["profile"] holds the raw totals (see profiling.profile_call)"""
+    from src.utils.profiling import profile_call
+    record, raw = profile_call(analyze_file, path, content, lang)
+    record["profile"] = raw
+    return record
+
+
+class LargeFileAnalysis:
+    """Analysis of a file too large to hold or parse whole, fed decoded text
+    in pieces as it arrives: one-pass line counts plus the chunked security
+    scan, keeping only the first head_chars characters (for LLM context).
+    Memory stays proportional to the chunk size, not the file.
+
+    finish() returns a record shaped like analyze_file's, with parsed=False
+    (no AST metrics or AST issues) and streamed=True."""
+
+    def __init__(self, path: str, lang: str, head_chars: int):
+        self.head_chars = head_chars
+        self.head = ""
+        self.chars = 0
+        self._lines = LineCounter(COMMENT_PREFIXES.get(lang, "#"))
+        self._scanner = security_analyzer.ChunkedScanner(path, STREAM_CHUNK_SIZE)
+        self._seconds = 0.0
+
+    def feed(self, text: str) -> None:
+        started = time.perf_counter()
+        if len(self.head) < self.head_chars:
+            self.head += text[:self.head_chars - len(self.head)]
+        self.chars += len(text)
+        self._lines.feed(text)
+        self._scanner.feed(text)
+        self._seconds += time.perf_counter() - started
+
+    def finish(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        lines = self._lines.finish()
+        findings = self._scanner.finish()
+        self._seconds += time.perf_counter() - started
+        return {
+            "parsed": False,
+            "parse_error": None,
+            "streamed": True,
+            "metrics": {"lines_of_code": lines.code, "total_lines": lines.total, "characters": self.chars},
+            "functions": None,
+            "issues": [finding.pack() for finding in findings],
+            "timings": {"parse_ms": 0.0, "scan_ms": round(self._seconds * 1000, 2)},
+        }
+
+
+def analyze_binary_stream(path: str, lang: str, fileobj: BinaryIO, head_chars: int) -> Dict[str, Any]:
+    """LargeFileAnalysis over a readable binary file object (e.g. a tar
+    member), decoded as UTF-8 with replacement like the in-memory paths.
+    Returns a file dict carrying its head as content and its record."""
+    analysis = LargeFileAnalysis(path, lang, head_chars)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        data = fileobj.read(STREAM_CHUNK_SIZE)
+        if not data:
+            break
+        analysis.feed(decoder.decode(data))
+    analysis.feed(decoder.decode(b"", final=True))
+    return {"path": path, "content": analysis.head, "language": lang, "record": analysis.finish()}
@@ -0,0 +1,228 @@
+"""
+In-process priority queue and consumer for analysis jobs. Jobs mirror the
+analysis_queue table (priority, status, attempts, max_attempts,
+error_message) so a database-backed queue can replace JobQueue without
+touching the consumer.
+
+A fixed number of consumer tasks bounds how many analyses run at once; the
+queue itself is bounded too, and submitting to a full queue fails fast with
+an estimate of when to retry rather than buffering without limit.
+"""
+import asyncio
+import itertools
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class AnalysisJob:
+    analysis_id: str
+    payload: Dict[str, Any]
+    priority: int = 0  # higher runs sooner
+    max_attempts: int = 3
+    job_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = "queued"  # queued, processing, completed, failed
+    attempts: int = 0
+    error_message: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+        self.updated_at = time.time()
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit; retry_after is a whole number of seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Analysis queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class _AttemptTimedOut(Exception):
+    pass
+
+
+class JobQueue:
+    """Bounded priority queue: highest priority first, FIFO within a priority.
+
+    max_size counts queued jobs only, including ones waiting out a retry
+    backoff; running jobs don't take up queue space."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._queue: "asyncio.PriorityQueue[tuple]" = asyncio.PriorityQueue()
+        self._order = itertools.count()
+        self._delayed = 0
+        # Set on every get(), the only thing that shortens the queue
+        self._dequeued = asyncio.Event()
+        self.jobs: Dict[str, AnalysisJob] = {}
+
+    def __len__(self) -> int:
+        return self._queue.qsize() + self._delayed
+
+    def submit(self, job: AnalysisJob, retry_after: int = 1) -> AnalysisJob:
+        if len(self) >= self.max_size:
+            raise QueueFull(retry_after)
+        self.jobs[job.job_id] = job
+        self._push(job)
+        return job
+
+    async def get(self) -> AnalysisJob:
+        job = (await self._queue.get())[2]
+        self._dequeued.set()
+        return job
+
+    async def wait_for_room(self, limit: int) -> None:
+        """Return once fewer than limit jobs are queued, waking on dequeues"""
+        while len(self) >= limit:
+            self._dequeued.clear()
+            await self._dequeued.wait()
+
+    async def requeue_after(self, job: AnalysisJob, delay: float) -> None:
+        """Put a failed job back once its backoff has passed. It keeps its
+        queue slot while waiting, so retries can't be crowded out."""
+        job.set_status("queued")
+        self._delayed += 1
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self._delayed -= 1
+        self._push(job)
+
+    def forget(self, job: AnalysisJob) -> None:
+        self.jobs.pop(job.job_id, None)
+
+    def _push(self, job: AnalysisJob) -> None:
+        self._queue.put_nowait((-job.priority, next(self._order), job))
+
+
+class QueueConsumer:
+    """Runs jobs from a JobQueue on `concurrency` consumer tasks.
+
+    Each attempt gets timeout_seconds. A failed job is retried after
+    backoff_seconds * 2**(attempts - 1) until max_attempts is used up, then
+    marked failed. A timed-out one is marked failed straight away: the
+    handler keeps its own deadline and returns partial results by then, so
+    running past timeout_seconds means another attempt would hang too.
+    on_retry(job, error, delay) and on_failure(job, error) let the caller
+    surface either outcome."""
+
+    def __init__(self, queue: JobQueue, handler: Callable[[AnalysisJob], Awaitable[Any]],
+                 concurrency: int, timeout_seconds: float, backoff_seconds: float = 5.0,
+                 on_retry: Optional[Callable] = None, on_failure: Optional[Callable] = None):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.timeout_seconds = timeout_seconds
+        self.backoff_seconds = backoff_seconds
+        self.on_retry = on_retry
+        self.on_failure = on_failure
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self._tasks: List[asyncio.Task] = []
+        self._retry_tasks: set = set()
+        # Running mean of attempt duration, for Retry-After estimates
+        self._mean_seconds = 30.0
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        tasks = self._tasks + list(self._retry_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job: AnalysisJob) -> AnalysisJob:
+        return self.queue.submit(job, retry_after=self.retry_after())
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up"""
+        backlog = len(self.queue) + 1
+        return max(1, math.ceil(self._mean_seconds * backlog / max(self.concurrency, 1)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self.queue),
+            "max_queued": self.queue.max_size,
+            "running": self.running,
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "mean_job_seconds": round(self._mean_seconds, 2),
+        }
+
+    async def _consume(self) -> None:
+        while True:
+            job = await self.queue.get()
+            await self._run(job)
+
+    async def _run(self, job: AnalysisJob) -> None:
+        job.attempts += 1
+        job.set_status("processing")
+        self.running += 1
+        started = time.monotonic()
+        try:
+            await self._attempt(job)
+        except asyncio.CancelledError:
+            raise
+        except _AttemptTimedOut:
+            self._failed_attempt(job, "timed out", retry=False)
+        except Exception as e:
+            self._failed_attempt(job, str(e) or type(e).__name__)
+        else:
+            job.error_message = None
+            job.set_status("completed")
+            self.completed += 1
+            self.queue.forget(job)
+        finally:
+            self.running -= 1
+            self._mean_seconds = 0.8 * self._mean_seconds + 0.2 * (time.monotonic() - started)
+
+    async def _attempt(self, job: AnalysisJob) -> None:
+        # Unlike wait_for, tells our timeout apart from a TimeoutError the
+        # handler raised itself (a network timeout is worth retrying)
+        task = asyncio.ensure_future(self.handler(job))
+        try:
+            done, _ = await asyncio.wait({task}, timeout=self.timeout_seconds)
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if not done:
+            raise _AttemptTimedOut()
+        task.result()
+
+    def _failed_attempt(self, job: AnalysisJob, error: str, retry: bool = True) -> None:
+        job.error_message = error
+        if retry and job.attempts < job.max_attempts:
+            delay = self.backoff_seconds * 2 ** (job.attempts - 1)
+            self.retries += 1
+            logger.warning("Analysis attempt failed, retrying", analysis_id=job.analysis_id,
+                           attempt=job.attempts, delay=delay, error=error)
+            if self.on_retry is not None:
+                self.on_retry(job, error, delay)
+            task = asyncio.create_task(self.queue.requeue_after(job, delay))
+            self._retry_tasks.add(task)
+            task.add_done_callback(self._retry_tasks.discard)
+            return
+
+        job.set_status("failed")
+        self.failed += 1
+        self.queue.forget(job)
+        logger.error("Analysis failed", analysis_id=job.analysis_id, attempts=job.attempts, error=error)
+        if self.on_failure is not None:
+            self.on_failure(job, error)
@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+# Settings are read once, at import; keep the tests offline and off the
+# shared /tmp/codesage caches. GROQ_API_KEY is required but never used.
+_scratch = tempfile.mkdtemp(prefix="codesage-tests-")
+for name, value in {
+    "GROQ_API_KEY": "test",
+    "LLM_PROVIDER": "fake",
+    "LLM_FAKE_LATENCY_SECONDS": "0",
+    "ENABLE_FILE_CACHE": "false",
+    "ENABLE_LLM_CACHE": "false",
+    "RESULT_STORE_PATH": "",
+    "TEMP_DIR": _scratch,
+    "REPO_CACHE_DIR": os.path.join(_scratch, "repos"),
+    "SNAPSHOT_CACHE_DIR": os.path.join(_scratch, "snapshots"),
+}.items():
+    os.environ.setdefault(name, value)
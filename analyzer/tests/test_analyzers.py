@@ -0,0 +1,51 @@
+import time
+
+from src.analyzers import security_analyzer
+from src.analyzers.security_analyzer import ChunkedScanner
+
+
+def _whole_text_scan(path, content):
+    bundle = security_analyzer._bundle_for(path)
+    found = [[] for _ in bundle]
+    security_analyzer._scan_block(bundle, content, 0, found)
+    return [(f.rule_id, f.line) for rule_findings in found for f in rule_findings]
+
+
+def _chunked_scan(path, content, chunk_chars, piece):
+    scanner = ChunkedScanner(path, chunk_chars)
+    for start in range(0, len(content), piece):
+        scanner.feed(content[start:start + piece])
+    return [(f.rule_id, f.line) for f in scanner.finish()]
+
+
+def test_chunked_scan_matches_whole_text():
+    lines = []
+    for i in range(2000):
+        lines.append(f"const v{i} = compute({i});")
+        if i % 97 == 0:
+            lines.append(f'const password = "hunter2hunter{i}";')
+        if i % 131 == 0:
+            lines.append("el.innerHTML = userInput;")
+    content = "\n".join(lines)
+    expected = _whole_text_scan("app.js", content)
+    assert expected
+    for chunk_chars, piece in ((64, 7), (1000, 333), (4096, 4096)):
+        assert _chunked_scan("app.js", content, chunk_chars, piece) == expected
+
+
+def test_long_single_line_is_linear():
+    # 8 MB of minified code on one line, fed in 1 KB pieces with a 1 KB chunk
+    # size; rejoining the line on every feed would copy gigabytes
+    content = "var a=1;" * 500_000 + 'var password="s3cretvalue123";' + "b();" * 1_000_000
+    started = time.perf_counter()
+    findings = _chunked_scan("bundle.min.js", content, 1024, 1024)
+    assert time.perf_counter() - started < 5.0
+    assert findings == _whole_text_scan("bundle.min.js", content)
+    assert ("HARDCODED_SECRET", 1) in findings
+
+
+def test_long_line_then_more_lines():
+    content = "x" * 3_000_000 + '\napi_key = "abcdefgh12345678"\n' + "y = 1\n" * 10
+    findings = _chunked_scan("settings.py", content, 1024, 1024)
+    assert findings == _whole_text_scan("settings.py", content)
+    assert ("HARDCODED_SECRET", 2) in findings
@@ -0,0 +1,48 @@
+import os
+import time
+
+from src.utils import cache as cache_module
+from src.utils.cache import TieredCache, content_key
+
+
+def disk_files(directory):
+    return sorted(name for _, _, names in os.walk(directory) for name in names)
+
+
+def test_hits_are_copies():
+    cache = TieredCache(max_entries=10)
+    cache.set("k", {"record": {"issues": [1]}, "timings": {}})
+    cache.get("k").pop("timings")
+    cache.get("k")["record"]["issues"].append(2)
+    assert cache.get("k") == {"record": {"issues": [1]}, "timings": {}}
+
+
+def test_sweep_deletes_expired_files_never_read_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "DISK_SWEEP_WRITES", 3)
+    cache = TieredCache(max_entries=10, directory=str(tmp_path), ttl_seconds=60)
+    stale = [content_key("stale", str(i)) for i in range(2)]
+    for key in stale:
+        cache.set(key, [key])
+        old = time.time() - 120
+        os.utime(cache._path(key), (old, old))
+    cache.set(content_key("fresh"), ["fresh"])  # third write: sweeps
+    assert disk_files(tmp_path) == [f"{content_key('fresh')}.json"]
+    assert cache.stats()["expirations"] == 2
+
+
+def test_disk_tier_is_capped_oldest_first(tmp_path):
+    value = ["x" * 1000]
+    entry_bytes = len('["' + "x" * 1000 + '"]')
+    cache = TieredCache(max_entries=100, directory=str(tmp_path), max_disk_bytes=entry_bytes * 5)
+    keys = [content_key(str(i)) for i in range(8)]
+    for i, key in enumerate(keys):
+        cache.set(key, value)
+        stamp = time.time() - 100 + i
+        os.utime(cache._path(key), (stamp, stamp))
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= entry_bytes * 5
+    assert stats["disk_evictions"] >= 3
+    # The newest entries survive, and the cache still reads its own evictions from memory
+    assert f"{keys[-1]}.json" in disk_files(tmp_path)
+    assert f"{keys[0]}.json" not in disk_files(tmp_path)
+    assert cache.get(keys[0]) == value
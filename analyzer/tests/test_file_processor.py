@@ -0,0 +1,155 @@
+import asyncio
+import contextlib
+import gzip
+import io
+import tarfile
+
+import httpx
+import pytest
+
+from src.utils.file_processor import (
+    SelectionBudget, fetch_archive_files, read_archive_files, select_files,
+)
+
+ROOT = "octo-demo-0123abc/"
+
+
+def make_tarball(files):
+    """gzipped tar of {path: bytes} under a GitHub-style top directory"""
+    raw = io.BytesIO()
+    with tarfile.open(fileobj=raw, mode="w") as archive:
+        directory = tarfile.TarInfo(ROOT.rstrip("/"))
+        directory.type = tarfile.DIRTYPE
+        archive.addfile(directory)
+        for path, data in files.items():
+            info = tarfile.TarInfo(ROOT + path)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return gzip.compress(raw.getvalue())
+
+
+FILES = {
+    "src/app.py": b"def main():\n    return 1\n",
+    "src/util.js": b"function f() { return 2; }\n",
+    "web/view.tsx": b"export const V = () => null;\n",
+    "README.md": b"# demo\n",
+    "dist/bundle.js": b"var a=1;\n",
+    "web/node_modules/lib/index.js": b"module.exports = 1;\n",
+    "src/big.py": b"x = 1\n" * 1000,
+}
+
+
+def test_read_archive_filters_paths_and_strips_top_directory():
+    files = read_archive_files(io.BytesIO(make_tarball(FILES)), max_files=100, max_file_bytes=1000)
+    assert [f["path"] for f in files] == ["src/app.py", "src/util.js", "web/view.tsx"]
+    assert [f["language"] for f in files] == ["python", "javascript", "typescript"]
+    assert files[0]["content"] == FILES["src/app.py"].decode()
+
+
+def test_read_archive_streams_large_members_within_cap():
+    seen = []
+
+    def stream_large(path, lang, fileobj):
+        data = fileobj.read(100)
+        seen.append((path, lang, len(data)))
+        return {"path": path, "language": lang, "content": data.decode(), "record": {"streamed": True}}
+
+    files = read_archive_files(io.BytesIO(make_tarball(FILES)), 100, 1000, stream_large, 10_000)
+    assert seen == [("src/big.py", "python", 100)]
+    assert files[-1]["record"] == {"streamed": True}
+    # Over the streaming cap: skipped
+    files = read_archive_files(io.BytesIO(make_tarball(FILES)), 100, 1000, stream_large, 5000)
+    assert "src/big.py" not in [f["path"] for f in files]
+
+
+def test_read_archive_max_files_and_selected_paths():
+    assert len(read_archive_files(io.BytesIO(make_tarball(FILES)), 2, 1000)) == 2
+    files = read_archive_files(io.BytesIO(make_tarball(FILES)), 100, 1000,
+                               paths={"web/view.tsx", "src/app.py", "dist/bundle.js"})
+    # dist/ is never analyzable, even when asked for
+    assert [f["path"] for f in files] == ["src/app.py", "web/view.tsx"]
+
+
+class _ChunkedBody(httpx.AsyncByteStream):
+    def __init__(self, data, chunk_size):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.chunks_sent = 0
+
+    async def __aiter__(self):
+        for start in range(0, len(self.data), self.chunk_size):
+            self.chunks_sent += 1
+            yield self.data[start:start + self.chunk_size]
+            await asyncio.sleep(0)
+
+
+def _fetch(handler, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fetch_archive_files(client, "https://api.github.com/repos/o/r/tarball/main", {},
+                                             kwargs.pop("max_files", 100), 1000, **kwargs)
+    return asyncio.run(run())
+
+
+def test_fetch_archive_streams_gzip_in_chunks():
+    body = _ChunkedBody(make_tarball(FILES), 7)
+    files = _fetch(lambda request: httpx.Response(200, stream=body))
+    assert [f["path"] for f in files] == ["src/app.py", "src/util.js", "web/view.tsx"]
+    assert body.chunks_sent > 10
+
+
+def test_fetch_archive_stops_downloading_once_files_are_found():
+    padding = {f"pad/{i}.txt": bytes(range(256)) * 40 for i in range(200)}
+    data = make_tarball({"src/app.py": FILES["src/app.py"], **padding})
+    body = _ChunkedBody(data, 512)
+    files = _fetch(lambda request: httpx.Response(200, stream=body), paths={"src/app.py"})
+    assert [f["path"] for f in files] == ["src/app.py"]
+    assert body.chunks_sent < len(data) // 512
+
+
+def test_fetch_archive_holds_each_hosts_limit_only_for_its_own_hop():
+    held = []
+
+    @contextlib.asynccontextmanager
+    async def host_limit(host):
+        held.append(host)
+        try:
+            yield
+        finally:
+            held.remove(host)
+
+    def handler(request):
+        if request.url.host == "api.github.com":
+            return httpx.Response(302, headers={"location": "https://codeload.github.com/o/r/legacy.tar.gz/main"})
+        # The API host was released as soon as it answered, and the token stays with it
+        assert held == ["codeload.github.com"]
+        assert "authorization" not in request.headers
+        return httpx.Response(200, content=make_tarball(FILES))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fetch_archive_files(client, "https://api.github.com/repos/o/r/tarball/main",
+                                             {"Authorization": "Bearer t"}, 100, 1000, host_limit=host_limit)
+    files = asyncio.run(run())
+    assert [f["path"] for f in files] == ["src/app.py", "src/util.js", "web/view.tsx"]
+    assert held == []
+
+
+def test_fetch_archive_missing_and_rate_limited():
+    assert _fetch(lambda request: httpx.Response(404)) is None
+    with pytest.raises(RuntimeError):
+        _fetch(lambda request: httpx.Response(403, text="API rate limit exceeded"))
+
+
+def test_select_files_spreads_and_respects_budget():
+    entries = [{"path": f"pkg{d}/mod{i}.py", "size": 2000} for d in range(5) for i in range(10)]
+    entries += [{"path": f"pkg0/tests/test_{i}.py", "size": 2000} for i in range(10)]
+    entries += [{"path": "pkg1/empty.py", "size": 0}]
+    selected = select_files(entries, SelectionBudget(10))
+    assert len(selected) == 10
+    assert sorted({e["path"].split("/")[0] for e in selected}) == [f"pkg{d}" for d in range(5)]
+    assert not any("test" in e["path"] or e["size"] == 0 for e in selected)
+
+    by_bytes = select_files(entries, SelectionBudget(100, max_bytes=9000))
+    assert sum(e["size"] for e in by_bytes) <= 9000
+    assert len(by_bytes) == 4
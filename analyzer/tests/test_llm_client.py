@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+from src.api.routes import _get_llm_supplementary_issues
+from src.llm import llm_client
+from src.llm.llm_client import FakeProvider, LLMClient, prompt_fingerprint
+from src.utils.cache import TieredCache
+
+MESSAGES = [{"role": "user", "content": "review this"}]
+
+
+def complete(client, messages=MESSAGES, temperature=0.2):
+    return client.complete(messages, model="m", temperature=temperature, max_tokens=100,
+                           response_format={"type": "json_object"})
+
+
+def test_in_flight_calls_are_capped():
+    async def run():
+        provider = FakeProvider(latency_seconds=0.02)
+        client = LLMClient(provider, max_concurrent_calls=3, timeout_seconds=5)
+        await asyncio.gather(*(complete(client) for _ in range(10)))
+        return provider
+    provider = asyncio.run(run())
+    assert provider.calls == 10
+    assert provider.max_in_flight == 3
+
+
+def test_timeout_covers_the_call_not_the_wait_for_a_slot():
+    async def run():
+        client = LLMClient(FakeProvider(latency_seconds=0.1), max_concurrent_calls=1, timeout_seconds=0.15)
+        # The third call waits 0.2s for its slot, well past the timeout
+        await asyncio.gather(*(complete(client) for _ in range(3)))
+        slow = LLMClient(FakeProvider(latency_seconds=1.0), max_concurrent_calls=1, timeout_seconds=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await complete(slow)
+    asyncio.run(run())
+
+
+def test_supplementary_review_falls_back_on_timeout():
+    async def run():
+        llm_client.set_llm_client(LLMClient(FakeProvider(latency_seconds=1.0), 1, timeout_seconds=0.05))
+        try:
+            return await _get_llm_supplementary_issues("https://github.com/octo/demo", "x = 1", [])
+        finally:
+            llm_client.set_llm_client(None)
+    assert asyncio.run(run()) == ([], "", False)
+
+
+def test_supplementary_review_tags_issues():
+    issue = {"type": "logic", "severity": "medium", "file": "a.py", "line": 1, "message": "m"}
+
+    async def run():
+        provider = FakeProvider(latency_seconds=0, response=json.dumps({"issues": [issue]}))
+        llm_client.set_llm_client(LLMClient(provider, 1, timeout_seconds=5))
+        try:
+            return await _get_llm_supplementary_issues("https://github.com/octo/demo", "x = 1", [])
+        finally:
+            llm_client.set_llm_client(None)
+    assert asyncio.run(run()) == ([dict(issue, source="llm")], "", False)
+
+
+def test_cache_hits_and_misses_by_fingerprint():
+    async def run():
+        provider = FakeProvider(latency_seconds=0)
+        client = LLMClient(provider, 2, timeout_seconds=5, cache=TieredCache(max_entries=10))
+        first = await complete(client)
+        again = await complete(client)
+        other_temperature = await complete(client, temperature=0.3)
+        other_prompt = await complete(client, messages=[{"role": "user", "content": "review that"}])
+        return provider, [first.cached, again.cached, other_temperature.cached, other_prompt.cached]
+    provider, cached = asyncio.run(run())
+    assert cached == [False, True, False, False]
+    assert provider.calls == 3
+
+
+def test_timed_out_calls_are_not_cached():
+    async def run():
+        provider = FakeProvider(latency_seconds=0.2)
+        client = LLMClient(provider, 1, timeout_seconds=0.05, cache=TieredCache(max_entries=10))
+        with pytest.raises(asyncio.TimeoutError):
+            await complete(client)
+        provider.latency_seconds = 0
+        return (await complete(client)).cached, provider.calls
+    assert asyncio.run(run()) == (False, 2)
+
+
+def test_prompt_fingerprint():
+    key = prompt_fingerprint(MESSAGES, "m", 0.2, 100, {"type": "json_object"})
+    assert key == prompt_fingerprint([dict(MESSAGES[0])], "m", 0.2, 100, {"type": "json_object"})
+    assert key != prompt_fingerprint(MESSAGES, "m", 0.2, 101, {"type": "json_object"})
+    assert key != prompt_fingerprint(MESSAGES, "m2", 0.2, 100, {"type": "json_object"})
+    assert key != prompt_fingerprint(MESSAGES, "m", 0.2, 100, None)
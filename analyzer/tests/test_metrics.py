@@ -0,0 +1,92 @@
+import statistics
+
+from src.analyzers import security_analyzer  # noqa: F401  registers the rules
+from src.analyzers.rule_table import Finding
+from src.metrics import quality_score
+from src.metrics.code_metrics import RepoMetrics
+
+
+def test_score_of_findings_and_llm_issues():
+    # Two high security findings, a medium quality one with a severity
+    # override and a low one, plus two LLM issues (dicts with "type")
+    findings = [
+        Finding("HARDCODED_SECRET", 3),
+        Finding("AWS_ACCESS_KEY", 9),
+        Finding("HIGH_COMPLEXITY", 12, "medium", {"name": "load", "complexity": 14}),
+        Finding("VAR_USAGE", 20),
+    ]
+    llm_issues = [
+        {"type": "logic", "severity": "medium", "file": "a.py", "source": "llm"},
+        {"type": "security", "severity": "low", "file": "a.py", "source": "llm"},
+    ]
+    # 100 - (20 + 20 + 10 + 4 + 10 + 4): the security multiplier applies
+    # to neither (see compute_score)
+    assert quality_score.compute_score(llm_issues, findings) == 32
+    # Issue dicts with a "category" do get it
+    assert quality_score.compute_score([{"severity": "high", "category": "security"}]) == 70
+
+
+def test_score_floor_and_empty():
+    assert quality_score.compute_score([]) == quality_score.MAX_SCORE
+    many = [Finding("HARDCODED_SECRET", line) for line in range(10)]
+    assert quality_score.compute_score([], many) == quality_score.MIN_SCORE
+
+
+def small_repo():
+    metrics = RepoMetrics()
+    metrics.add_file("src/api/routes.py", {
+        "name": ["create", "handle", "helper"], "line": [10, 40, 90],
+        "complexity": [3, 12, 1], "cognitive_complexity": [2, 18, 0],
+        "lines_of_code": [20, 60, 4], "parameters": [2, 5, 0],
+    })
+    metrics.add_file("src/api/empty.py", {
+        "name": [], "line": [], "complexity": [], "cognitive_complexity": [], "lines_of_code": [], "parameters": [],
+    })
+    # The JS parsers don't compute cognitive complexity
+    metrics.add_file("web/app.js", {
+        "name": ["render", "onClick"], "line": [1, 30],
+        "complexity": [6, 2], "cognitive_complexity": [None, None],
+        "lines_of_code": [25, 8], "parameters": [1, 1],
+    })
+    return metrics
+
+
+def test_repo_metrics_summary_and_distribution():
+    metrics = small_repo()
+    assert metrics.summary("complexity") == {
+        "count": 5, "mean": 4.8, "max": 12, "p50": 3.0, "p75": 6.0, "p90": 9.6, "p95": 10.8, "p99": 11.76,
+    }
+    # Linear interpolation between closest ranks, as statistics.quantiles(method="inclusive")
+    quantiles = statistics.quantiles([3, 12, 1, 6, 2], n=100, method="inclusive")
+    assert [metrics.summary("complexity")[f"p{p}"] for p in (50, 75, 90, 95, 99)] == \
+        [round(quantiles[p - 1], 2) for p in (50, 75, 90, 95, 99)]
+    # Missing values (the JS functions) are left out
+    assert metrics.summary("cognitive_complexity")["count"] == 3
+    assert metrics.distribution("complexity") == [
+        {"bucket": "le_1", "count": 1}, {"bucket": "le_5", "count": 2}, {"bucket": "le_10", "count": 1},
+        {"bucket": "le_20", "count": 1}, {"bucket": "le_50", "count": 0}, {"bucket": "gt_50", "count": 0},
+    ]
+
+
+def test_repo_metrics_hotspots_and_rollup():
+    metrics = small_repo()
+    assert metrics.hotspots("complexity", 3) == [
+        {"file_path": "src/api/routes.py", "function": "handle", "line": 40, "value": 12},
+        {"file_path": "web/app.js", "function": "render", "line": 1, "value": 6},
+        {"file_path": "src/api/routes.py", "function": "create", "line": 10, "value": 3},
+    ]
+    assert [spot["function"] for spot in metrics.hotspots("cognitive_complexity", 5)] == ["handle", "create", "helper"]
+    assert metrics.directory_rollup() == [
+        {"directory": "src/api/", "function_count": 3, "mean_complexity": 5.33, "max_complexity": 12,
+         "lines_of_code": 84, "maintainability_index": 63.66},
+        {"directory": "web/", "function_count": 2, "mean_complexity": 4.0, "max_complexity": 6,
+         "lines_of_code": 33, "maintainability_index": 71.45},
+    ]
+    rows = metrics.to_metrics()
+    assert rows[:3] == [
+        {"metric_type": "function_count", "value": 5.0},
+        {"metric_type": "files_with_functions", "value": 2.0},
+        {"metric_type": "maintainability_index", "value": 65.85},
+    ]
+    assert RepoMetrics().to_metrics() == []
+
@@ -0,0 +1,52 @@
+import sys
+import time
+
+import pytest
+
+from src.parsers.babel_worker_pool import BabelWorkerPool, babel_available
+from src.parsers.typescript_parser import TypeScriptParser
+
+
+def test_request_write_is_bounded_by_the_timeout():
+    # A worker that never reads stdin: a request larger than the pipe buffer
+    # must time out on the write instead of blocking forever
+    pool = BabelWorkerPool(size=1, timeout_seconds=0.5,
+                           command=[sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            pool.parse("x" * (4 << 20))
+        assert time.monotonic() - started < 5
+        assert pool.timeouts == 1
+        assert pool.stats()["running"] == 0
+    finally:
+        pool.close()
+
+
+def test_crashed_worker_is_reported_and_replaced():
+    pool = BabelWorkerPool(size=1, timeout_seconds=5, command=[sys.executable, "-c", "pass"])
+    try:
+        for _ in range(2):
+            with pytest.raises(Exception):
+                pool.parse("let x = 1;")
+        assert pool.crashes + pool.timeouts == 2
+    finally:
+        pool.close()
+
+
+@pytest.mark.skipif(not babel_available(), reason="needs node and `npm ci` in js_ast/")
+def test_typescript_through_the_real_worker():
+    code = (
+        "interface User { id: number; name?: string }\n"
+        "export function find(users: User[], id: number): User | undefined {\n"
+        "  for (const u of users) {\n"
+        "    if (u.id == id) { return u; }\n"
+        "  }\n"
+        "  return undefined;\n"
+        "}\n"
+        "enum Color { Red, Green }\n"
+    )
+    result = TypeScriptParser().parse(code, "users.ts")
+    assert result.get("error") is None
+    assert [f["name"] for f in result["functions"]] == ["find"]
+    assert "LOOSE_EQUALITY" in {finding.rule_id for finding in result["issues"]}
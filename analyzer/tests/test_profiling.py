@@ -0,0 +1,43 @@
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from src.utils.profiling import ProfileCollector, profile_block
+from src.workers.analysis_worker import analyze_file, analyze_file_profiled
+
+SOURCE = "def load(path):\n    with open(path) as f:\n        return [line.strip() for line in f]\n" * 20
+
+
+def test_profiled_record_matches_plain_and_carries_raw_profile():
+    record = analyze_file_profiled("a.py", SOURCE, "python")
+    raw = record.pop("profile")
+    plain = analyze_file("a.py", SOURCE, "python")
+    record.pop("timings"), plain.pop("timings")
+    assert record == plain
+    assert any("python_parser.py" in label for label in raw["functions"])
+    assert raw["wall_ms"] > 0
+
+
+def test_profiles_in_pool_worker_and_collects():
+    collector = ProfileCollector(top_n=5)
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        for record in pool.map(analyze_file_profiled, ["a.py", "b.py"], [SOURCE, SOURCE], ["python", "python"]):
+            collector.add("analyze", record.pop("profile"))
+    stage = collector.as_dict()["stages"]["analyze"]
+    assert stage["files"] == 2
+    assert len(stage["functions"]) == 5
+    cumulative = [row["cumulative_ms"] for row in stage["functions"]]
+    assert cumulative == sorted(cumulative, reverse=True)
+    assert stage["allocations"]
+
+
+def test_overlapping_blocks_share_tracing_and_the_thread_profiler():
+    with profile_block() as outer:
+        with profile_block() as inner:
+            rows = [list(range(100)) for _ in range(100)]
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+    # The thread's one cProfile belongs to the outer block
+    assert outer["functions"] and not inner["functions"]
+    assert inner["allocations"] and inner["wall_ms"] <= outer["wall_ms"]
+    assert rows
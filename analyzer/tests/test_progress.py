@@ -0,0 +1,47 @@
+import asyncio
+
+from src.utils.progress import ProgressHub
+
+
+def test_finished_channels_keep_only_the_terminal_event():
+    hub = ProgressHub(max_finished=2)
+    for name in ("a", "b", "c"):
+        hub.open(name)
+        hub.publish(name, "file", path="x.py", issues=[{"message": "m"}] * 100)
+        hub.publish(name, "done", status="completed")
+        hub.close(name)
+    assert hub.get("a") is None  # past max_finished
+    assert hub.get("c").events == [{"type": "done", "status": "completed"}]
+    hub.publish("c", "file", path="late.py")
+    assert len(hub.get("c").events) == 1
+
+
+def test_follower_reading_when_the_channel_closes_sees_every_event():
+    async def run():
+        hub = ProgressHub()
+        channel = hub.open("a")
+        for i in range(3):
+            hub.publish("a", "file", path=f"{i}.py")
+        seen = []
+
+        async def follow():
+            async for event in channel.follow():
+                seen.append(event["type"])
+                await asyncio.sleep(0)
+        follower = asyncio.create_task(follow())
+        await asyncio.sleep(0)
+        hub.publish("a", "done", status="completed")
+        hub.close("a")
+        await follower
+        late = [event["type"] async for event in channel.follow()]
+        return seen, late
+    seen, late = asyncio.run(run())
+    assert seen == ["file", "file", "file", "done"]
+    assert late == ["done"]
+
+
+def test_publish_without_a_channel_is_a_no_op():
+    hub = ProgressHub()
+    hub.publish("queued", "stage", stage="fetch")
+    hub.close("queued")
+    assert hub.get("queued") is None
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from src.workers.queue_consumer import AnalysisJob, JobQueue, QueueConsumer, QueueFull
+
+
+def job(name, priority=0, max_attempts=3):
+    return AnalysisJob(analysis_id=name, payload={}, priority=priority, max_attempts=max_attempts)
+
+
+def test_priority_order_fifo_within_priority():
+    async def run():
+        queue = JobQueue(max_size=10)
+        for name, priority in [("a", 0), ("b", 5), ("c", 0), ("d", 5), ("e", 9)]:
+            queue.submit(job(name, priority))
+        return [(await queue.get()).analysis_id for _ in range(5)]
+    assert asyncio.run(run()) == ["e", "b", "d", "a", "c"]
+
+
+def test_full_queue_raises_with_retry_after():
+    async def run():
+        queue = JobQueue(max_size=2)
+        consumer = QueueConsumer(queue, handler=None, concurrency=2, timeout_seconds=1)
+        consumer.submit(job("a"))
+        consumer.submit(job("b"))
+        with pytest.raises(QueueFull) as caught:
+            consumer.submit(job("c"))
+        # Mean attempt (30s) * 3 in line / 2 consumers
+        assert caught.value.retry_after == 45
+        assert consumer.stats()["queued"] == 2
+    asyncio.run(run())
+
+
+def run_consumer(handler, jobs, timeout_seconds=5.0):
+    """Runs jobs to their final outcome; returns (consumer, retries, failures)"""
+    retries, failures = [], []
+
+    async def run():
+        consumer = QueueConsumer(
+            JobQueue(max_size=10), handler, concurrency=1, timeout_seconds=timeout_seconds,
+            backoff_seconds=0.01,
+            on_retry=lambda j, error, delay: retries.append((j.analysis_id, error, delay)),
+            on_failure=lambda j, error: failures.append((j.analysis_id, error, j.attempts)),
+        )
+        consumer.start()
+        for item in jobs:
+            consumer.submit(item)
+        try:
+            while consumer.completed + consumer.failed < len(jobs):
+                await asyncio.sleep(0.01)
+        finally:
+            await consumer.stop()
+        return consumer
+    return asyncio.run(run()), retries, failures
+
+
+def test_retries_back_off_exponentially_then_succeed():
+    attempts = []
+
+    async def handler(j):
+        attempts.append(j.attempts)
+        if j.attempts < 3:
+            raise RuntimeError("flaky")
+
+    consumer, retries, failures = run_consumer(handler, [job("a")])
+    assert attempts == [1, 2, 3]
+    assert retries == [("a", "flaky", 0.01), ("a", "flaky", 0.02)]
+    assert failures == []
+    assert (consumer.completed, consumer.failed, consumer.retries) == (1, 0, 2)
+
+
+def test_retry_exhaustion_calls_on_failure():
+    async def handler(j):
+        raise ValueError()
+
+    item = job("a", max_attempts=2)
+    consumer, retries, failures = run_consumer(handler, [item])
+    assert len(retries) == 1
+    assert failures == [("a", "ValueError", 2)]
+    assert (item.status, item.error_message) == ("failed", "ValueError")
+    assert consumer.stats()["queued"] == 0
+
+
+def test_timeout_is_not_retried():
+    async def handler(j):
+        await asyncio.sleep(10)
+
+    consumer, retries, failures = run_consumer(handler, [job("a")], timeout_seconds=0.05)
+    assert retries == []
+    assert failures == [("a", "timed out", 1)]
+
+
+def test_timeout_error_from_the_handler_is_retried():
+    async def handler(j):
+        if j.attempts == 1:
+            raise asyncio.TimeoutError()
+
+    consumer, retries, failures = run_consumer(handler, [job("a")])
+    assert len(retries) == 1 and failures == []
+    assert consumer.completed == 1
@@ -0,0 +1,89 @@
+import json
+import random
+import threading
+
+from src.utils import result_store
+from src.utils.result_store import ResultStore, estimate_json_size
+
+
+def result(files):
+    rows = random.Random(files)
+    return {
+        "analysis_id": "0" * 36,
+        "status": "completed",
+        "score": 71,
+        "summary": "Found issues" * 10,
+        "findings": {
+            f"src/pkg{i % 7}/mod{i}.py": [["HARDCODED_SECRET", j, None] if j % 2 else
+                                          ["HIGH_COMPLEXITY", j, {"name": "handler", "complexity": 12}]
+                                          for j in range(rows.randrange(20))]
+            for i in range(files)
+        },
+        "llm_issues": [{"type": "logic", "severity": "medium", "line": 3, "message": "m" * 80}] * 5,
+        "files_analyzed": [f"src/pkg{i % 7}/mod{i}.py" for i in range(files)],
+    }
+
+
+def json_len(value):
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+def test_size_estimate_is_close_to_the_json_length():
+    # Small results are walked in full
+    for value in (result(3), result(40), [], {}, [None, True, 1.5, "x"]):
+        assert abs(estimate_json_size(value) - json_len(value)) <= max(2, json_len(value) * 0.02)
+    # Large ones are sampled
+    errors = sorted(abs(estimate_json_size(result(n)) - json_len(result(n))) / json_len(result(n))
+                    for n in range(100, 1000, 50))
+    assert errors[len(errors) // 2] < 0.05
+    assert errors[-1] < 0.2
+
+
+def test_byte_budget_uses_estimated_sizes():
+    store = ResultStore(max_entries=100, max_bytes=3 * estimate_json_size(result(50)), ttl_seconds=60)
+    for i in range(5):
+        store[str(i)] = result(50)
+    assert store.stats()["entries"] == 3
+    assert store.stats()["bytes"] == 3 * estimate_json_size(result(50))
+    assert "0" not in store and store["4"] == result(50)
+
+
+def test_spills_are_written_off_the_calling_thread(tmp_path, monkeypatch):
+    store = ResultStore(max_entries=1, max_bytes=10 ** 9, ttl_seconds=60, path=str(tmp_path / "r.sqlite3"))
+    writers = []
+    write_spill = store._write_spill
+
+    def spy(*args):
+        writers.append(threading.current_thread())
+        write_spill(*args)
+    monkeypatch.setattr(store, "_write_spill", spy)
+    store["a"] = result(5)
+    store["b"] = result(6)
+    # Evicted but maybe not written yet: still readable
+    assert store.get("a") == result(5)
+    store.flush()
+    assert writers and threading.current_thread() not in writers
+    assert store.stats()["spills"] >= 1 and store.stats()["pending_spills"] == 0
+    store.close()
+
+
+def test_stores_share_a_file_in_separate_tables(tmp_path):
+    path = str(tmp_path / "r.sqlite3")
+    results = ResultStore(max_entries=1, max_bytes=10 ** 9, ttl_seconds=60, path=path)
+    batches = ResultStore(max_entries=1, max_bytes=10 ** 9, ttl_seconds=60, path=path, table="batches")
+    results["x"], results["y"] = {"kind": "result"}, {}
+    batches["x"], batches["y"] = {"kind": "batch"}, {}
+    results.flush(), batches.flush()
+    assert results.stats()["cold_entries"] == batches.stats()["cold_entries"] == 1
+    assert results["x"] == {"kind": "result"} and batches["x"] == {"kind": "batch"}
+    results.close(), batches.close()
+
+
+def test_expired_results_leave_memory_without_being_read(monkeypatch):
+    monkeypatch.setattr(result_store, "EXPIRY_SWEEP_WRITES", 3)
+    store = ResultStore(max_entries=10, max_bytes=10 ** 9, ttl_seconds=60)
+    store["old"] = {"a": 1}
+    stored_at, value, size = store._entries["old"]
+    store._entries["old"] = (stored_at - 120, value, size)
+    store["b"], store["c"] = {}, {}
+    assert store.stats()["entries"] == 2 and store.expirations == 1
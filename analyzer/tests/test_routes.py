@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import time
+import uuid
+
+import httpx
+
+from src.api import routes
+from src.workers.queue_consumer import AnalysisJob, JobQueue, QueueConsumer
+from tests.test_file_processor import make_tarball
+
+REPO_URL = "https://github.com/octo/demo"
+
+
+def run_analysis(handler, **kwargs):
+    """perform_analysis against a mocked GitHub; returns the stored result"""
+    analysis_id = str(uuid.uuid4())
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            routes._start_result(analysis_id, REPO_URL)
+            await routes.perform_analysis(analysis_id, REPO_URL, "auto", http_client=client, **kwargs)
+    asyncio.run(run())
+    return routes.analysis_results[analysis_id]
+
+
+def tree_response(files):
+    return httpx.Response(200, json={"tree": [
+        {"type": "blob", "path": path, "sha": hashlib.sha1(data).hexdigest(), "size": len(data)} for path, data in files.items()
+    ]})
+
+
+def test_archive_ingestion_reads_only_selected_files_in_selection_order():
+    files = {f"pkg{d}/mod{i}.py": f"def f{i}():\n    return {i}\n".encode() * 20 for d in range(4) for i in range(5)}
+    tarball = make_tarball(files)
+
+    def handler(request):
+        if "/git/trees/" in request.url.path:
+            return tree_response(files)
+        if "/tarball/" in request.url.path:
+            return httpx.Response(200, content=tarball)
+        return httpx.Response(404)
+
+    result = run_analysis(handler, ingestion="archive", byte_budget=sum(map(len, files.values())) // 2)
+    analyzed = result["files_analyzed"]
+    assert result["status"] == "completed"
+    assert len(analyzed) == result["selection"]["selected"] < len(files)
+    # Spread across every directory, not the first ones in archive order
+    assert {path.split("/")[0] for path in analyzed} == {f"pkg{d}" for d in range(4)}
+
+
+def batch_status(statuses):
+    batch_id = str(uuid.uuid4())
+    analyses = []
+    for status in statuses:
+        analysis_id = str(uuid.uuid4())
+        if status != "expired":
+            routes.analysis_results[analysis_id] = {"status": status, "repo_url": REPO_URL}
+        analyses.append({"repo_url": REPO_URL, "analysis_id": analysis_id})
+    routes.batch_results[batch_id] = {"batch_id": batch_id, "analyses": analyses}
+    batch = asyncio.run(routes.get_batch(batch_id))
+    return batch["status"], batch["counts"]
+
+
+def test_batch_status_reflects_every_outcome():
+    assert batch_status(["completed", "processing", "failed"])[0] == "processing"
+    assert batch_status(["completed", "completed"]) == ("completed", {"completed": 2})
+    assert batch_status(["completed", "failed"])[0] == "partial"
+    assert batch_status(["partial", "partial"])[0] == "partial"
+    assert batch_status(["failed", "expired"]) == ("failed", {"failed": 1, "expired": 1})
+
+
+def test_stop_batch_feeders_cancels_pending_submissions():
+    async def run():
+        consumer = QueueConsumer(JobQueue(max_size=2), handler=None, concurrency=1, timeout_seconds=1)
+        jobs = [AnalysisJob(analysis_id=str(i), payload={}) for i in range(3)]
+        feeder = asyncio.create_task(routes._feed_batch(consumer, jobs))
+        routes._batch_feeders.add(feeder)
+        feeder.add_done_callback(routes._batch_feeders.discard)
+        await asyncio.sleep(0.05)
+        # The batch share of the queue (1 slot) is full; the rest wait
+        assert len(consumer.queue) == 1 and not feeder.done()
+        await routes.stop_batch_feeders()
+        return feeder
+    feeder = asyncio.run(run())
+    assert feeder.cancelled()
+    assert not routes._batch_feeders
+
+
+def test_batch_feeder_submits_as_soon_as_a_job_is_dequeued():
+    async def run():
+        consumer = QueueConsumer(JobQueue(max_size=2), handler=None, concurrency=1, timeout_seconds=1)
+        jobs = [AnalysisJob(analysis_id=str(i), payload={}) for i in range(3)]
+        feeder = asyncio.create_task(routes._feed_batch(consumer, jobs))
+        submitted = []
+        for _ in jobs:
+            while len(consumer.queue) == 0:
+                await asyncio.sleep(0)
+            submitted.append((await consumer.queue.get()).analysis_id)
+        await asyncio.wait_for(feeder, 0.5)
+        return submitted
+    started = time.monotonic()
+    assert asyncio.run(run()) == ["0", "1", "2"]
+    assert time.monotonic() - started < 0.5  # no polling interval in between
+
+
+def test_progress_channels_open_when_an_analysis_runs_or_is_followed():
+    queued, followed = str(uuid.uuid4()), str(uuid.uuid4())
+    routes._start_result(queued, REPO_URL)
+    routes._start_result(followed, REPO_URL)
+    assert routes.progress_hub.get(queued) is None
+    asyncio.run(routes.stream_analysis(followed))
+    assert routes.progress_hub.get(followed) is not None
+
+
+def raw_handler(files):
+    def handler(request):
+        if "/git/trees/" in request.url.path:
+            return tree_response(files)
+        if request.url.host == "raw.githubusercontent.com":
+            path = request.url.path.split("/", 4)[4]
+            return httpx.Response(200, content=files[path]) if path in files else httpx.Response(404)
+        return httpx.Response(404)
+    return handler
+
+
+def test_incremental_reanalyzes_only_changed_blobs():
+    files = {f"pkg/mod{i}.py": f"def f():\n    return {i}\n".encode() for i in range(4)}
+    first = run_analysis(raw_handler(files), incremental=True)
+    files["pkg/mod0.py"] = b"def f():\n    return 'changed'\n"
+    second = run_analysis(raw_handler(files), incremental=True)
+    assert "(incremental: 4 of 4 files re-analyzed)" in first["summary"]
+    assert "(incremental: 1 of 4 files re-analyzed)" in second["summary"]
+
+
+def test_incremental_is_refused_outside_raw_ingestion():
+    from fastapi.testclient import TestClient
+    from src.api.app import app
+
+    client = TestClient(app)
+    for path, body in (("/api/v1/analyze", {"repo_url": REPO_URL}),
+                       ("/api/v1/analyze/batch", {"repo_urls": [REPO_URL]})):
+        response = client.post(path, json=dict(body, ingestion="archive", incremental=True))
+        assert response.status_code == 422
+    # Direct callers get a note instead
+    files = {"pkg/mod.py": b"x = 1\n"}
+    handler = raw_handler(files)
+    result = run_analysis(lambda request: httpx.Response(200, content=make_tarball(files))
+                          if "/tarball/" in request.url.path else handler(request),
+                          ingestion="archive", incremental=True)
+    assert "(incremental ignored: raw ingestion only, not archive)" in result["summary"]
+
+
+def test_profiled_analysis_covers_cached_and_streamed_files_and_loop_stages(monkeypatch):
+    from src.utils.cache import TieredCache
+
+    monkeypatch.setattr(routes, "file_cache", TieredCache(max_entries=100))
+    files = {"pkg/small.py": b"def f():\n    return 1\n",
+             "pkg/large.py": b"x = 'y'\n" * (routes.MAX_FILE_BYTES // 8 + 1)}
+    run_analysis(raw_handler(files))  # fills the file cache
+    profile = run_analysis(raw_handler(files), profile=True)["profile"]
+    stages = profile["stages"]
+    assert stages["analyze"]["files"] == 2
+    assert any("LargeFileAnalysis" in row["function"] or "analysis_worker" in row["function"]
+               for row in stages["analyze"]["functions"])
+    for name in ("fetch", "llm", "score"):
+        assert stages[name]["files"] == 0 and stages[name]["functions"]
+
+
+def test_incremental_reanalyzes_a_blob_renamed_to_another_language():
+    files = {"pkg/util.js": b"export function f(x) { return x; }\n", "pkg/mod.py": b"x = 1\n"}
+    run_analysis(raw_handler(files), incremental=True)
+    files = {"pkg/util.ts": files["pkg/util.js"], "pkg/main.py": files["pkg/mod.py"]}
+    result = run_analysis(raw_handler(files), incremental=True)
+    # Same blobs, but only the .py rename keeps its language
+    assert "(incremental: 1 of 2 files re-analyzed)" in result["summary"]
+    assert set(result["files_analyzed"]) == set(files)
+
+
+def test_host_limits_are_per_lifespan_and_shared_by_its_analyses():
+    files = {f"pkg/mod{i}.py": b"x = 1\n" for i in range(6)}
+    handle = raw_handler(files)
+    in_flight, peak = [0], [0]
+
+    async def handler(request):
+        if request.url.host != "raw.githubusercontent.com":
+            return handle(request)
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        return handle(request)
+
+    async def run():
+        limits = routes.HostLimits(2)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            ids = [str(uuid.uuid4()) for _ in range(2)]
+            for analysis_id in ids:
+                routes._start_result(analysis_id, REPO_URL)
+            await asyncio.gather(*(routes.perform_analysis(analysis_id, REPO_URL, "auto", http_client=client,
+                                                           host_limits=limits) for analysis_id in ids))
+    # Each event loop gets its own limits; the second run would fail on
+    # semaphores bound to the first one's loop
+    for _ in range(2):
+        peak[0] = 0
+        asyncio.run(run())
+        assert peak[0] == 2
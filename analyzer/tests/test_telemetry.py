@@ -0,0 +1,24 @@
+import pytest
+
+from src.utils import telemetry
+from src.utils.telemetry import ANALYSES_TOTAL, trace_analysis
+
+
+def analyses_total(status):
+    return ANALYSES_TOTAL._values.get(telemetry._label_key({"status": status}), 0)
+
+
+def test_analyses_are_counted_by_outcome():
+    before = {status: analyses_total(status) for status in ("completed", "partial", "failed")}
+    with trace_analysis():
+        pass
+    with trace_analysis() as trace:
+        trace.status = "partial"
+    with pytest.raises(RuntimeError):
+        with trace_analysis() as trace:
+            trace.status = "partial"
+            raise RuntimeError("boom")
+    assert {status: analyses_total(status) - count for status, count in before.items()} == {
+        "completed": 1, "partial": 1, "failed": 1,
+    }
+    assert 'codesage_analyses_total{status="partial"}' in telemetry.render()
@@ -12,7 +12,7 @@ module.exports = (sequelize) => {
       allowNull: false
     },
     status: {
-      type: DataTypes.ENUM('pending', 'processing', 'completed', 'failed'),
+      type: DataTypes.ENUM('pending', 'processing', 'completed', 'partial', 'failed'),
       defaultValue: 'pending'
     },
     language: {
@@ -191,6 +191,7 @@ const Dashboard = () => {
                       p-2 rounded-lg
                       ${analysis.status === 'completed' ? 'bg-green-100 text-green-600' :
                         analysis.status === 'processing' ? 'bg-blue-100 text-blue-600' :
+                        analysis.status === 'partial' ? 'bg-yellow-100 text-yellow-600' :
                         analysis.status === 'failed' ? 'bg-red-100 text-red-600' :
                         'bg-gray-100 text-gray-600'}
                     `}>